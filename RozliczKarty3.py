@@ -11,10 +11,10 @@ from reportlab.platypus import (
     Spacer, PageBreak
 )
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.ttfonts import TTFont
 from reportlab.lib.enums import TA_LEFT, TA_CENTER
 
+from pierwsza_app.core.fonts import font
+
 
 def easter_date(year):
     """
@@ -136,17 +136,14 @@ def save_tables_to_pdf(file_name, table_data):
     # np. "karta_GrupaA_Styczeń_2025.pdf"
     pdf_file_name = f"karta_{group}_{month}_{year}.pdf"
 
-    # Rejestracja czcionki DejaVu Sans (jeśli dostępna)
-    try:
-        pdfmetrics.registerFont(TTFont('DejaVu', 'DejaVuSans.ttf'))
-    except:
-        pass
+    # Czcionka DejaVu Sans ze wspólnego rejestru (fonts/, parsowana raz na proces)
+    font_name = font()
 
     styles = getSampleStyleSheet()
     style_title = ParagraphStyle(
         'Title_DejaVu',
         parent=styles['Title'],
-        fontName='DejaVu',
+        fontName=font_name,
         fontSize=12,
         leading=14,
         alignment=TA_LEFT
@@ -154,7 +151,7 @@ def save_tables_to_pdf(file_name, table_data):
     style_heading2 = ParagraphStyle(
         'Heading2_DejaVu',
         parent=styles['Heading2'],
-        fontName='DejaVu',
+        fontName=font_name,
         fontSize=10,
         leading=12,
         alignment=TA_LEFT
@@ -162,14 +159,14 @@ def save_tables_to_pdf(file_name, table_data):
     style_normal = ParagraphStyle(
         'Normal_DejaVu',
         parent=styles['Normal'],
-        fontName='DejaVu',
+        fontName=font_name,
         fontSize=10,
         leading=12
     )
     style_heading4 = ParagraphStyle(
         'Heading4_DejaVu',
         parent=styles['Heading4'],
-        fontName='DejaVu',
+        fontName=font_name,
         fontSize=10,
         leading=12,
         alignment=TA_CENTER
@@ -455,13 +452,13 @@ def save_tables_to_pdf(file_name, table_data):
             # Nagłówki kolumn (trzeci wiersz)
             ('BACKGROUND', (0, 2), (-1, 2), colors.lightgrey),
             ('TEXTCOLOR', (0, 2), (-1, 2), colors.black),
-            ('FONTNAME', (0, 2), (-1, 2), 'DejaVu'),
+            ('FONTNAME', (0, 2), (-1, 2), font_name),
             ('FONTSIZE', (0, 2), (-1, 2), 10),
             ('ALIGN', (0, 2), (-1, 2), 'CENTER'),
             ('GRID', (0, 2), (-1, -1), 1, colors.black),
 
             # Czcionka
-            ('FONTNAME', (0, 0), (-1, -1), 'DejaVu'),
+            ('FONTNAME', (0, 0), (-1, -1), font_name),
         ])
 
         # Pokolorowanie kolumny "Data"
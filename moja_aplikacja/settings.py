@@ -8,6 +8,10 @@ import dj_database_url
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 
+# Katalog plików danych (działy, grafiki, historia). Domyślnie katalog projektu;
+# na serwerze można wskazać trwały dysk, a benchmark podstawia katalog tymczasowy.
+DATA_DIR = Path(os.environ.get("DATA_DIR") or BASE_DIR)
+
 # === Bezpieczeństwo / tryb ===
 SECRET_KEY = os.environ.get("SECRET_KEY", "dev-secret-key")
 DEBUG = os.environ.get("DEBUG", "True").lower() == "true"
@@ -43,6 +47,7 @@ INSTALLED_APPS = [
 
 # === Middleware ===
 MIDDLEWARE = [
+    'pierwsza_app.core.metrics.MetricsMiddleware',  # nieaktywny gdy METRICS_ENABLED=false
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -111,6 +116,36 @@ STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# === Metryki (/metrics, format Prometheusa) ===
+METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "False").lower() == "true"
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN", "")  # jeśli ustawiony: Authorization: Bearer <token>
+
+# === Edycja siatki ===
+# True = edit_table domyślnie wysyła siatkę jako JSON i buduje pola w przeglądarce
+# (pojedynczo można wymusić ?compact=1 / ?compact=0)
+EDIT_TABLE_COMPACT = os.environ.get("EDIT_TABLE_COMPACT", "True").lower() == "true"
+
+# === PDF ===
+# True = ReportLab i czcionka ładowane przy starcie (dla gunicorn --preload);
+# domyślnie leniwie, przy pierwszym wydruku
+PDF_WARMUP = os.environ.get("PDF_WARMUP", "False").lower() == "true"
+
+# === Generator grafiku (edit_table → „Zaproponuj”) ===
+# sekundy na przeszukiwanie lokalne; żądanie może podać ?budget= (maks. 5 s – views.SCHEDULER_MAX_BUDGET)
+SCHEDULER_BUDGET = float(os.environ.get("SCHEDULER_BUDGET", "3.0"))
+
+# === Autosave z zapisem odroczonym (core/writebehind.py) ===
+# true: komórka trafia do dziennika działu, plik miesiąca i historia zapisują się paczką
+# (historia pracownika jest wtedy opóźniona o najwyżej AUTOSAVE_FLUSH_SECONDS)
+AUTOSAVE_WRITE_BEHIND = os.environ.get("AUTOSAVE_WRITE_BEHIND", "False").lower() == "true"
+# paczka co tyle sekund albo po tylu edycjach w dzienniku działu
+AUTOSAVE_FLUSH_SECONDS = float(os.environ.get("AUTOSAVE_FLUSH_SECONDS", "10"))
+AUTOSAVE_FLUSH_EDITS = int(os.environ.get("AUTOSAVE_FLUSH_EDITS", "200"))
+
+# === Eksport płacowy wszystkich działów (/eksport-plac/, manage.py payroll_export) ===
+# liczba procesów roboczych; 0 = liczba rdzeni
+PAYROLL_WORKERS = int(os.environ.get("PAYROLL_WORKERS", "0"))
+
 # === E-mail (zamiast twardych danych użyj zmiennych środowiskowych) ===
 EMAIL_BACKEND = os.environ.get("EMAIL_BACKEND", "django.core.mail.backends.smtp.EmailBackend")
 EMAIL_HOST = os.environ.get("EMAIL_HOST", "smtp.gmail.com")
@@ -119,3 +154,6 @@ EMAIL_USE_TLS = os.environ.get("EMAIL_USE_TLS", "True").lower() == "true"
 EMAIL_HOST_USER = os.environ.get("EMAIL_HOST_USER", "")
 EMAIL_HOST_PASSWORD = os.environ.get("EMAIL_HOST_PASSWORD", "")
 DEFAULT_FROM_EMAIL = os.environ.get("DEFAULT_FROM_EMAIL", EMAIL_HOST_USER or "webmaster@localhost")
+# adresaci e-maila zbiorczego o badaniach (manage.py exam_digest), po przecinku;
+# pusto = e-mail nie wychodzi (działy pomijane z ostrzeżeniem; nie wysyłamy na adresy z profili)
+EXAM_DIGEST_TO = [a.strip() for a in os.environ.get("EXAM_DIGEST_TO", "").split(",") if a.strip()]
@@ -3,9 +3,13 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 
+from pierwsza_app.core.metrics import metrics_view
+
 urlpatterns = [
     path("", include("pierwsza_app.urls")),  # <-- to załatwia / -> start
     path("admin/", admin.site.urls),
+    path("api/", include("schedule.urls")),       # schematy grafiku (grafik.html)
+    path("metrics", metrics_view, name="metrics"),
 ]
 
 # Obsługa PDF-ów i innych plików generowanych dynamicznie
@@ -1,6 +1,13 @@
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class PierwszaAppConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'pierwsza_app'
+
+    def ready(self):
+        # gunicorn --preload: PDF ładowany raz w masterze zamiast w każdym workerze
+        if settings.PDF_WARMUP:
+            from .core.warmup import warm_up
+            warm_up()
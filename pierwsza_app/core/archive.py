@@ -0,0 +1,201 @@
+# pierwsza_app/core/archive.py
+"""
+Roczne archiwum działu – zamknięty rok w jednym pliku tylko do odczytu.
+
+    departments/<dział>/<rok>/archive.json   (storage.archive_file)
+
+    {"format": 1, "group": ..., "year": "2024", "closed_at": ...,
+     "months":     {"Styczeń": {"data": {osoba: [tokeny]}, "sha256": ...}, ...},
+     "history":    {emp_id: [{"date": "2024-01-03", "token": "1"}, ...]},
+     "aggregates": {"Styczeń": {osoba: {"ndz": .., "l4": .., "workdays": ..}}, ...},
+     "sha256": ...}
+
+Zamknięcie roku (close_year) zapisuje archiwum, sprawdza je i dopiero wtedy
+usuwa siatki miesięcy – od tej chwili archiwum jest jedynym źródłem danych
+tego roku, a zapis do niego kończy się ClosedYearError. Sumy kontrolne
+(sha256 kanonicznego JSON-a) są liczone per miesiąc i dla całego pliku;
+load() sprawdza tę drugą przy każdym (ponownym) wczytaniu z dysku.
+Wczytane archiwa trzyma cache w procesie, ważny dla stempla pliku
+(mtime_ns, rozmiar) – jak StateCache w labour_rules.py.
+
+Historia pracowników (history/emp_*.json) zostaje bez zmian; archiwum
+trzyma jej kopię z wpisami tego działu i roku.
+"""
+import hashlib
+import json
+import os
+import stat
+import threading
+from datetime import datetime
+from pathlib import Path
+
+from . import storage
+from .metrics import record_io
+
+FORMAT = 1
+
+
+class ArchiveError(Exception):
+    """Archiwum nieczytelne albo niezgodne z sumą kontrolną."""
+
+
+class ClosedYearError(Exception):
+    """Próba zapisu siatki w zamkniętym (zarchiwizowanym) roku."""
+
+
+def digest(obj) -> str:
+    raw = json.dumps(obj, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def build(group, year, months: dict, history: dict, aggregates: dict) -> dict:
+    """Zawartość archiwum z sumami kontrolnymi (months: {nazwa miesiąca: data})."""
+    payload = {
+        "format": FORMAT,
+        "group": group,
+        "year": str(year),
+        "closed_at": datetime.now().isoformat(timespec="seconds"),
+        "months": {m: {"data": data, "sha256": digest(data)} for m, data in months.items()},
+        "history": history,
+        "aggregates": aggregates,
+    }
+    payload["sha256"] = digest(payload)
+    return payload
+
+
+def verify(payload: dict, months=False):
+    """ArchiveError, jeśli suma pliku (i przy months=True – sumy miesięcy) się nie zgadza."""
+    body = {k: v for k, v in payload.items() if k != "sha256"}
+    if payload.get("format") != FORMAT or digest(body) != payload.get("sha256"):
+        raise ArchiveError(f"Archiwum {payload.get('group')} {payload.get('year')}: niezgodna suma kontrolna.")
+    if months:
+        for name, m in payload["months"].items():
+            if digest(m["data"]) != m["sha256"]:
+                raise ArchiveError(f"Archiwum {payload['group']} {payload['year']}: uszkodzony miesiąc {name}.")
+
+
+# ---- odczyt (z cache) ----
+
+_cache = {}                  # ścieżka -> (stempel, payload)
+_lock = threading.Lock()
+
+
+def _stamp(path: Path):
+    try:
+        st = path.stat()
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+def load(root, group, year):
+    """Archiwum roku albo None, gdy rok nie jest zamknięty."""
+    path = storage.archive_file(root, group, year)
+    stamp = _stamp(path)
+    if stamp is None:
+        return None
+    with _lock:
+        item = _cache.get(path)
+    if item and item[0] == stamp:
+        return item[1]
+    raw = path.read_bytes()
+    record_io("read", len(raw))
+    try:
+        payload = json.loads(raw.decode("utf-8"))
+    except ValueError as e:
+        raise ArchiveError(f"Archiwum {path} nieczytelne: {e}")
+    verify(payload)
+    with _lock:
+        _cache[path] = (stamp, payload)
+    return payload
+
+
+def is_closed(root, group, year) -> bool:
+    return storage.archive_file(root, group, year).exists()
+
+
+def month_data(root, group, month, year):
+    """Siatka miesiąca z archiwum; None, gdy rok nie jest zamknięty."""
+    payload = load(root, group, year)
+    if payload is None:
+        return None
+    return (payload["months"].get(month) or {}).get("data", {})
+
+
+def month_aggregates(root, group, month, year):
+    """Agregaty miesiąca ({osoba: {ndz, l4, workdays}}); None, gdy rok nie jest zamknięty."""
+    payload = load(root, group, year)
+    if payload is None:
+        return None
+    return payload["aggregates"].get(month, {})
+
+
+# ---- zamknięcie / otwarcie roku ----
+
+def _write_readonly(path: Path, payload: dict):
+    raw = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_bytes(raw)
+    os.replace(tmp, path)
+    os.chmod(path, stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH)
+    record_io("write", len(raw))
+
+
+def department_history(history_dir: Path, group, year) -> dict:
+    """{emp_id: [wpisy]} z history/emp_*.json – tylko wpisy działu z danego roku."""
+    prefix = f"{year}-"
+    out = {}
+    for path in sorted(Path(history_dir).glob("emp_*.json")):
+        try:
+            entries = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            continue
+        mine = [{"date": e.get("date"), "token": e.get("token", "")} for e in entries
+                if e.get("group") == group and (e.get("date") or "").startswith(prefix)]
+        if mine:
+            out[path.stem[len("emp_"):]] = sorted(mine, key=lambda e: e["date"])
+    return out
+
+
+def close_year(root, group, year, history_dir, aggregate, dry_run=False):
+    """
+    Archiwizuje siatki roku i usuwa pliki miesięcy; zwraca (ścieżka archiwum, [miesiące]).
+    aggregate(nazwa_miesiąca, data) -> {osoba: {...}} liczy agregaty (count_stats).
+    """
+    path = storage.archive_file(root, group, year)
+    if path.exists():
+        raise FileExistsError(f"Rok {year} działu {group} jest już zamknięty.")
+    months, files = {}, []
+    for name in storage.MONTHS:
+        f = storage.month_file(root, group, name, year)
+        if f.exists():
+            months[name] = (json.loads(f.read_text(encoding="utf-8")).get("data") or {})
+            files.append(f)
+    if not months or dry_run:
+        return path, list(months)
+
+    payload = build(group, year, months, department_history(history_dir, group, year),
+                    {name: aggregate(name, data) for name, data in months.items()})
+    _write_readonly(path, payload)
+    verify(json.loads(path.read_text(encoding="utf-8")), months=True)
+    for f in files:
+        f.unlink()
+    return path, list(months)
+
+
+def reopen_year(root, group, year):
+    """Odtwarza pliki miesięcy z archiwum i usuwa archiwum; zwraca [miesiące]."""
+    payload = load(root, group, year)
+    if payload is None:
+        raise FileNotFoundError(f"Rok {year} działu {group} nie jest zamknięty.")
+    verify(payload, months=True)
+    for name, m in payload["months"].items():
+        f = storage.month_file(root, group, name, year)
+        body = {"group": group, "month": name, "year": str(year), "data": m["data"]}
+        f.write_text(json.dumps(body, ensure_ascii=False, indent=4), encoding="utf-8")
+    path = storage.archive_file(root, group, year)
+    os.chmod(path, stat.S_IRUSR | stat.S_IWUSR)
+    path.unlink()
+    with _lock:
+        _cache.pop(path, None)
+    return list(payload["months"])
@@ -0,0 +1,277 @@
+# pierwsza_app/core/events.py
+"""
+Historia siatki jako zdarzenia: każda zmiana komórki to linia JSON
+dopisywana do departments/<dział>/<rok>/events/<miesiąc>.jsonl:
+
+    {"t": ns, "who": "kto", "src": "autosave|edit|import|bulk|undo",
+     "user": osoba, "day": dzień, "old": poprzednio, "new": teraz[, "editor": id][, "undo": offset]}
+
+who to login działu (wspólny dla planistów), editor – identyfikator przeglądarki
+z table_edit.html (localStorage); „moje zmiany” (recent, undoable) filtrują po nim.
+
+Zdarzenie identyfikuje jego offset w pliku (plik tylko rośnie).
+
+Migawki miesiąca (departments/<dział>/<rok>/snapshots/<miesiąc>/<offset>-<t>.json)
+to cała siatka po zdarzeniach do danego offsetu. Pierwsza („genesis”)
+powstaje przy pierwszym zdarzeniu miesiąca z siatki sprzed zmiany, kolejne
+co SNAPSHOT_BYTES zdarzeń – z poprzedniej migawki i zdarzeń po niej, bez
+czytania pliku miesiąca. Stan na chwilę T (as_of) to najbliższa migawka
+sprzed T i tylko zdarzenia między nią a następną migawką.
+
+Zapis zdarzeń trzyma blokadę zdarzeń działu na wyłączność
+(storage.locked(..., name="events")) – jeden porządek zdarzeń i migawek
+także przy wielu procesach. Wołający trzyma już blokadę główną działu
+(zapis pliku miesiąca na wyłączność, autosave write-behind – współdzieloną).
+"""
+import json
+import os
+import time
+from bisect import bisect_right
+from datetime import datetime, time as dtime, timedelta, timezone as dt_timezone
+from typing import NamedTuple
+
+from django.utils import timezone
+
+from . import storage
+
+SNAPSHOT_BYTES = 64 * 1024      # ok. 500 zdarzeń między migawkami
+UNDO_MAX = 100
+TAIL_BYTES = 4096               # koniec pliku zdarzeń czytany po ostatnie t
+
+
+class Change(NamedTuple):
+    user: str
+    day: int
+    old: str
+    new: str
+
+
+def diff(old: dict, new: dict) -> list:
+    """[Change] między dwiema siatkami {osoba: [wartości]}; brak wiersza/dnia = pusta komórka."""
+    out = []
+    for user, row in new.items():
+        before = old.get(user) or []
+        for i, value in enumerate(row):
+            value = "" if value is None else str(value)
+            prev = before[i] if i < len(before) and before[i] is not None else ""
+            if value != str(prev):
+                out.append(Change(user, i + 1, str(prev), value))
+    return out
+
+
+def apply(data: dict, user, day, value):
+    row = data.get(user)
+    if row is None:
+        row = data[user] = []
+    if len(row) < day:
+        row.extend([""] * (day - len(row)))
+    row[day - 1] = value
+
+
+# ---- pliki ----
+
+def _snapshot_name(offset, t):
+    return f"{offset:012d}-{t}.json"
+
+
+def snapshots(root, group, month, year) -> list:
+    """[(offset, t, ścieżka)] migawek miesiąca, rosnąco."""
+    d = storage.snapshots_dir(root, group, month, year)
+    try:
+        names = os.listdir(d)
+    except FileNotFoundError:
+        return []
+    out = []
+    for name in names:
+        stem, dot, ext = name.partition(".")
+        offset, _, t = stem.partition("-")
+        if ext == "json" and offset.isdigit() and t.isdigit():
+            out.append((int(offset), int(t), d / name))
+    return sorted(out)
+
+
+def _write_snapshot(root, group, month, year, offset, t, data):
+    d = storage.snapshots_dir(root, group, month, year)
+    d.mkdir(parents=True, exist_ok=True)
+    path = d / _snapshot_name(offset, t)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    payload = {"group": group, "month": month, "year": str(year), "offset": offset, "t": t, "data": data}
+    tmp.write_text(json.dumps(payload, ensure_ascii=False, separators=(",", ":")), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def _load_snapshot(path) -> dict:
+    return json.loads(path.read_text(encoding="utf-8"))["data"]
+
+
+def read_events(root, group, month, year, start=0, end=None) -> list:
+    """[(offset, zdarzenie)] z zakresu bajtów [start, end); urwana ostatnia linia jest pomijana."""
+    path = storage.events_file(root, group, month, year)
+    try:
+        with open(path, "rb") as f:
+            f.seek(start)
+            raw = f.read() if end is None else f.read(max(0, end - start))
+    except FileNotFoundError:
+        return []
+    out, pos = [], start
+    for line in raw.split(b"\n")[:-1]:
+        try:
+            out.append((pos, json.loads(line)))
+        except ValueError:
+            pass
+        pos += len(line) + 1
+    return out
+
+
+# ---- zapis ----
+
+def _last_t(path, snaps) -> int:
+    """Największe t w historii miesiąca: ostatnia pełna linia zdarzeń albo ostatnia migawka."""
+    last = snaps[-1][1] if snaps else 0
+    try:
+        with open(path, "rb") as f:
+            size = f.seek(0, os.SEEK_END)
+            f.seek(max(0, size - TAIL_BYTES))
+            tail = f.read()
+    except FileNotFoundError:
+        return last
+    for line in reversed(tail.split(b"\n")[:-1]):
+        try:
+            return max(last, int(json.loads(line)["t"]))
+        except (ValueError, KeyError, TypeError):
+            continue            # urwany początek okna / śmieci
+    return last
+
+
+def record(root, group, month, year, changes, who="", src="", base=None, extra=None, editor=""):
+    """
+    Dopisuje zmiany komórek jako zdarzenia. base() -> siatka sprzed zmian –
+    potrzebna tylko przy pierwszym zdarzeniu miesiąca (migawka genesis).
+    extra – lista słowników dołączanych do kolejnych zdarzeń (np. {"undo": offset}).
+    editor – identyfikator przeglądarki (pusty: zapis spoza edytora siatki).
+    """
+    if not changes:
+        return
+    path = storage.events_file(root, group, month, year)
+    with storage.locked(root, group, name="events"):
+        snaps = snapshots(root, group, month, year)
+        # t pod blokadą i nie mniejsze niż dotychczasowe – as_of zakłada, że t rośnie z offsetem
+        # (inny proces mógł dopisać po naszym odczycie zegara, zegar mógł się cofnąć)
+        t = max(time.time_ns(), _last_t(path, snaps) + 1)
+        if not snaps:
+            _write_snapshot(root, group, month, year, 0, t - 1, base() if base else {})
+            snaps = snapshots(root, group, month, year)
+        lines = []
+        for i, c in enumerate(changes):
+            e = {"t": t, "who": who, "src": src, "user": c.user, "day": c.day, "old": c.old, "new": c.new}
+            if editor:
+                e["editor"] = editor
+            if extra:
+                e.update(extra[i])
+            lines.append(json.dumps(e, ensure_ascii=False, separators=(",", ":")) + "\n")
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "ab") as f:
+            f.write("".join(lines).encode("utf-8"))
+            size = f.tell()
+        last_offset, _, last_path = snaps[-1]
+        if size - last_offset >= SNAPSHOT_BYTES:
+            data = _load_snapshot(last_path)
+            for _, e in read_events(root, group, month, year, last_offset, size):
+                apply(data, e["user"], int(e["day"]), e["new"])
+            _write_snapshot(root, group, month, year, size, t, data)
+
+
+# ---- odczyt ----
+
+def as_of(root, group, month, year, at_ns):
+    """
+    Siatka miesiąca na chwilę at_ns (ns od epoki) albo None, gdy miesiąc nie ma historii.
+    Zwraca {"data", "exact", "snapshot": {offset, t}, "replayed"}; exact=False, gdy
+    at_ns jest sprzed pierwszej migawki (dostajemy najwcześniejszy znany stan).
+    """
+    snaps = snapshots(root, group, month, year)
+    if not snaps:
+        return None
+    i = bisect_right([t for _, t, _ in snaps], at_ns) - 1
+    exact = i >= 0
+    i = max(i, 0)
+    offset, t, path = snaps[i]
+    data = _load_snapshot(path)
+    replayed = 0
+    if exact:
+        end = snaps[i + 1][0] if i + 1 < len(snaps) else None
+        for _, e in read_events(root, group, month, year, offset, end):
+            if e["t"] <= at_ns:
+                apply(data, e["user"], int(e["day"]), e["new"])
+                replayed += 1
+    return {"data": data, "exact": exact, "snapshot": {"offset": offset, "t": t}, "replayed": replayed}
+
+
+def backwards(root, group, month, year):
+    """(offset, zdarzenie) od najnowszego – odcinkami między migawkami, bez czytania całego pliku."""
+    try:
+        size = os.stat(storage.events_file(root, group, month, year)).st_size
+    except FileNotFoundError:
+        return
+    bounds = [offset for offset, _, _ in snapshots(root, group, month, year) if 0 < offset < size]
+    end = None
+    for start in reversed([0] + bounds):
+        yield from reversed(read_events(root, group, month, year, start, end))
+        end = start
+
+
+def _mine(e, who, editor):
+    return (who is None or e.get("who") == who) and (editor is None or e.get("editor") == editor)
+
+
+def recent(root, group, month, year, limit=50, who=None, editor=None) -> list:
+    """Ostatnie zdarzenia (najnowsze pierwsze) z offsetami; who / editor – tylko danego loginu / przeglądarki."""
+    out = []
+    for offset, e in backwards(root, group, month, year):
+        if _mine(e, who, editor):
+            out.append(dict(e, offset=offset))
+            if len(out) >= limit:
+                break
+    return out
+
+
+def undoable(root, group, month, year, n, who=None, editor=None) -> list:
+    """Ostatnie n edycji do cofnięcia (najnowsze pierwsze) – bez zdarzeń „undo” i już cofniętych."""
+    undone, out = set(), []
+    for offset, e in backwards(root, group, month, year):
+        if e.get("src") == "undo":
+            undone.add(e.get("undo"))
+            continue
+        if offset in undone or not _mine(e, who, editor):
+            continue
+        out.append((offset, e))
+        if len(out) >= n:
+            break
+    return out
+
+
+def parse_at(value):
+    """'2025-02-20' (koniec dnia), '2025-02-20T14:30' (czas lokalny) albo ns od epoki -> ns; None, gdy błędne."""
+    value = (value or "").strip()
+    if value.isdigit():
+        return int(value)
+    try:
+        if len(value) == 10:
+            d = datetime.fromisoformat(value).date()
+            return _ns(timezone.make_aware(datetime.combine(d + timedelta(days=1), dtime.min))) - 1
+        dt = datetime.fromisoformat(value)
+    except ValueError:
+        return None
+    if timezone.is_naive(dt):
+        dt = timezone.make_aware(dt)
+    return _ns(dt)
+
+
+def _ns(dt) -> int:
+    return int(dt.timestamp()) * 1_000_000_000 + dt.microsecond * 1000
+
+
+def format_t(t_ns) -> str:
+    """ns od epoki -> czas lokalny ISO (Europe/Warsaw)."""
+    dt = datetime.fromtimestamp(t_ns // 1_000_000_000, tz=dt_timezone.utc)
+    return timezone.localtime(dt).isoformat(timespec="seconds")
@@ -0,0 +1,131 @@
+# pierwsza_app/core/exams.py
+"""
+Terminy badań okresowych (Employee.medical_exam, 'RRRR-MM-DD') wszystkich
+działów w jednym indeksie uporządkowanym po dacie.
+
+„Kto ma badania w najbliższych N dniach” to dwa bisecty po liście dat –
+bez przeglądania i parsowania profili. Indeks żyje w pamięci procesu
+i nadąża za zapisami składu tak samo jak wyszukiwarka (search.LiveIndex,
+stemple w DATA_DIR/roster_stamps/): po zmianie przelicza tylko zmienione
+działy.
+
+Z indeksu korzysta panel (dni do badań w tabeli) i polecenie exam_digest
+(jeden e-mail zbiorczy na dział).
+"""
+import heapq
+from bisect import bisect_left, bisect_right
+from datetime import date, timedelta
+from typing import NamedTuple
+
+from . import search
+
+WARN_DAYS = 30              # panel podświetla badania kończące się w ciągu 30 dni
+
+
+class Exam(NamedTuple):
+    # kolejność pól = kolejność w indeksie: data, dział, nazwisko
+    date: date
+    group: str
+    name: str
+    id: str
+    email: str
+
+
+def parse_exam(value):
+    """'RRRR-MM-DD' -> date; puste albo błędne -> None."""
+    try:
+        return date.fromisoformat((value or "").strip())
+    except ValueError:
+        return None
+
+
+class ExamIndex:
+    def __init__(self):
+        self.entries = []           # [Exam] posortowane
+        self.dates = []             # daty entries (klucze bisectu)
+        self.by_group = {}          # dział -> [Exam] posortowane
+        self.by_id = {}             # emp_id -> Exam
+
+    def __len__(self):
+        return len(self.entries)
+
+    def _merge(self):
+        self.entries = list(heapq.merge(*self.by_group.values()))
+        self.dates = [e.date for e in self.entries]
+
+    def rebuild(self, exams):
+        by_group = {}
+        for e in exams:
+            by_group.setdefault(e.group, []).append(e)
+        self.by_group = {g: sorted(es) for g, es in by_group.items()}
+        self.by_id = {e.id: e for es in self.by_group.values() for e in es}
+        self._merge()
+
+    def replace_group(self, group, exams):
+        """Podmienia terminy działu (po zapisie składu)."""
+        for e in self.by_group.pop(group, ()):
+            if self.by_id.get(e.id) is e:
+                del self.by_id[e.id]
+        exams = sorted(exams)
+        for e in exams:
+            old = self.by_id.get(e.id)
+            if old is not None and old.group != group:         # przeniesienie z innego działu
+                self.by_group[old.group] = [x for x in self.by_group[old.group] if x.id != e.id]
+            self.by_id[e.id] = e
+        if exams:
+            self.by_group[group] = exams
+        self._merge()
+
+    def between(self, start, end, groups=None) -> list:
+        """Terminy start <= data <= end, rosnąco."""
+        found = self.entries[bisect_left(self.dates, start):bisect_right(self.dates, end)]
+        if groups is not None:
+            groups = set(groups)
+            found = [e for e in found if e.group in groups]
+        return found
+
+    def expiring(self, today, days=WARN_DAYS, groups=None, overdue=False) -> list:
+        """Badania kończące się w ciągu `days` dni; overdue=True – także już po terminie."""
+        start = date.min if overdue else today
+        return self.between(start, today + timedelta(days=days), groups)
+
+    def days_left(self, emp_id, today):
+        e = self.by_id.get(emp_id)
+        return None if e is None else (e.date - today).days
+
+
+def load_exams(groups=None):
+    """Terminy z bazy (wszystkie albo wybranych działów) – jedno zapytanie."""
+    from ..models import Employee
+
+    qs = Employee.objects.exclude(medical_exam="")
+    if groups is not None:
+        qs = qs.filter(department__name__in=list(groups))
+    out = []
+    for emp_id, group, name, email, exam in qs.values_list(
+            "emp_id", "department__name", "name", "email", "medical_exam"):
+        d = parse_exam(exam)
+        if d is not None:
+            out.append(Exam(d, group, name, emp_id, (email or "").strip()))
+    return out
+
+
+live = search.LiveIndex(ExamIndex, load_exams)
+
+
+def digest(entries) -> dict:
+    """{dział: [Exam]} – działy alfabetycznie, terminy rosnąco."""
+    out = {}
+    for e in entries:
+        out.setdefault(e.group, []).append(e)
+    return dict(sorted(out.items()))
+
+
+def digest_text(group, entries, today, days=WARN_DAYS) -> str:
+    lines = [f"Dział {group}: terminy badań okresowych do {today + timedelta(days=days):%Y-%m-%d}.", ""]
+    for e in entries:
+        left = (e.date - today).days
+        when = f"po terminie {-left} dni" if left < 0 else ("dziś" if left == 0 else f"za {left} dni")
+        lines.append(f"- {e.name}: {e.date:%Y-%m-%d} ({when})")
+    lines += ["", f"Razem: {len(entries)}."]
+    return "\n".join(lines)
@@ -0,0 +1,47 @@
+# pierwsza_app/core/fonts.py
+"""
+Wspólny rejestr czcionek TTF dla wszystkich generatorów PDF (pdf_grafik,
+pdf_karty, RozliczKarty3).
+
+TTFont przy tworzeniu czyta cały plik i parsuje tabele (cmap, szerokości
+glifów) – to kilkanaście ms na każde wywołanie. Tutaj każdy plik jest
+parsowany raz na proces, a obiekt czcionki (razem z jego metrykami)
+zostaje zarejestrowany w ReportLab na stałe. Podzbiory glifów osadzane
+w PDF są i tak budowane per dokument.
+
+Ścieżki liczone są od pliku modułu, nie od bieżącego katalogu ani settings –
+stary generator kart uruchamiany z wiersza poleceń też z tego korzysta.
+Brak pliku czcionki kończy się błędem zamiast cichego PDF-a bez polskich znaków.
+"""
+import threading
+from pathlib import Path
+
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+
+FONTS_DIR = Path(__file__).resolve().parents[2] / "fonts"
+
+# nazwa w ReportLab -> plik w fonts/
+FONTS = {"DejaVuSans": "DejaVuSans.ttf"}
+DEFAULT_FONT = "DejaVuSans"
+
+_parsed = {}                 # nazwa -> TTFont (sparsowany raz)
+_lock = threading.Lock()
+
+
+def font(name: str = DEFAULT_FONT) -> str:
+    """Zwraca nazwę czcionki do stylów; za pierwszym razem parsuje TTF i rejestruje go w ReportLab."""
+    if name in _parsed:
+        return name
+    with _lock:
+        if name not in _parsed:
+            ttf = TTFont(name, str(FONTS_DIR / FONTS[name]))
+            pdfmetrics.registerFont(ttf)
+            _parsed[name] = ttf
+    return name
+
+
+def preload():
+    """Parsuje wszystkie czcionki z FONTS (warm_up przy --preload)."""
+    for name in FONTS:
+        font(name)
@@ -0,0 +1,97 @@
+# pierwsza_app/core/gridops.py
+"""
+Operacje zbiorcze na siatce miesiąca {osoba: [wartości]}:
+
+    fill      jeden token w zakresie dni dla wybranych osób,
+    clear     wyczyszczenie zakresu,
+    rotation  wzór powtarzany co N dni (np. 1,1,2,2,3,3,W,W); stagger
+              przesuwa wzór kolejnym osobom (rotacja zespołowa),
+    copy      wzór z innego miesiąca (domyślnie poprzedniego) przesunięty
+              tak, żeby dni tygodnia się zgadzały (pon -> pon).
+
+Funkcje są czyste: zwracają tylko zmieniane komórki {osoba: {dzień: wartość}}.
+Zapis – jeden plik miesiąca, historia i zdarzenia paczką, pod blokadą
+działu – robi views.bulk_grid_edit.
+"""
+from datetime import date
+
+OPS = ("fill", "clear", "rotation", "copy")
+MAX_TOKEN = 8               # najdłuższa wartość komórki przyjmowana w operacji
+MAX_PATTERN = 62            # rotacja najwyżej dwumiesięczna
+
+
+def normalize_token(value) -> str:
+    """Jak pole siatki w table_edit.html: bez spacji na brzegach, wielkie litery."""
+    return str(value or "").strip().upper()
+
+
+def parse_pattern(value) -> list:
+    """'1,1,2,2,W,W' albo lista -> [tokeny]; pusty element = wolne (pusta komórka)."""
+    items = value if isinstance(value, (list, tuple)) else str(value or "").split(",")
+    return [normalize_token(x) for x in items]
+
+
+def _changes(table, names, day_from, day_to, value_for, only_empty=False) -> dict:
+    """value_for(i, osoba, dzień) -> nowa wartość albo None (bez zmiany)."""
+    out = {}
+    for i, name in enumerate(names):
+        row = table.get(name) or []
+        for day in range(day_from, day_to + 1):
+            value = value_for(i, name, day)
+            if value is None:
+                continue
+            current = (row[day - 1] if day <= len(row) else "") or ""
+            if only_empty and current.strip():
+                continue
+            if value != current:
+                out.setdefault(name, {})[day] = value
+    return out
+
+
+def fill(table, names, day_from, day_to, token, only_empty=False) -> dict:
+    return _changes(table, names, day_from, day_to, lambda i, name, day: token, only_empty)
+
+
+def clear(table, names, day_from, day_to) -> dict:
+    return _changes(table, names, day_from, day_to, lambda i, name, day: "")
+
+
+def rotation(table, names, day_from, day_to, pattern, start=None, stagger=0, only_empty=False) -> dict:
+    """Dzień `start` (domyślnie day_from) to pattern[0]; osoba nr i zaczyna i*stagger pozycji dalej."""
+    start = day_from if start is None else start
+    n = len(pattern)
+    return _changes(table, names, day_from, day_to,
+                    lambda i, name, day: pattern[(day - start + i * stagger) % n], only_empty)
+
+
+def weekday_shift(source_first: date, target_first: date) -> int:
+    """
+    k z zakresu -3..3 takie, że dzień d miesiąca docelowego i dzień d+k
+    źródłowego wypadają w ten sam dzień tygodnia (najmniejsze przesunięcie).
+    """
+    k = (target_first.weekday() - source_first.weekday()) % 7
+    return k - 7 if k > 3 else k
+
+
+def copy_pattern(table, source, names, day_from, day_to, source_days, shift, only_empty=False) -> dict:
+    """
+    Dzień d <- dzień d+shift siatki source; poza miesiącem źródłowym bierzemy
+    ten sam dzień tygodnia tydzień wcześniej/później. Osoby bez wiersza
+    w źródle zostają bez zmian.
+    """
+    def value_for(i, name, day):
+        row = source.get(name)
+        if row is None:
+            return None
+        s = day + shift
+        while s > source_days:
+            s -= 7
+        while s < 1:
+            s += 7
+        return str((row[s - 1] if s <= len(row) else "") or "")
+
+    return _changes(table, names, day_from, day_to, value_for, only_empty)
+
+
+def count(cells: dict) -> int:
+    return sum(len(days) for days in cells.values())
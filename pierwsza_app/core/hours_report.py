@@ -0,0 +1,149 @@
+# pierwsza_app/core/hours_report.py
+"""
+Roczne zestawienie godzin działu dla płac – bez renderowania kart PDF.
+
+Dla każdej osoby i miesiąca: godziny pracy, godziny świąteczne, praca nocna,
+godziny nieobecności w kolumnach karty (urlop wypoczynkowy, chorobowe, ...)
+oraz liczba dni każdego kodu nieobecności (W, C, UO, UPK, ...). Reguły są
+dokładnie te z karty pracy – miesiąc to jedno wywołanie karta_totals na
+siatce (tokens.Grid), tak samo jak wiersz „Razem” karty – więc suma roczna
+zgadza się z sumą „Razem” z dwunastu kart.
+
+Jedno przejście: siatki czytane są miesiąc po miesiącu i od razu zwijane
+do sum – w pamięci nie ma dwunastu siatek naraz. Zamknięty rok czyta się
+z archiwum (load_month_data). Wynik trzyma cache w procesie per (dział, rok),
+ważny dla „wersji danych”: stempli (mtime_ns, rozmiar) plików miesięcy
+i archiwum roku – każdy zapis siatki unieważnia zestawienie.
+"""
+import csv
+import threading
+from collections import OrderedDict
+
+from . import storage
+from .pdf_karty import POLISH_MONTHS, TOTALS, karta_totals, month_days
+from .tokens import ABSENCE_CODES, Grid
+
+COLUMNS = TOTALS
+LABELS = {
+    "hours": "Godziny pracy",
+    "holiday": "Święta",
+    "night": "Praca nocna",
+    "urlop_wypoczynkowy": "Urlop wypoczynkowy",
+    "chorobowe": "Chorobowe",
+    "urlop_okolicznosciowy": "Urlop okolicznościowy",
+    "opieka_nad_dzieckiem": "Opieka nad dzieckiem",
+    "inne": "Inne",
+}
+
+
+def empty_totals():
+    return {**{col: 0 for col in COLUMNS}, "absences": {code: 0 for code in ABSENCE_CODES}}
+
+
+def add_totals(into, other):
+    for col in COLUMNS:
+        into[col] += other[col]
+    for code, n in other["absences"].items():
+        into["absences"][code] += n
+
+
+def month_totals(data, days, names=None):
+    """{osoba: sumy} dla siatki miesiąca (days – z month_days), cała siatka naraz."""
+    grid = Grid(data, len(days), names)
+    out = {}
+    for name, totals, counts in zip(grid.names, karta_totals(grid, days), grid.counts()):
+        out[name] = {**dict(zip(COLUMNS, totals)), "absences": counts}
+    return out
+
+
+def year_report(group, year, load_month, names=()):
+    """
+    {"group", "year", "months", "employees": [{"name", "months": {miesiąc: sumy}, "total": sumy}]}
+    load_month(miesiąc, rok) -> {osoba: wiersz}; names – kolejność (skład działu),
+    osoby spoza składu obecne w siatkach dochodzą na końcu.
+    """
+    per_name = OrderedDict((n, {"name": n, "months": {}, "total": empty_totals()}) for n in names)
+    months_with_data = []
+    for month, number in POLISH_MONTHS.items():
+        data = load_month(month, str(year))
+        if not data:
+            continue
+        months_with_data.append(month)
+        for name, totals in month_totals(data, month_days(int(year), number)).items():
+            entry = per_name.get(name)
+            if entry is None:
+                entry = per_name[name] = {"name": name, "months": {}, "total": empty_totals()}
+            entry["months"][month] = totals
+            add_totals(entry["total"], totals)
+    return {"group": group, "year": str(year), "months": months_with_data,
+            "columns": list(COLUMNS), "absence_codes": list(ABSENCE_CODES),
+            "employees": list(per_name.values())}
+
+
+def data_version(root, group, year):
+    """Stemple plików, z których składa się rok działu (z dziennikiem autosave)."""
+    paths = [storage.month_file(root, group, m, year) for m in storage.MONTHS]
+    paths.append(storage.archive_file(root, group, year))
+    paths.append(storage.autosave_log(root, group))
+    out = []
+    for p in paths:
+        try:
+            st = p.stat()
+            out.append((st.st_mtime_ns, st.st_size))
+        except OSError:
+            out.append(None)
+    return tuple(out)
+
+
+class ReportCache:
+    """Zestawienia per (dział, rok) ważne dla wersji danych; najstarsze wypadają po max_items."""
+
+    def __init__(self, max_items=64):
+        self.max_items = max_items
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, version):
+        with self._lock:
+            item = self._items.get(key)
+            if item is None or item[0] != version:
+                return None
+            self._items.move_to_end(key)
+            return item[1]
+
+    def put(self, key, version, report):
+        with self._lock:
+            self._items[key] = (version, report)
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_items:
+                self._items.popitem(last=False)
+
+
+reports = ReportCache()
+
+
+def cached_year_report(root, group, year, load_month, names=()):
+    key = (group, str(year), tuple(names))
+    version = data_version(root, group, year)
+    report = reports.get(key, version)
+    if report is None:
+        report = year_report(group, year, load_month, names)
+        reports.put(key, version, report)
+    return report
+
+
+def write_csv(report, out, delimiter=";"):
+    """Wiersz na osobę i miesiąc + wiersz „Razem” na osobę."""
+    writer = csv.writer(out, delimiter=delimiter)
+    writer.writerow(["Dział", "Imię i nazwisko", "Miesiąc"] + [LABELS[c] for c in COLUMNS]
+                    + [f"Dni {code}" for code in ABSENCE_CODES])
+
+    def row(name, label, totals):
+        writer.writerow([report["group"], name, label] + [totals[c] for c in COLUMNS]
+                        + [totals["absences"][code] for code in ABSENCE_CODES])
+
+    for emp in report["employees"]:
+        for month in report["months"]:
+            if month in emp["months"]:
+                row(emp["name"], f"{month} {report['year']}", emp["months"][month])
+        row(emp["name"], f"Razem {report['year']}", emp["total"])
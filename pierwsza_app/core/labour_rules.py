@@ -0,0 +1,219 @@
+# pierwsza_app/core/labour_rules.py
+"""
+Reguły czasu pracy dla siatki miesiąca (autosave_cell, zapis edit_table, import CSV).
+
+Reguły dzienne są deklaratywne (DAY_RULES): kod, funkcja sprawdzająca
+„zakotwiczona” w jednym dniu i `look_back` – ile dni wstecz ta funkcja czyta.
+Zmiana komórki d może więc zmienić wynik tylko dla kotwic d .. d + look_back
+i tylko to okno liczymy po każdej edycji. Reguły miesięczne (MONTH_RULES)
+czytają sumy z RowState, które set() aktualizuje w O(1) – bez przeglądania
+całego wiersza.
+
+Stan wierszy trzyma StateCache (w obrębie procesu, jak hub w live.py),
+ważny tak długo, jak plik miesiąca nie zmienił się poza naszym zapisem.
+Tryb pełny (validate_table) służy importowi i pierwszemu renderowi siatki.
+
+Granice miesięcy nie są sprawdzane (dzień 1 nie widzi ostatniego dnia
+poprzedniego miesiąca).
+"""
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable
+
+from .tokens import ABSENCE_CODES, cell
+
+# token -> godzina rozpoczęcia; liczba godzin z katalogu tokenów
+SHIFT_STARTS = {"1": 6, "2": 14, "3": 22, "XZ": 7}
+SHIFT_TIMES = {tok: (start, cell(tok).hours) for tok, start in SHIFT_STARTS.items()}
+ABSENCE_TOKENS = frozenset(ABSENCE_CODES)
+HOURS_PER_NORM_DAY = 8
+
+MIN_DAILY_REST = 11          # h odpoczynku między kolejnymi zmianami
+MAX_CONSECUTIVE_DAYS = 6     # dłuższy ciąg dni pracy = brak odpoczynku tygodniowego
+
+
+def rest_hours(prev_tok: str, tok: str):
+    """Godziny przerwy między zmianą `prev_tok` (dzień k-1) a `tok` (dzień k); None gdy któryś dzień wolny."""
+    if prev_tok not in SHIFT_TIMES or tok not in SHIFT_TIMES:
+        return None
+    start_a, len_a = SHIFT_TIMES[prev_tok]
+    return 24 + SHIFT_TIMES[tok][0] - (start_a + len_a)
+
+
+# ---- reguły dzienne: (wiersz 1-based z wartownikami, dzień) -> komunikat | None ----
+
+def _daily_rest(row, k):
+    rest = rest_hours(row[k - 1], row[k])
+    if rest is not None and rest < MIN_DAILY_REST:
+        return f"Odpoczynek dobowy {rest} h (min. {MIN_DAILY_REST} h) po zmianie {row[k - 1]}"
+    return None
+
+
+def _consecutive(row, k):
+    if k <= MAX_CONSECUTIVE_DAYS:
+        return None
+    if all(row[i] in SHIFT_TIMES for i in range(k - MAX_CONSECUTIVE_DAYS, k + 1)):
+        return f"Ponad {MAX_CONSECUTIVE_DAYS} dni pracy z rzędu"
+    return None
+
+
+# ---- reguły miesięczne: (stan, walidator) -> komunikat | None ----
+
+def _overtime(state, v):
+    norm = v.norm_hours(state)
+    if state.hours > norm:
+        return f"Nadgodziny: {state.hours} h przy normie {norm} h"
+    return None
+
+
+@dataclass(frozen=True)
+class Rule:
+    code: str
+    check: Callable
+    look_back: int = 0
+
+
+DAY_RULES = (
+    Rule("rest_11h", _daily_rest, look_back=1),
+    Rule("max_consecutive", _consecutive, look_back=MAX_CONSECUTIVE_DAYS),
+)
+MONTH_RULES = (
+    Rule("overtime", _overtime),
+)
+
+
+def _tok(v) -> str:
+    return (v or "").strip().upper() if isinstance(v, str) else ""
+
+
+class RowState:
+    """Wiersz jednej osoby (indeksy 1..D, wartownicy 0 i D+1) i jego sumy miesięczne."""
+
+    __slots__ = ("row", "hours", "absent")
+
+    def __init__(self, row, n_days, norm_days):
+        row = list(row or [])
+        self.row = [""] + [_tok(row[d - 1]) if d - 1 < len(row) else "" for d in range(1, n_days + 1)] + [""]
+        self.hours = sum(SHIFT_TIMES[t][1] for t in self.row if t in SHIFT_TIMES)
+        self.absent = sum(1 for d in norm_days if self.row[d] in ABSENCE_TOKENS)
+
+
+class MonthValidator:
+    """Reguły dla jednego miesiąca: liczba dni i dni normy (pn–pt bez świąt)."""
+
+    def __init__(self, n_days, norm_days, day_rules=DAY_RULES, month_rules=MONTH_RULES):
+        self.n_days = n_days
+        self.norm_days = frozenset(norm_days)
+        self.day_rules = day_rules
+        self.month_rules = month_rules
+        self.reach = max((r.look_back for r in day_rules), default=0)
+
+    def state(self, row) -> RowState:
+        return RowState(row, self.n_days, self.norm_days)
+
+    def norm_hours(self, state) -> int:
+        return HOURS_PER_NORM_DAY * (len(self.norm_days) - state.absent)
+
+    def window(self, day):
+        """Zakres kotwic, których wynik może zmienić edycja dnia `day`."""
+        return max(1, day), min(self.n_days, day + self.reach)
+
+    def set(self, state, day, value):
+        """Zmienia komórkę i sumy w O(1)."""
+        old, new = state.row[day], _tok(value)
+        if old in SHIFT_TIMES:
+            state.hours -= SHIFT_TIMES[old][1]
+        if new in SHIFT_TIMES:
+            state.hours += SHIFT_TIMES[new][1]
+        if day in self.norm_days:
+            state.absent += (new in ABSENCE_TOKENS) - (old in ABSENCE_TOKENS)
+        state.row[day] = new
+
+    def check_days(self, state, anchors):
+        out = []
+        for k in anchors:
+            for rule in self.day_rules:
+                msg = rule.check(state.row, k)
+                if msg:
+                    out.append({"rule": rule.code, "day": k, "message": msg})
+        return out
+
+    def check_month(self, state):
+        out = []
+        for rule in self.month_rules:
+            msg = rule.check(state, self)
+            if msg:
+                out.append({"rule": rule.code, "day": None, "message": msg})
+        return out
+
+    def apply(self, state, day, value):
+        """Edycja jednej komórki: (naruszenia w oknie + miesięczne, (od, do))."""
+        self.set(state, day, value)
+        lo, hi = self.window(day)
+        return self.check_days(state, range(lo, hi + 1)) + self.check_month(state), (lo, hi)
+
+    def check_changed(self, state, days):
+        """Kilka zmienionych dni naraz (zapis całej siatki) – suma ich okien."""
+        anchors = set()
+        for d in days:
+            lo, hi = self.window(d)
+            anchors.update(range(lo, hi + 1))
+        return self.check_days(state, sorted(anchors)) + self.check_month(state)
+
+    def validate_row(self, row):
+        state = self.state(row)
+        return self.check_days(state, range(1, self.n_days + 1)) + self.check_month(state)
+
+    def validate_table(self, table):
+        """Tryb pełny: {osoba: [naruszenia]} tylko dla osób z naruszeniami."""
+        out = {}
+        for name, row in (table or {}).items():
+            found = self.validate_row(row)
+            if found:
+                out[name] = found
+        return out
+
+
+class StateCache:
+    """
+    RowState per kanał miesiąca i osoba, ważny dla konkretnego „stempla” pliku
+    (mtime_ns, rozmiar). Po własnym zapisie jednej komórki przepinamy na nowy
+    stempel wszystkie wiersze kanału, które były aktualne przed zapisem.
+    Stempel None (plik zbyt świeży, by ufać mtime) nigdy nie trafia do cache.
+    """
+
+    def __init__(self, max_channels=256):
+        self.max_channels = max_channels
+        self._channels = OrderedDict()      # kanał -> {osoba: (stempel, RowState)}
+        self._lock = threading.Lock()
+
+    def get(self, channel, name, stamp):
+        with self._lock:
+            rows = self._channels.get(channel)
+            item = rows.get(name) if rows else None
+            if item is None or stamp is None or item[0] != stamp:
+                return None
+            self._channels.move_to_end(channel)
+            return item[1]
+
+    def put(self, channel, name, stamp, state):
+        if stamp is None:
+            return
+        with self._lock:
+            self._channels.setdefault(channel, {})[name] = (stamp, state)
+            self._channels.move_to_end(channel)
+            while len(self._channels) > self.max_channels:
+                self._channels.popitem(last=False)
+
+    def restamp(self, channel, old, new):
+        if old is None:
+            return
+        with self._lock:
+            rows = self._channels.get(channel) or {}
+            for name, (stamp, state) in list(rows.items()):
+                if stamp == old:
+                    rows[name] = (new, state)
+
+
+states = StateCache()
@@ -0,0 +1,124 @@
+# pierwsza_app/core/live.py
+"""
+Kanał "na żywo" dla edycji siatki (SSE pod ASGI).
+
+Hub działa w obrębie jednego procesu: autosave publikuje zmianę komórki,
+a każda przeglądarka otwarta na tym samym dziale/miesiącu/roku dostaje ją
+przez /live/<group>/. Zewnętrzny broker (Redis itp.) nie jest potrzebny –
+GridHub jest jego lokalnym odpowiednikiem z tym samym interfejsem
+publish/subscribe. Przy kilku workerach każdy ma własny hub, więc push
+dociera tylko do klientów podłączonych do tego samego procesu.
+"""
+import asyncio
+import json
+import threading
+from collections import defaultdict
+
+# ile wiadomości może czekać na wolnego klienta, zanim uznamy go za "zgubionego"
+DEFAULT_QUEUE_SIZE = 256
+# co ile sekund wysyłamy komentarz SSE, żeby proxy nie zamykało bezczynnych połączeń
+KEEPALIVE_SECONDS = 25
+
+
+def channel_name(group: str, month: str, year) -> str:
+    return f"{group}|{month}|{year}"
+
+
+class Subscription:
+    """Jedno podłączone okno przeglądarki (kolejka w pętli zdarzeń ASGI)."""
+
+    __slots__ = ("channel", "loop", "queue", "overflowed")
+
+    def __init__(self, channel, loop, maxsize):
+        self.channel = channel
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=maxsize)
+        self.overflowed = False
+
+    def _offer(self, payload: str):
+        # wywoływane zawsze w wątku pętli (call_soon_threadsafe)
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait(payload)
+        except asyncio.QueueFull:
+            # klient nie nadąża – zamiast gubić pojedyncze komórki każemy mu przeładować siatkę
+            self.overflowed = True
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(None)
+
+
+class GridHub:
+    """
+    Lokalny broker: channel -> zbiór subskrypcji.
+    publish() można wołać z dowolnego wątku (synchroniczne widoki pod ASGI
+    działają w puli wątków), subscribe() – z wnętrza pętli zdarzeń.
+    """
+
+    def __init__(self, queue_size: int = DEFAULT_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self._lock = threading.Lock()
+        self._subs = defaultdict(set)
+
+    def subscribe(self, channel: str) -> Subscription:
+        sub = Subscription(channel, asyncio.get_running_loop(), self.queue_size)
+        with self._lock:
+            self._subs[channel].add(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscription):
+        with self._lock:
+            subs = self._subs.get(sub.channel)
+            if subs is not None:
+                subs.discard(sub)
+                if not subs:
+                    del self._subs[sub.channel]
+
+    def publish(self, channel: str, message: dict) -> int:
+        """Rozsyła wiadomość do wszystkich subskrybentów kanału. Zwraca ich liczbę."""
+        with self._lock:
+            targets = list(self._subs.get(channel, ()))
+        if not targets:
+            return 0
+        payload = json.dumps(message, ensure_ascii=False)  # serializacja raz, nie per klient
+        sent = 0
+        for sub in targets:
+            try:
+                sub.loop.call_soon_threadsafe(sub._offer, payload)
+                sent += 1
+            except RuntimeError:
+                # pętla już zamknięta (worker kończy pracę)
+                self.unsubscribe(sub)
+        return sent
+
+    def count(self, channel: str | None = None) -> int:
+        with self._lock:
+            if channel is not None:
+                return len(self._subs.get(channel, ()))
+            return sum(len(s) for s in self._subs.values())
+
+
+hub = GridHub()
+
+
+async def sse_events(channel: str, keepalive: float = KEEPALIVE_SECONDS):
+    """
+    Generator strumienia text/event-stream dla jednego klienta.
+    Rozłączenie klienta anuluje generator – subskrypcja jest wtedy zwalniana.
+    """
+    sub = hub.subscribe(channel)
+    try:
+        yield "retry: 3000\n\n"
+        while True:
+            try:
+                payload = await asyncio.wait_for(sub.queue.get(), timeout=keepalive)
+            except asyncio.TimeoutError:
+                yield ": ping\n\n"
+                continue
+            if payload is None:
+                yield "event: reload\ndata: {}\n\n"
+                return
+            yield f"event: cell\ndata: {payload}\n\n"
+    finally:
+        hub.unsubscribe(sub)
@@ -0,0 +1,230 @@
+# pierwsza_app/core/metrics.py
+"""
+Metryki gorących ścieżek w formacie tekstowym Prometheusa (/metrics).
+
+Włączane zmienną METRICS_ENABLED=true. Gdy są wyłączone:
+  - @instrumented zwraca oryginalną funkcję (zero narzutu),
+  - MetricsMiddleware zgłasza MiddlewareNotUsed i wypada z łańcucha,
+  - record_io() kończy się na jednym sprawdzeniu flagi,
+  - /metrics odpowiada 404.
+
+Liczniki są per proces (per worker gunicorna) – każdy worker wystawia własne.
+"""
+import contextvars
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import HttpResponse, Http404
+
+ENABLED = bool(getattr(settings, "METRICS_ENABLED", False))
+
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# rodzina -> (typ, opis)
+FAMILIES = {
+    "app_request_duration_seconds": ("histogram", "Czas obsługi żądania per widok."),
+    "app_requests_total": ("counter", "Liczba żądań per widok, metoda i status."),
+    "app_op_duration_seconds": ("histogram", "Czas wykonania instrumentowanej operacji."),
+    "app_op_calls_total": ("counter", "Liczba wywołań instrumentowanej operacji."),
+    "app_op_errors_total": ("counter", "Liczba wyjątków w instrumentowanej operacji."),
+    "app_file_opens_total": ("counter", "Otwarcia plików danych per operacja i tryb."),
+    "app_file_read_bytes_total": ("counter", "Bajty odczytane z plików danych per operacja."),
+    "app_file_written_bytes_total": ("counter", "Bajty zapisane do plików danych per operacja."),
+    "app_view_file_read_bytes_total": ("counter", "Bajty odczytane z plików danych per widok."),
+    "app_view_file_written_bytes_total": ("counter", "Bajty zapisane do plików danych per widok."),
+    "app_view_file_opens_total": ("counter", "Otwarcia plików danych per widok."),
+}
+
+_lock = threading.Lock()
+_counters = defaultdict(float)   # (rodzina, etykiety) -> wartość
+_hists = {}                      # (rodzina, etykiety) -> [liczniki kubełków, suma, liczba]
+
+_current_view = contextvars.ContextVar("metrics_view", default=None)
+_current_op = contextvars.ContextVar("metrics_op", default=None)
+
+
+def inc(family, labels, value=1.0):
+    with _lock:
+        _counters[(family, labels)] += value
+
+
+def observe(family, labels, seconds):
+    idx = bisect_left(BUCKETS, seconds)
+    with _lock:
+        h = _hists.get((family, labels))
+        if h is None:
+            h = _hists[(family, labels)] = [[0] * len(BUCKETS), 0.0, 0]
+        if idx < len(BUCKETS):
+            h[0][idx] += 1
+        h[1] += seconds
+        h[2] += 1
+
+
+def record_io(kind: str, nbytes: int):
+    """kind: 'read' albo 'write'. Wołane przez helpery odczytu/zapisu w utils."""
+    if not ENABLED:
+        return
+    op = _current_op.get() or "other"
+    fam = "app_file_read_bytes_total" if kind == "read" else "app_file_written_bytes_total"
+    inc("app_file_opens_total", (("op", op), ("mode", kind)))
+    inc(fam, (("op", op),), nbytes)
+    view = _current_view.get()
+    if view:
+        inc("app_view_file_opens_total", (("view", view), ("mode", kind)))
+        inc("app_view_" + fam[4:], (("view", view),), nbytes)
+
+
+class track:
+    """Kontekst mierzący dowolny fragment kodu jako operację `op` (np. wysyłka SMTP)."""
+
+    __slots__ = ("op", "_token", "_t0")
+
+    def __init__(self, op):
+        self.op = op
+
+    def __enter__(self):
+        if ENABLED:
+            self._token = _current_op.set(self.op)
+            self._t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if ENABLED:
+            labels = (("op", self.op),)
+            observe("app_op_duration_seconds", labels, time.perf_counter() - self._t0)
+            inc("app_op_calls_total", labels)
+            if exc_type is not None:
+                inc("app_op_errors_total", labels)
+            _current_op.reset(self._token)
+        return False
+
+
+def instrumented(op):
+    """Dekorator operacji. Przy wyłączonych metrykach zwraca funkcję bez zmian."""
+    def deco(fn):
+        if not ENABLED:
+            return fn
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with track(op):
+                return fn(*args, **kwargs)
+        return wrapper
+    return deco
+
+
+class MetricsMiddleware:
+    """
+    Czas i liczba żądań per widok. Działa w obu trybach: pod ASGI (async views:
+    propose_month, export_payroll_csv) nie wymusza przejścia przez wątek.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token, t0 = _current_view.set("unresolved"), time.perf_counter()
+        status = 500
+        try:
+            response = self.get_response(request)
+            status = response.status_code
+            return response
+        finally:
+            self._done(request, token, t0, status)
+
+    async def __acall__(self, request):
+        token, t0 = _current_view.set("unresolved"), time.perf_counter()
+        status = 500
+        try:
+            response = await self.get_response(request)
+            status = response.status_code
+            return response
+        finally:
+            self._done(request, token, t0, status)
+
+    @staticmethod
+    def _done(request, token, t0, status):
+        match = getattr(request, "resolver_match", None)
+        view = (match.url_name or match.view_name) if match else "unresolved"
+        elapsed = time.perf_counter() - t0
+        observe("app_request_duration_seconds", (("view", view), ("method", request.method)), elapsed)
+        inc("app_requests_total", (("view", view), ("method", request.method), ("status", str(status))))
+        _current_view.reset(token)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        # od tego momentu I/O przypisujemy do nazwy widoku
+        match = request.resolver_match
+        _current_view.set((match.url_name or match.view_name) if match else "unresolved")
+        return None
+
+
+def _escape(v):
+    return str(v).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _fmt_labels(labels, extra=()):
+    items = list(labels) + list(extra)
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in items) + "}"
+
+
+def render_prometheus() -> str:
+    with _lock:
+        counters = dict(_counters)
+        hists = {k: (list(v[0]), v[1], v[2]) for k, v in _hists.items()}
+
+    by_family = defaultdict(list)
+    for (fam, labels), val in counters.items():
+        by_family[fam].append((labels, val))
+    for (fam, labels), h in hists.items():
+        by_family[fam].append((labels, h))
+
+    out = []
+    for fam in sorted(by_family):
+        kind, help_text = FAMILIES.get(fam, ("untyped", ""))
+        out.append(f"# HELP {fam} {help_text}")
+        out.append(f"# TYPE {fam} {kind}")
+        for labels, val in sorted(by_family[fam], key=lambda x: x[0]):
+            if kind == "histogram":
+                buckets, total, count = val
+                acc = 0
+                for le, n in zip(BUCKETS, buckets):
+                    acc += n
+                    out.append(f"{fam}_bucket{_fmt_labels(labels, [('le', le)])} {acc}")
+                out.append(f"{fam}_bucket{_fmt_labels(labels, [('le', '+Inf')])} {count}")
+                out.append(f"{fam}_sum{_fmt_labels(labels)} {total:.6f}")
+                out.append(f"{fam}_count{_fmt_labels(labels)} {count}")
+            else:
+                out.append(f"{fam}{_fmt_labels(labels)} {val:g}")
+    return "\n".join(out) + "\n"
+
+
+def reset():
+    with _lock:
+        _counters.clear()
+        _hists.clear()
+
+
+def metrics_view(request):
+    """GET /metrics – tekst dla Prometheusa. Opcjonalnie chroniony METRICS_TOKEN (Bearer)."""
+    if not ENABLED:
+        raise Http404("Metryki są wyłączone.")
+    token = getattr(settings, "METRICS_TOKEN", "")
+    if token and request.headers.get("Authorization", "") != f"Bearer {token}":
+        return HttpResponse("Brak dostępu.", status=401, content_type="text/plain; charset=utf-8")
+    return HttpResponse(render_prometheus(), content_type="text/plain; version=0.0.4; charset=utf-8")
@@ -0,0 +1,138 @@
+# pierwsza_app/core/payroll.py
+"""
+Eksport płacowy całej organizacji: profile + statystyki (workdays/ndz/l4)
+wszystkich działów w jednym CSV z kolumną „Dział”.
+
+Działy liczą się równolegle w procesach roboczych (ProcessPoolExecutor),
+każdy tą samą funkcją co eksport jednego działu (views.profile_stats_rows).
+Wyniki wracają w kolejności działów (Executor.map) i od razu trafiają do
+strumienia – pierwszy dział jest u klienta, zanim policzą się następne.
+progress(zrobione, wszystkie, dział, liczba osób) woła się po każdym dziale
+– tylko w poleceniu payroll_export; klient HTTP widzi postęp jako kolejne
+działy w strumieniu (nagłówek X-Departments podaje, ile ich będzie).
+
+Pod ASGI Django czyta synchroniczny iterator StreamingHttpResponse w całości,
+zanim wyśle pierwszy bajt – widok podaje więc astream(): każdy kawałek
+pobierany w wątku z puli (sync_to_async), bez blokowania pętli zdarzeń
+i wspólnego wątku widoków synchronicznych; połączenia z bazą otwarte w tym
+wątku zamykamy po każdym kawałku. Po rozłączeniu klienta działy czekające
+w kolejce są anulowane, a pula zamykana bez czekania na procesy.
+
+Procesy robocze startują przez „forkserver” (albo „spawn”), nie fork:
+pula powstaje w środku żądania wielowątkowego workera (pętla zdarzeń,
+wątki asgiref, wątek autosave), a fork kopiowałby cudze blokady.
+Potomek od zera robi django.setup() i otwiera własne połączenia z bazą.
+Przy jednym dziale albo workers=1 wszystko liczy się w bieżącym procesie.
+"""
+import asyncio
+import csv
+import io
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connections
+
+HEADER_PREFIX = ["Dział"]
+
+
+def _init_worker():
+    # „forkserver”/„spawn”: proces potomny zaczyna bez Django
+    import django
+    from django.apps import apps
+    if not apps.ready:
+        django.setup()
+
+
+def department_rows(args):
+    """(dział, zakres) -> (dział, wiersze z kolumną „Dział”); uruchamiane w procesie roboczym."""
+    group, my = args
+    from ..views import profile_stats_rows
+    return group, [[group] + row for row in profile_stats_rows(group, my)]
+
+
+def mp_context():
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+
+def workers_for(n_groups, workers=None):
+    workers = workers or getattr(settings, "PAYROLL_WORKERS", 0) or os.cpu_count() or 1
+    return max(1, min(workers, n_groups))
+
+
+def department_results(groups, my, workers=None):
+    """Generator (dział, wiersze) w kolejności `groups`."""
+    jobs = [(g, my) for g in groups]
+    workers = workers_for(len(jobs), workers)
+    if workers == 1:
+        yield from map(department_rows, jobs)
+        return
+    pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, mp_context=mp_context())
+    try:
+        yield from pool.map(department_rows, jobs)
+    except BaseException:
+        # GeneratorExit (klient się rozłączył, close()) albo błąd działu: działy w kolejce
+        # anulujemy i nie czekamy na procesy – `with` czekałby na wszystkie w __exit__
+        pool.shutdown(wait=False, cancel_futures=True)
+        raise
+    pool.shutdown()
+
+
+def header(my):
+    from ..views import profile_stats_header
+    return HEADER_PREFIX + profile_stats_header(my)
+
+
+def stream_csv(groups, my, workers=None, progress=None, bom=True):
+    """Kawałki tekstu CSV (separator ';'): nagłówek, potem wiersze działu po dziale."""
+    sio = io.StringIO()
+    writer = csv.writer(sio, delimiter=";")
+
+    def flush():
+        text = sio.getvalue()
+        sio.seek(0)
+        sio.truncate()
+        return text
+
+    writer.writerow(header(my))
+    yield ("\ufeff" if bom else "") + flush()
+    for done, (group, rows) in enumerate(department_results(groups, my, workers), start=1):
+        writer.writerows(rows)
+        if progress:
+            progress(done, len(groups), group, len(rows))
+        yield flush()
+
+
+def _in_thread(fn, *args):
+    """fn w wątku puli asyncio; połączenia z bazą tego wątku zamykamy od razu (jak wątek autosave)."""
+    try:
+        return fn(*args)
+    finally:
+        connections.close_all()
+
+
+async def astream(chunks):
+    """Synchroniczny generator kawałków jako iterator asynchroniczny (StreamingHttpResponse pod ASGI)."""
+    it = iter(chunks)
+    close = getattr(it, "close", None)
+    pull = sync_to_async(_in_thread, thread_sensitive=False)
+    pending = None
+    try:
+        while True:
+            # shield: anulowanie żądania nie przerywa next() w wątku, tylko przestajemy na nie czekać
+            pending = asyncio.ensure_future(pull(next, it, None))
+            chunk = await asyncio.shield(pending)
+            if chunk is None:
+                return
+            yield chunk
+    finally:
+        # klient się rozłączył albo koniec – zamyka generator (i pulę procesów bez czekania na kolejkę)
+        if close is not None:
+            if pending is not None and not pending.done():
+                # next() wciąż liczy dział w wątku – generatora nie da się zamknąć w trakcie
+                pending.add_done_callback(lambda f: f.cancelled() or f.exception() or close())
+            else:
+                await pull(close)
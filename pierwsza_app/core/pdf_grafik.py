@@ -9,23 +9,19 @@ from django.http import FileResponse
 
 from reportlab.lib.pagesizes import A4, landscape
 from reportlab.lib import colors
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, PageBreak
+from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, PageBreak, Spacer
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.enums import TA_CENTER
 from reportlab.lib.units import cm
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.ttfonts import TTFont
-
-# --- czcionka z absolutnej ścieżki (działa na Render i lokalnie) ---
-FONT_PATH = settings.BASE_DIR / "fonts" / "DejaVuSans.ttf"
-pdfmetrics.registerFont(TTFont("DejaVuSans", str(FONT_PATH)))
 
+from .fonts import font
+from .metrics import instrumented
+from ..utils import read_text
 
 def _load_table_from_file(file_name: str):
-    """Wczytuje JSON z BASE_DIR/file_name."""
-    path = settings.BASE_DIR / file_name
-    with open(path, "r", encoding="utf-8") as f:
-        return json.load(f)
+    """Wczytuje JSON z DATA_DIR/file_name."""
+    path = settings.DATA_DIR / file_name
+    return json.loads(read_text(path))
 
 
 def _create_title_table(month, year, col_widths, body_style):
@@ -40,14 +36,11 @@ def _create_title_table(month, year, col_widths, body_style):
     return title
 
 
-def generate_pdf_response(file_name: str) -> FileResponse:
+def _month_story(table_data: dict, body_style, day_style, pad=True):
     """
-    Główna funkcja wywoływana z widoku Django.
-    Wczytuje dane z JSON (BASE_DIR/file_name), buduje PDF w pamięci i zwraca FileResponse.
+    Tytuł i tabele jednego miesiąca. pad=True dopełnia każdą stronę do 20 osób
+    (pusty druk działu), pad=False drukuje tylko wiersze z danych (grafik osobisty).
     """
-    table_data = _load_table_from_file(file_name)
-
-    group = table_data.get("group", "Nieznana grupa")
     month = table_data.get("month", "Nieznany miesiąc")
     year = table_data.get("year", "Nieznany rok")
     data = table_data.get("data", {})
@@ -64,13 +57,6 @@ def generate_pdf_response(file_name: str) -> FileResponse:
     if days_in_month == 0:
         raise ValueError(f"Nieprawidłowy miesiąc lub rok: {month} {year}")
 
-    # style
-    styles = getSampleStyleSheet()
-    for st in styles.byName:
-        styles[st].fontName = "DejaVuSans"
-    body_style = ParagraphStyle(name="BodySmaller", fontName="DejaVuSans", fontSize=6, leading=8, alignment=TA_CENTER)
-    day_style = ParagraphStyle(name="DayNoWrap", parent=body_style, wordWrap="CJK")
-
     headers_fixed = ["Lp.", "Nazwisko i imię", "Xz", "Wz", "Nd"]
     headers_days = [str(d) for d in range(1, days_in_month + 1)]
     headers_end = ["Wyk.\nXz", "Wyk.\nWz/W"]
@@ -114,7 +100,7 @@ def generate_pdf_response(file_name: str) -> FileResponse:
 
         # dopełnienie do 20 wierszy logicznych
         rows_created = actual_rows * 2
-        target = 20 * 2
+        target = 20 * 2 if pad else rows_created
         while rows_created < target:
             lp_val = str(lp_start + actual_rows + (rows_created // 2))
             row_top = [Paragraph(lp_val, body_style),
@@ -193,15 +179,6 @@ def generate_pdf_response(file_name: str) -> FileResponse:
         ]
         tbl.setStyle(TableStyle(cmds))
 
-    # --- budowa PDF w pamięci ---
-    buffer = io.BytesIO()
-    doc = SimpleDocTemplate(
-        buffer,
-        pagesize=landscape(A4),
-        leftMargin=0.3 * cm, rightMargin=0.3 * cm,
-        topMargin=0.3 * cm, bottomMargin=0.3 * cm,
-    )
-
     story = []
     num_rows = len(data)
     chunk = 20
@@ -225,8 +202,51 @@ def generate_pdf_response(file_name: str) -> FileResponse:
         if start < num_rows:
             story.append(PageBreak())
 
+    return story
+
+
+def render_grafik(tables, pad=True) -> bytes:
+    """
+    PDF grafiku dla listy miesięcy (struktury jak w JSON-ie miesiąca).
+    Druk działu: każdy miesiąc od nowej strony; grafik osobisty (pad=False):
+    miesiące jeden pod drugim.
+    """
+    font_name = font()  # wspólny rejestr (core/fonts.py), TTF parsowany raz na proces
+    styles = getSampleStyleSheet()
+    for st in styles.byName:
+        styles[st].fontName = font_name
+    body_style = ParagraphStyle(name="BodySmaller", fontName=font_name, fontSize=6, leading=8, alignment=TA_CENTER)
+    day_style = ParagraphStyle(name="DayNoWrap", parent=body_style, wordWrap="CJK")
+
+    story = []
+    for i, table_data in enumerate(tables):
+        if i:
+            story.append(PageBreak() if pad else Spacer(1, 0.5 * cm))
+        story += _month_story(table_data, body_style, day_style, pad=pad)
+
+    # --- budowa PDF w pamięci ---
+    buffer = io.BytesIO()
+    doc = SimpleDocTemplate(
+        buffer,
+        pagesize=landscape(A4),
+        leftMargin=0.3 * cm, rightMargin=0.3 * cm,
+        topMargin=0.3 * cm, bottomMargin=0.3 * cm,
+    )
     doc.build(story)
-    buffer.seek(0)
+    return buffer.getvalue()
+
+
+@instrumented("pdf_grafik")
+def generate_pdf_response(file_name: str) -> FileResponse:
+    """
+    Główna funkcja wywoływana z widoku Django.
+    Wczytuje dane z JSON (DATA_DIR/file_name), buduje PDF w pamięci i zwraca FileResponse.
+    """
+    table_data = _load_table_from_file(file_name)
+    group = table_data.get("group", "Nieznana grupa")
+    month = table_data.get("month", "Nieznany miesiąc")
+    year = table_data.get("year", "Nieznany rok")
+    pdf = render_grafik([table_data])
 
     filename = f"grafik_{group.replace(' ', '_')}_{month}_{year}.pdf"
-    return FileResponse(buffer, as_attachment=True, filename=filename)
+    return FileResponse(io.BytesIO(pdf), as_attachment=True, filename=filename)
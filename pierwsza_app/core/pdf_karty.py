@@ -1,203 +1,273 @@
 # pierwsza_app/core/pdf_karty.py
-# ...
+"""
+Miesięczne karty pracy (jedna strona na osobę) – w całości w pamięci.
+
+Układ i wartości są takie same jak w starym RozliczKarty3.save_tables_to_pdf
+(który zostaje jako skrypt wiersza poleceń i punkt odniesienia w benchmarku),
+ale:
+  * PDF powstaje w BytesIO – nic nie jest zapisywane w katalogu bieżącym
+    ani obok JSON-a, więc nie da się podać karty innego działu;
+  * token -> kolumny godzin to katalog z core/tokens.py zamiast łańcucha
+    if/elif dla każdej komórki, a wiersz „Razem” liczy się dla całej siatki
+    naraz (Grid) – tymi samymi sumami co roczny raport godzin;
+  * style, styl tabeli i kolory dni liczone są raz na dokument, a akapity
+    o tej samej treści (puste, „8”, „w” ...) są współdzielone między stronami.
+"""
+import calendar
 import io
 import json
-from pathlib import Path
+
 from django.conf import settings
 from django.http import FileResponse
 
-# jeśli masz już zdefiniowane czcionki/styl – zostaw
-# (FONT_PATH, rejestracja DejaVuSans itd.)
+from .metrics import instrumented
+from .tokens import LEAVE_COLUMNS, Cell, Grid, cell
+from ..utils import read_text
 
-def _load_table_from_file(file_name: str):
-    path = settings.BASE_DIR / file_name
-    with open(path, "r", encoding="utf-8") as f:
-        return json.load(f)
+POLISH_MONTHS = {
+    "Styczeń": 1, "Luty": 2, "Marzec": 3, "Kwiecień": 4, "Maj": 5, "Czerwiec": 6,
+    "Lipiec": 7, "Sierpień": 8, "Wrzesień": 9, "Październik": 10, "Listopad": 11, "Grudzień": 12
+}
 
-def generate_karty_pdf_response(file_name: str) -> FileResponse:
+# święta stałe (dd-mm); 16 h liczą się tylko Nowy Rok, Boże Narodzenie i Wielkanoc
+HOLIDAYS = ("01-01", "06-01", "01-05", "03-05", "15-08", "01-11", "11-11", "25-12", "26-12")
+HOLIDAYS_16 = ("01-01", "25-12", "26-12")
+
+HEADERS = ("Data", "Liczba\ngodzin pracy", "Święta", "Praca nocna", "Urlop\nwypoczynkowy",
+           "Chorobowe", "Urlop\nokolicznościowy", "Opieka\nnad dzieckiem", "Inne")
+
+
+def _easter(year):
+    """(miesiąc, dzień) Wielkanocy – algorytm Gaussa."""
+    a, b, c = year % 19, year // 100, year % 100
+    d, e = b // 4, b % 4
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = c // 4, c % 4
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    return (h + l - 7 * m + 114) // 31, ((h + l - 7 * m + 114) % 31) + 1
+
+
+def month_days(year: int, month_number: int):
+    """[(dzień, dzień tygodnia, święto, święto 16 h)] dla miesiąca."""
+    em, ed = _easter(year)
+    h16 = set(HOLIDAYS_16) | {f"{ed:02d}-{em:02d}"}
+    out = []
+    for day in range(1, calendar.monthrange(year, month_number)[1] + 1):
+        key = f"{day:02d}-{month_number:02d}"
+        out.append((day, calendar.weekday(year, month_number, day), key in HOLIDAYS, key in h16))
+    return out
+
+
+def holiday_text(c: Cell, weekday, is_holiday, is_16) -> str:
+    shift = c.shift in (1, 2, 3)
+    if weekday == 6:
+        return "8" if shift else ""
+    if is_holiday:
+        if shift:
+            return "16" if is_16 else "8"
+        return "X" if c.marked else ""
+    return ""
+
+
+def holiday_weights(days):
+    """Godziny świąteczne za zmianę w danym dniu (jak holiday_text): niedziela 8, święto 8 albo 16."""
+    return [8 if weekday == 6 else (16 if is_16 else 8) if is_holiday else 0
+            for _, weekday, is_holiday, is_16 in days]
+
+
+TOTALS = ("hours", "holiday", "night") + LEAVE_COLUMNS
+
+
+def karta_totals(grid: Grid, days):
+    """Wiersz „Razem” dla każdej osoby siatki: [praca, święta, nocna, nieobecności...]."""
+    columns = [grid.sums("hours"), grid.dot("shift", holiday_weights(days)), grid.sums("night")]
+    columns += [grid.sums(col) for col in LEAVE_COLUMNS]
+    return [list(t) for t in zip(*columns)]
+
+
+def summary_texts(totals):
+    return [str(totals[0])] + [str(t) if t else "" for t in totals[1:]]
+
+
+def karta_rows(values, days):
     """
-    1) Próbuje użyć starego generatora (RozliczKarty3.save_tables_to_pdf) → identyczny wygląd (WeasyPrint).
-    2) Jeśli się nie uda (WeasyPrint/moduł niedostępny) → fallback ReportLab (działające pobranie).
+    Wiersze jednej karty: [(dzień, [9 tekstów])].
+    Czysta funkcja – bez ReportLab, do użycia także w raportach.
     """
-    json_path = settings.BASE_DIR / file_name
-    table_data = _load_table_from_file(file_name)
+    values = values or []
+    rows = []
+    for day, weekday, is_holiday, is_16 in days:
+        c = cell(values[day - 1] if day - 1 < len(values) else "")
+        leave = [""] * len(LEAVE_COLUMNS)
+        if c.leave is not None:
+            leave[c.leave] = "8"
+        night = "8" if c.shift == 3 else ""
+        rows.append((day, [str(day), c.text, holiday_text(c, weekday, is_holiday, is_16), night] + leave))
+    return rows
 
-    group = table_data.get("group", "Nieznana_grupa")
-    month = table_data.get("month", "Nieznany_miesiąc")
-    year  = table_data.get("year", "Nieznany_rok")
-
-    # --- ścieżka domyślnego pliku wg starej konwencji ---
-    expected_pdf = json_path.parent / f"karta_{group}_{month}_{year}.pdf"
-
-    # --- ścieżka 1: spróbuj uruchomić stary generator (WeasyPrint) ---
-    try:
-        from RozliczKarty3 import save_tables_to_pdf as _save_old  # stara funkcja
-        _save_old(str(json_path), table_data)  # generuje PDF obok JSON
-        # jeśli nazwa inna, weź pierwszy karta_*.pdf
-        if expected_pdf.exists():
-            pdf_path = expected_pdf
-        else:
-            candidates = sorted(json_path.parent.glob("karta_*.pdf"))
-            if not candidates:
-                raise FileNotFoundError("Stary generator nie zapisał pliku PDF.")
-            pdf_path = candidates[0]
-
-        # zwróć dokładnie ten plik (stary wygląd)
-        return FileResponse(open(pdf_path, "rb"), as_attachment=True, filename=pdf_path.name)
-
-    except Exception:
-        # brak WeasyPrint/modułu – przejdź do fallbacku ReportLab
-        pass
-
-    # --- ścieżka 2: fallback ReportLab (działa bez WeasyPrint) ---
-    # Uwaga: to może minimalnie różnić się wyglądem.
-    from reportlab.lib.pagesizes import A4, landscape
-    from reportlab.lib import colors
-    from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, PageBreak
-    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-    from reportlab.lib.enums import TA_CENTER, TA_LEFT
-    from reportlab.lib.units import cm
-    from reportlab.pdfbase import pdfmetrics
-    from reportlab.pdfbase.ttfonts import TTFont
-
-    # czcionka (jak w grafiku)
-    FONT_PATH = settings.BASE_DIR / "fonts" / "DejaVuSans.ttf"
-    if Path(FONT_PATH).exists():
+
+class _Layout:
+    """Style i wymiary karty – wspólne dla wszystkich stron (i dokumentów) procesu."""
+
+    _instance = None
+
+    def __init__(self):
+        from reportlab.lib import colors
+        from reportlab.lib.enums import TA_CENTER, TA_LEFT
+        from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+
+        from .fonts import font
+
+        font_name = font()
+        styles = getSampleStyleSheet()
+        self.colors = colors
+        self.font_name = font_name
+        self.title = ParagraphStyle("Title_DejaVu", parent=styles["Title"], fontName=font_name,
+                                    fontSize=12, leading=14, alignment=TA_LEFT)
+        self.heading2 = ParagraphStyle("Heading2_DejaVu", parent=styles["Heading2"], fontName=font_name,
+                                       fontSize=10, leading=12, alignment=TA_LEFT)
+        self.normal = ParagraphStyle("Normal_DejaVu", parent=styles["Normal"], fontName=font_name,
+                                     fontSize=10, leading=12)
+        self.heading4 = ParagraphStyle("Heading4_DejaVu", parent=styles["Heading4"], fontName=font_name,
+                                       fontSize=10, leading=12, alignment=TA_CENTER)
+        self.col_widths = [11 * 5] * 9
+        self.shared_paragraph = _shared_paragraph_class()
+
+    @classmethod
+    def get(cls):
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
+    def table_style(self, days):
+        """Styl tabeli jednej karty – zależy tylko od miesiąca, więc jeden na dokument."""
+        from reportlab.platypus import TableStyle
+
+        colors = self.colors
+        style = TableStyle([
+            ('SPAN', (0, 0), (-1, 0)),
+            ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),
+            ('BOX', (0, 0), (-1, 0), 1, colors.black),
+            ('ALIGN', (0, 0), (-1, 0), 'LEFT'),
+            ('SPAN', (0, 1), (-1, 1)),
+            ('BACKGROUND', (0, 1), (-1, 1), colors.lightgrey),
+            ('BOX', (0, 1), (-1, 1), 1, colors.black),
+            ('ALIGN', (0, 1), (-1, 1), 'LEFT'),
+            ('BACKGROUND', (0, 2), (-1, 2), colors.lightgrey),
+            ('TEXTCOLOR', (0, 2), (-1, 2), colors.black),
+            ('FONTNAME', (0, 2), (-1, 2), self.font_name),
+            ('FONTSIZE', (0, 2), (-1, 2), 10),
+            ('ALIGN', (0, 2), (-1, 2), 'CENTER'),
+            ('GRID', (0, 2), (-1, -1), 1, colors.black),
+            ('FONTNAME', (0, 0), (-1, -1), self.font_name),
+        ])
+        for i, (day, weekday, is_holiday, _) in enumerate(days, start=3):
+            bg = colors.red if weekday == 6 or is_holiday else colors.green if weekday == 5 else colors.white
+            style.add('BACKGROUND', (0, i), (0, i), bg)
+        summary, signature = len(days) + 3, len(days) + 4
+        style.add('BACKGROUND', (0, summary), (-1, summary), colors.lightgrey)
+        style.add('ALIGN', (0, summary), (-1, summary), 'CENTER')
+        style.add('SPAN', (0, signature), (-1, signature))
+        style.add('BOX', (0, signature), (-1, signature), 1, colors.black)
+        style.add('ALIGN', (0, signature), (-1, signature), 'LEFT')
+        style.add('LEFTPADDING', (0, signature), (-1, signature), 5)
+        style.add('BOTTOMPADDING', (0, signature), (-1, signature), 10)
+        return style
+
+
+def _shared_paragraph_class():
+    from reportlab.platypus import Paragraph
+
+    class SharedParagraph(Paragraph):
+        """
+        Akapit wstawiany w wiele komórek: łamanie wierszy dla tej samej
+        szerokości liczy się raz (Paragraph.wrap nie zależy od wysokości,
+        a tabela woła wrap() dla każdej komórki dwa razy).
+        """
+        _wrapped = None
+
+        def wrap(self, availWidth, availHeight):
+            if self._wrapped is None or self._wrapped[0] != availWidth:
+                self._wrapped = (availWidth, Paragraph.wrap(self, availWidth, availHeight))
+            return self._wrapped[1]
+
+    return SharedParagraph
+
+
+def render_karty(table_data: dict, names=None) -> bytes:
+    """
+    PDF kart dla siatki miesiąca (struktura jak w JSON-ie miesiąca).
+    `names` – tylko wybrane osoby (w kolejności z siatki); domyślnie wszystkie.
+    """
+    return render_karty_months([table_data], names)
+
+
+def render_karty_months(tables, names=None) -> bytes:
+    """Karty kilku miesięcy w jednym dokumencie (np. zakres dla jednej osoby)."""
+    from reportlab.lib.pagesizes import A4, portrait
+    from reportlab.platypus import SimpleDocTemplate, Table, Paragraph, Spacer, PageBreak
+
+    lay = _Layout.get()
+    paragraphs = {}    # treść -> akapit (wszystkie kolumny mają tę samą szerokość)
+
+    def par(text):
+        p = paragraphs.get(text)
+        if p is None:
+            p = paragraphs[text] = lay.shared_paragraph(text, lay.normal)
+        return p
+
+    header = [Paragraph(h, lay.heading4) for h in HEADERS]
+    signature = [Paragraph("Podpis wystawiającego: ____________________", lay.normal)] + [""] * 8
+
+    elements = []
+    for table_data in tables:
+        group = table_data.get("group", "NieznanaGrupa")
+        month = table_data.get("month", "NieznanyMiesiac")
+        year = table_data.get("year", "2025")
+        data = table_data.get("data", {}) or {}
+        users = [u for u in data if names is None or u in names]
+        if not users:
+            raise ValueError("Brak użytkowników w pliku JSON!")
         try:
-            pdfmetrics.registerFont(TTFont("DejaVuSans", str(FONT_PATH)))
-        except Exception:
-            pass
-
-    # style
-    styles = getSampleStyleSheet()
-    for st in styles.byName:
-        styles[st].fontName = "DejaVuSans"
-
-    title_style = ParagraphStyle(name="Title", parent=styles["Heading2"], alignment=TA_CENTER, leading=14, spaceAfter=4)
-    head_style  = ParagraphStyle(name="Head",  parent=styles["Normal"],   fontSize=8, alignment=TA_CENTER, leading=10)
-    cell_left   = ParagraphStyle(name="CellL", parent=styles["Normal"],   fontSize=8, alignment=TA_LEFT,  leading=10)
-    cell_center = ParagraphStyle(name="CellC", parent=styles["Normal"],   fontSize=8, alignment=TA_CENTER,leading=10)
-    note_style  = ParagraphStyle(name="Note",  parent=styles["Normal"],   fontSize=7, alignment=TA_LEFT,  leading=9)
-
-    # dane → wiersze
-    def normalize(data):
-        rows = []
-        if isinstance(data, dict):
-            for name, values in data.items():
-                if isinstance(values, dict):
-                    xz = str(values.get("xz", "") or "")
-                    wz = str(values.get("wz", "") or "")
-                    nd = str(values.get("nd", "") or "")
-                    note = str(values.get("note", "") or values.get("uwagi", "") or "")
-                else:
-                    xz = str(values[0]) if isinstance(values, (list, tuple)) and len(values) > 0 else ""
-                    wz = str(values[1]) if isinstance(values, (list, tuple)) and len(values) > 1 else ""
-                    nd = str(values[2]) if isinstance(values, (list, tuple)) and len(values) > 2 else ""
-                    note = str(values[3]) if isinstance(values, (list, tuple)) and len(values) > 3 else ""
-                rows.append((str(name), xz, wz, nd, note))
-        elif isinstance(data, list):
-            for item in data:
-                if not isinstance(item, dict):
-                    continue
-                name = item.get("name") or item.get("nazwisko") or item.get("pracownik") or ""
-                xz = str(item.get("xz", "") or "")
-                wz = str(item.get("wz", "") or "")
-                nd = str(item.get("nd", "") or "")
-                note = str(item.get("note", "") or item.get("uwagi", "") or "")
-                rows.append((str(name), xz, wz, nd, note))
-        return rows
-
-    rows = normalize(table_data.get("data", {}))
-
-    # układ zbliżony do starego: Lp | Nazwisko i imię | Xz | Wz | Nd | Uwagi
-    col_widths = [0.8*cm, 6.5*cm, 1.5*cm, 1.5*cm, 1.5*cm, 11.4*cm]
-    headers = ["Lp.", "Nazwisko i imię", "Xz", "Wz", "Nd", "Uwagi"]
-    header_pars = [Paragraph(h, head_style) for h in headers]
+            days = month_days(int(year), POLISH_MONTHS.get(month, 1))
+        except (TypeError, ValueError):
+            raise ValueError(f"Nieprawidłowy rok: {year}")
+
+        style = lay.table_style(days)
+        totals = karta_totals(Grid(data, len(days), users), days)
+        main_header = Paragraph(f"MIESIĘCZNA KARTA PRACY          {group.replace('_users', '')}", lay.title)
+        for user, user_totals in zip(users, totals):
+            rows, summary = karta_rows(data[user], days), summary_texts(user_totals)
+            sub = f"Nazwisko i Imię: {user}           |          Miesiąc: {month} {year}"
+            matrix = [[main_header], [Paragraph(sub, lay.heading2)], header]
+            matrix += [[par(t) for t in texts] for _, texts in rows]
+            matrix.append([par("Razem")] + [par(t) for t in summary])
+            matrix.append(signature)
+            t = Table(matrix, colWidths=lay.col_widths, hAlign='LEFT')
+            t.setStyle(style)
+            elements += [t, Spacer(1, 12), PageBreak()]
 
     buffer = io.BytesIO()
-    doc = SimpleDocTemplate(
-        buffer,
-        pagesize=landscape(A4),
-        leftMargin=0.3*cm, rightMargin=0.3*cm,
-        topMargin=0.3*cm, bottomMargin=0.3*cm,
-    )
-
-    story = []
-    chunk = 25
-    start = 0
-    lp_start = 1
-    while start < len(rows) or start == 0:
-        end = min(start + chunk, len(rows))
-        # tytuł
-        total_w = sum(col_widths)
-        title_tbl = Table([[Paragraph(f"Karty: {group} — {month} {year}", head_style)]], colWidths=[total_w])
-        title_tbl.setStyle(TableStyle([
-            ("BACKGROUND", (0, 0), (-1, -1), colors.white),
-            ("BOX", (0, 0), (-1, -1), 0.5, colors.black),
-            ("LINEBELOW", (0, 0), (-1, 0), 0.5, colors.black),
-            ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
-            ("ALIGN", (0, 0), (-1, -1), "CENTER"),
-        ]))
-        story.append(title_tbl)
-
-        matrix = [header_pars]
-        page_rows = rows[start:end]
-        for i, (name, xz, wz, nd, note) in enumerate(page_rows, start=lp_start):
-            matrix.append([
-                Paragraph(str(i), cell_center),
-                Paragraph(name, cell_left),
-                Paragraph(xz, cell_center),
-                Paragraph(wz, cell_center),
-                Paragraph(nd, cell_center),
-                Paragraph(note, cell_left),
-            ])
-        # dopełnij do stałej liczby wierszy
-        while len(matrix) - 1 < chunk:
-            i = lp_start + (len(matrix) - 1)
-            matrix.append([
-                Paragraph(str(i), cell_center),
-                Paragraph("", cell_left),
-                Paragraph("", cell_center),
-                Paragraph("", cell_center),
-                Paragraph("", cell_center),
-                Paragraph("", cell_left),
-            ])
-
-        # stopka
-        footer = Paragraph(
-            "Nd — liczba przepracowanych niedziel/świąt w poprzednim miesiącu. Xz/Wz zgodnie z regulaminem.",
-            note_style,
-        )
-        matrix.append([footer] + [Paragraph("", cell_left)]*(len(col_widths)-1))
-
-        nrows = len(matrix)
-        row_heights = [0.6*cm] + [0.38*cm]*(nrows - 2) + [0.5*cm]
-
-        tbl = Table(matrix, colWidths=col_widths, rowHeights=row_heights, repeatRows=1)
-        tbl.setStyle(TableStyle([
-            ("BOX", (0, 0), (-1, -1), 0.5, colors.black),
-            ("INNERGRID", (0, 0), (-1, -2), 0.25, colors.grey),
-            ("BACKGROUND", (0, 0), (-1, 0), colors.lightgrey),
-            ("VALIGN", (0, 0), (-1, 0), "MIDDLE"),
-            ("ALIGN", (0, 0), (-1, 0), "CENTER"),
-            ("VALIGN", (0, 1), (-1, -2), "TOP"),
-            ("LEFTPADDING", (0, 0), (-1, -1), 2),
-            ("RIGHTPADDING", (0, 0), (-1, -1), 2),
-            ("TOPPADDING", (0, 0), (-1, -1), 2),
-            ("BOTTOMPADDING", (0, 0), (-1, -1), 2),
-            ("SPAN", (0, -1), (-1, -1)),
-            ("BACKGROUND", (0, -1), (-1, -1), colors.white),
-            ("BOX", (0, -1), (-1, -1), 0.5, colors.black),
-        ]))
-        story.append(tbl)
-
-        start += chunk
-        lp_start += chunk
-        if start < len(rows):
-            story.append(PageBreak())
-
-    doc.build(story)
-    buffer.seek(0)
-
-    filename = f"karta_{str(group).replace(' ', '_')}_{month}_{year}.pdf"
-    return FileResponse(buffer, as_attachment=True, filename=filename)
+    doc = SimpleDocTemplate(buffer, pagesize=portrait(A4),
+                            leftMargin=30, rightMargin=30, topMargin=30, bottomMargin=30)
+    doc.build(elements)
+    return buffer.getvalue()
+
+
+def _load_table_from_file(file_name: str):
+    path = settings.DATA_DIR / file_name
+    return json.loads(read_text(path))
+
+
+@instrumented("pdf_karty")
+def generate_karty_pdf_response(file_name: str) -> FileResponse:
+    """Karty całego działu dla DATA_DIR/file_name jako załącznik PDF."""
+    table_data = _load_table_from_file(file_name)
+    group = table_data.get("group", "Nieznana_grupa")
+    month = table_data.get("month", "Nieznany_miesiąc")
+    year = table_data.get("year", "Nieznany_rok")
+    pdf = render_karty(table_data)
+    return FileResponse(io.BytesIO(pdf), as_attachment=True, filename=f"karta_{group}_{month}_{year}.pdf")
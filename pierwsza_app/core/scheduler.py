@@ -0,0 +1,352 @@
+# pierwsza_app/core/scheduler.py
+"""
+Generator propozycji grafiku miesięcznego (siatka edit_table).
+
+Wejście:
+  - employees:  [{"name", "position", "skills": {nazwa: bool}}] – skład działu,
+  - demand:     {"1": [stanowiska], "2": [...], "3": [...]} – ScheduleTemplate.positions
+                dla każdej zmiany; każde stanowisko to jeden slot dziennie,
+  - existing:   obecna siatka {name: [tokeny]} – niepuste komórki są stałe
+                (L4 „C”, urlopy, już wpisane zmiany),
+  - special_days: dni miesiąca będące niedzielą lub świętem,
+  - past_special: {name: liczba niedziel/świąt przepracowanych w poprzednich miesiącach}.
+
+Wyjście: Proposal – tylko komórki, które w `existing` były puste.
+
+Algorytm: zachłanny start, potem lokalne przeszukiwanie (wyżarzanie) z ruchami
+„inna osoba na slocie” i „zamiana dwóch osób tego samego dnia”. Koszt ruchu
+liczony jest przyrostowo – zależy tylko od dwóch osób i sąsiednich dni – więc
+jedna iteracja to O(1) niezależnie od wielkości działu. Pętla kończy się po
+wyczerpaniu budżetu czasu albo gdy koszt spadnie do zera.
+
+Reguły twarde: jedna zmiana dziennie, stałe komórki nietykalne, odpoczynek
+dobowy (po zmianie 2 nie ma 1, po nocce 3 nie ma 1 ani 2 następnego dnia),
+najwyżej HARD_CONSEC dni pracy z rzędu,
+stanowisko slotu musi pasować do stanowiska lub umiejętności osoby.
+Reguły miękkie (wagi W_*): obsadzenie slotów, norma zmian w miesiącu,
+maks. dni pracy z rzędu, równy rozkład niedziel/świąt z uwzględnieniem historii.
+"""
+import calendar
+import math
+import random
+import time
+from dataclasses import dataclass, field
+
+from .labour_rules import MAX_CONSECUTIVE_DAYS, MIN_DAILY_REST, rest_hours
+
+SHIFTS = ("1", "2", "3")
+# (zmiana wczoraj, zmiana dziś) niedozwolone – mniej niż 11 h odpoczynku: (2,1), (3,1), (3,2)
+FORBIDDEN_NEXT = {(a, b) for a in SHIFTS for b in SHIFTS if rest_hours(a, b) < MIN_DAILY_REST}
+
+W_UNCOVERED = 1000.0   # pusty slot – dziura w obsadzie jest gorsza niż nadgodziny
+W_TARGET = 4.0         # (liczba zmian - norma)^2
+W_SPECIAL = 2.0        # (niedziele/święta łącznie z historią)^2
+W_CONSEC = 20.0        # każdy dzień ponad MAX_CONSEC w ciągu
+MAX_CONSEC = 5
+HARD_CONSEC = MAX_CONSECUTIVE_DAYS   # dłuższy ciąg nie wchodzi w grę (odpoczynek tygodniowy)
+
+
+@dataclass
+class Proposal:
+    grid: dict                      # name -> [token lub ""] (tylko zaproponowane komórki)
+    uncovered: list                 # [(dzień, zmiana, stanowisko)]
+    cost: float
+    iterations: int
+    elapsed: float
+    stats: dict = field(default_factory=dict)   # name -> {"shifts", "target", "special"}
+
+    def as_json(self):
+        return {
+            "grid": self.grid,
+            "uncovered": [{"day": d, "shift": s, "position": p} for d, s, p in self.uncovered],
+            "cost": round(self.cost, 2),
+            "iterations": self.iterations,
+            "elapsed_ms": round(self.elapsed * 1000, 1),
+            "stats": self.stats,
+        }
+
+
+def _norm(s):
+    return (s or "").strip().casefold()
+
+
+def _eligible(employees, label):
+    """Indeksy osób pasujących do stanowiska (po stanowisku albo umiejętności); pusta etykieta = każdy."""
+    key = _norm(label)
+    if not key:
+        return list(range(len(employees)))
+    out = []
+    for i, e in enumerate(employees):
+        if _norm(e.get("position")) == key or any(v and _norm(k) == key for k, v in (e.get("skills") or {}).items()):
+            out.append(i)
+    return out
+
+
+class _Solver:
+    def __init__(self, employees, demand, existing, year, month, special_days, past_special, seed):
+        self.rnd = random.Random(seed)
+        self.names = [e["name"] for e in employees]
+        self.E = len(employees)
+        self.D = calendar.monthrange(int(year), int(month))[1]
+        D = self.D
+        self.special = [False] * (D + 2)
+        for d in special_days:
+            if 1 <= d <= D:
+                self.special[d] = True
+
+        # stałe komórki; dni 0 i D+1 to wartownicy (brak zmiany)
+        self.fixed = []
+        for n in self.names:
+            row = list(existing.get(n) or [])
+            row = [(row[d - 1] if d - 1 < len(row) else "") or "" for d in range(1, D + 1)]
+            self.fixed.append([""] + [t.strip().upper() for t in row] + [""])
+
+        # sloty: (dzień, zmiana, etykieta); eligible per etykieta liczone raz
+        cache = {}
+        self.slots = []
+        self.slot_elig = []
+        for d in range(1, D + 1):
+            for s in SHIFTS:
+                for label in demand.get(s) or []:
+                    if label not in cache:
+                        cache[label] = _eligible(employees, label)
+                    self.slots.append((d, s, label))
+                    self.slot_elig.append(cache[label])
+        self.assign = [-1] * len(self.slots)
+        self.day_slot = [[-1] * (D + 2) for _ in range(self.E)]
+
+        # zmiana danego dnia (stała albo przydzielona) – do reguł odpoczynku i ciągów
+        self.shift = [[t if t in SHIFTS else "" for t in self.fixed[e]] for e in range(self.E)]
+        self.cnt = [sum(1 for t in self.shift[e] if t) for e in range(self.E)]
+        self.spec = [sum(1 for d in range(1, D + 1) if self.shift[e][d] and self.special[d]) for e in range(self.E)]
+        self.past = [int((past_special or {}).get(n, 0)) for n in self.names]
+
+        # norma: dni pn–pt bez świąt, pomniejszona o nieobecności w te dni
+        first_wd = calendar.monthrange(int(year), int(month))[0]
+        norm_days = [d for d in range(1, D + 1) if (first_wd + d - 1) % 7 < 5 and not self.special[d]]
+        self.target = []
+        for e in range(self.E):
+            absent = sum(1 for d in norm_days if self.fixed[e][d] and self.fixed[e][d] not in SHIFTS)
+            self.target.append(max(0, len(norm_days) - absent))
+
+    # ---- koszty cząstkowe ----
+    def _run_pen(self, e, d):
+        """Kara za ciąg dni pracy przechodzący przez d (liczona dla całego ciągu)."""
+        sh = self.shift[e]
+        if not sh[d]:
+            return 0.0
+        a = d
+        while a - 1 >= 1 and sh[a - 1]:
+            a -= 1
+        b = d
+        while b + 1 <= self.D and sh[b + 1]:
+            b += 1
+        return W_CONSEC * max(0, (b - a + 1) - MAX_CONSEC)
+
+    def _emp_cost(self, e):
+        return (W_TARGET * (self.cnt[e] - self.target[e]) ** 2
+                + W_SPECIAL * (self.past[e] + self.spec[e]) ** 2)
+
+    def _local_cost(self, e, d):
+        # ciągi wokół d: po zmianie d mogą się złączyć/rozdzielić, liczymy sąsiadów
+        return (self._emp_cost(e) + self._run_pen(e, d)
+                + (self._run_pen(e, d - 1) if not self.shift[e][d] else 0.0)
+                + (self._run_pen(e, d + 1) if not self.shift[e][d] else 0.0))
+
+    def _can_take(self, e, d, s):
+        if self.fixed[e][d] or self.day_slot[e][d] != -1:
+            return False
+        sh = self.shift[e]
+        if (sh[d - 1], s) in FORBIDDEN_NEXT or (s, sh[d + 1]) in FORBIDDEN_NEXT:
+            return False
+        a = d
+        while a - 1 >= 1 and sh[a - 1]:
+            a -= 1
+        b = d
+        while b + 1 <= self.D and sh[b + 1]:
+            b += 1
+        return b - a + 1 <= HARD_CONSEC
+
+    def _set(self, e, d, s, slot):
+        self.shift[e][d] = s
+        self.day_slot[e][d] = slot
+        self.cnt[e] += 1
+        if self.special[d]:
+            self.spec[e] += 1
+
+    def _unset(self, e, d):
+        self.shift[e][d] = ""
+        self.day_slot[e][d] = -1
+        self.cnt[e] -= 1
+        if self.special[d]:
+            self.spec[e] -= 1
+
+    def _delta_take(self, e, d, s, slot):
+        before = self._local_cost(e, d)
+        self._set(e, d, s, slot)
+        after = self._local_cost(e, d)
+        self._unset(e, d)
+        return after - before
+
+    def _delta_drop(self, e, d):
+        s, slot = self.shift[e][d], self.day_slot[e][d]
+        before = self._local_cost(e, d)
+        self._unset(e, d)
+        after = self._local_cost(e, d)
+        self._set(e, d, s, slot)
+        return after - before
+
+    def total_cost(self):
+        c = W_UNCOVERED * sum(1 for a in self.assign if a == -1)
+        for e in range(self.E):
+            c += self._emp_cost(e)
+            d = 1
+            while d <= self.D:
+                if self.shift[e][d]:
+                    b = d
+                    while b + 1 <= self.D and self.shift[e][b + 1]:
+                        b += 1
+                    c += W_CONSEC * max(0, (b - d + 1) - MAX_CONSEC)
+                    d = b + 1
+                else:
+                    d += 1
+        return c
+
+    # ---- start zachłanny ----
+    def greedy(self, sample=40):
+        """Najpierw sloty z najmniejszą liczbą kandydatów; dla dużych działów próbka kandydatów."""
+        order = sorted(range(len(self.slots)), key=lambda i: len(self.slot_elig[i]))
+        for i in order:
+            d, s, _ = self.slots[i]
+            elig = self.slot_elig[i]
+            if len(elig) > sample:
+                elig = self.rnd.sample(elig, sample)
+            best, best_delta = -1, 0.0
+            for e in elig:
+                if self._can_take(e, d, s):
+                    delta = self._delta_take(e, d, s, i)
+                    if best == -1 or delta < best_delta:
+                        best, best_delta = e, delta
+            if best != -1 and best_delta < W_UNCOVERED:
+                self.assign[i] = best
+                self._set(best, d, s, i)
+
+    # ---- przeszukiwanie lokalne ----
+    def search(self, budget, cost):
+        if not self.slots:
+            return cost, 0
+        t0 = time.perf_counter()
+        deadline = t0 + budget
+        t_start, t_end = 50.0, 0.05
+        temp = t_start
+        it = 0
+        rnd = self.rnd
+        n_slots = len(self.slots)
+        best_cost, best_assign = cost, self.assign[:]
+        while cost > 1e-9:
+            it += 1
+            if it & 255 == 0:
+                if cost < best_cost:
+                    best_cost, best_assign = cost, self.assign[:]
+                now = time.perf_counter()
+                if now >= deadline:
+                    break
+                frac = (now - t0) / budget
+                temp = t_start * (t_end / t_start) ** frac
+            i = rnd.randrange(n_slots)
+            d, s, _ = self.slots[i]
+            elig = self.slot_elig[i]
+            if not elig:
+                continue
+            old = self.assign[i]
+            if old != -1 and rnd.random() < 0.3:
+                # zamiana: osoba z tego slotu <-> osoba z innego slotu tego samego dnia
+                j = self.day_slot[rnd.choice(elig)][d]
+                if j == -1 or j == i:
+                    continue
+                other = self.assign[j]
+                s2 = self.slots[j][1]
+                if old not in self.slot_elig[j]:
+                    continue
+                delta = self._delta_drop(old, d) + self._delta_drop(other, d)
+                self._unset(old, d)
+                self._unset(other, d)
+                ok = self._can_take(old, d, s2) and self._can_take(other, d, s)
+                if ok:
+                    delta += self._delta_take(old, d, s2, j)
+                    self._set(old, d, s2, j)
+                    delta += self._delta_take(other, d, s, i)
+                    self._unset(old, d)
+                if ok and (delta <= 0 or rnd.random() < math.exp(-delta / temp)):
+                    self._set(old, d, s2, j)
+                    self._set(other, d, s, i)
+                    self.assign[i], self.assign[j] = other, old
+                    cost += delta
+                else:
+                    self._set(old, d, s, i)
+                    self._set(other, d, s2, j)
+                continue
+
+            cand = rnd.choice(elig)
+            if cand == old:
+                # „zwolnij slot” – czasem opłaca się zostawić lukę (np. przekroczona norma)
+                delta = self._delta_drop(old, d) + W_UNCOVERED
+                if delta <= 0 or rnd.random() < math.exp(-delta / temp):
+                    self._unset(old, d)
+                    self.assign[i] = -1
+                    cost += delta
+                continue
+            if not self._can_take(cand, d, s):
+                continue
+            delta = 0.0
+            if old != -1:
+                delta += self._delta_drop(old, d)
+                self._unset(old, d)
+            else:
+                delta -= W_UNCOVERED
+            delta += self._delta_take(cand, d, s, i)
+            if delta <= 0 or rnd.random() < math.exp(-delta / temp):
+                self._set(cand, d, s, i)
+                self.assign[i] = cand
+                cost += delta
+            elif old != -1:
+                self._set(old, d, s, i)
+        if best_cost < cost:
+            self._restore(best_assign)
+            cost = best_cost
+        return cost, it
+
+    def _restore(self, assign):
+        """Odtwarza stan pomocniczy (zmiany, liczniki) z listy przydziałów."""
+        for e in range(self.E):
+            for d in range(1, self.D + 1):
+                if self.day_slot[e][d] != -1:
+                    self._unset(e, d)
+        self.assign = list(assign)
+        for i, e in enumerate(self.assign):
+            if e != -1:
+                d, s, _ = self.slots[i]
+                self._set(e, d, s, i)
+
+    def result(self):
+        grid = {n: [""] * self.D for n in self.names}
+        for i, e in enumerate(self.assign):
+            if e != -1:
+                d, s, _ = self.slots[i]
+                grid[self.names[e]][d - 1] = s
+        uncovered = [self.slots[i] for i, e in enumerate(self.assign) if e == -1]
+        stats = {n: {"shifts": self.cnt[e], "target": self.target[e], "special": self.spec[e],
+                     "special_past": self.past[e]} for e, n in enumerate(self.names)}
+        return grid, uncovered, stats
+
+
+def generate_month(employees, demand, existing, year, month, special_days=(), past_special=None,
+                   budget=3.0, seed=None):
+    """Zwraca Proposal dla miesiąca `month` (1–12). budget – sekundy na przeszukiwanie lokalne."""
+    t0 = time.perf_counter()
+    solver = _Solver(employees, demand, existing or {}, year, month, special_days, past_special, seed)
+    solver.greedy()
+    cost, iterations = solver.search(max(0.0, float(budget)), solver.total_cost())
+    grid, uncovered, stats = solver.result()
+    return Proposal(grid=grid, uncovered=uncovered, cost=solver.total_cost(), iterations=iterations,
+                    elapsed=time.perf_counter() - t0, stats=stats)
@@ -0,0 +1,331 @@
+# pierwsza_app/core/search.py
+"""
+Wyszukiwarka personelu wszystkich działów: imię i nazwisko, stanowisko,
+telefon, e-mail, umiejętności i nazwa działu.
+
+Indeks odwrócony w pamięci procesu:
+  * tekst jest normalizowany (fold): małe litery, bez polskich znaków
+    („Łucja Żak” -> „lucja zak”), telefon dodatkowo jako same cyfry;
+  * terms: słowo -> {emp_id: waga pola} – trafienie dokładne;
+  * sorted_terms (bisect) – trafienie prefiksem („kow” -> „kowalska”);
+  * grams: trygram -> słowa – trafienie przybliżone (literówki, Jaccard).
+Każde słowo zapytania musi coś trafić (AND); wynik to suma wag pól
+przemnożonych przez jakość trafienia, remisy po nazwisku. Zapytanie bez
+żadnego słowa dłuższego niż jedna litera nie zwraca nic.
+
+Indeks budujemy raz (pierwsze zapytanie) i aktualizujemy przyrostowo –
+po dziale. Zapisy składu (utils.*) wołają touch(dział): w katalogu
+DATA_DIR/roster_stamps/ podmieniany jest plik działu, co zmienia też
+mtime katalogu. Zapytanie robi jeden stat() katalogu; gdy się zmienił,
+przegląda stemple i ponownie indeksuje tylko zmienione działy – także
+w innych workerach niż ten, który zapisał.
+"""
+import heapq
+import os
+import re
+import threading
+import time
+import unicodedata
+from bisect import bisect_left
+from collections import defaultdict
+from functools import lru_cache
+from pathlib import Path
+from typing import NamedTuple
+
+from . import storage
+
+# waga pola w wyniku
+FIELDS = {"name": 3.0, "position": 1.5, "skills": 1.2, "email": 1.0, "contact": 1.0, "group": 0.5}
+EXACT, PREFIX = 1.0, 0.7
+FUZZY = 0.5                 # mnożnik podobieństwa trygramów
+MIN_SIMILARITY = 0.4
+MIN_QUERY = 2               # zapytanie z samych pojedynczych liter nie zwraca nic (prefiks „a” = pół działu)
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+
+_FOLD = str.maketrans("ąćęłńóśźżĄĆĘŁŃÓŚŹŻ", "acelnoszzACELNOSZZ")
+_WORD = re.compile(r"[0-9a-z]+")
+_PHONE_GAPS = re.compile(r"(?<=\d)[\s-]+(?=\d)")      # „517 704-185” -> „517704185”
+
+
+def fold(text) -> str:
+    """Małe litery bez znaków diakrytycznych (ł -> l, ż -> z, é -> e)."""
+    text = str(text or "").translate(_FOLD)
+    if not text.isascii():
+        text = "".join(ch for ch in unicodedata.normalize("NFKD", text) if not unicodedata.combining(ch))
+    return text.casefold()
+
+
+@lru_cache(maxsize=8192)
+def words(text) -> tuple:
+    return tuple(_WORD.findall(fold(text)))
+
+
+def trigrams(word) -> set:
+    w = f" {word} "
+    return {w[i:i + 3] for i in range(len(w) - 2)}
+
+
+class Doc(NamedTuple):
+    id: str
+    group: str
+    name: str
+    position: str
+    contact: str
+    email: str
+    skills: tuple
+
+
+def _field_words(doc: Doc):
+    """(pole, słowa) dokumentu; telefon także jako ciąg cyfr."""
+    yield "name", words(doc.name)
+    yield "position", words(doc.position)
+    yield "skills", [w for s in doc.skills for w in words(s)]
+    yield "email", words(doc.email)
+    digits = re.sub(r"\D", "", doc.contact or "")
+    yield "contact", words(doc.contact) + ((digits,) if digits else ())
+    yield "group", words(doc.group)
+
+
+class StaffIndex:
+    def __init__(self):
+        self.docs = {}                          # emp_id -> Doc
+        self.by_group = defaultdict(set)        # dział -> {emp_id}
+        self.terms = {}                         # słowo -> {emp_id: waga}
+        self.doc_terms = {}                     # emp_id -> {słowo}
+        self.sorted_terms = []
+        self.grams = defaultdict(set)           # trygram -> {słowo}
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self.docs)
+
+    # ---- zmiany ----
+
+    def _add(self, doc: Doc, new_terms=None):
+        """new_terms – lista do zebrania nowych słów (rebuild sortuje je raz na końcu)."""
+        self.docs[doc.id] = doc
+        self.by_group[doc.group].add(doc.id)
+        mine = self.doc_terms[doc.id] = set()
+        for field, ws in _field_words(doc):
+            weight = FIELDS[field]
+            for w in ws:
+                postings = self.terms.get(w)
+                if postings is None:
+                    postings = self.terms[w] = {}
+                    if new_terms is not None:
+                        new_terms.append(w)
+                    else:
+                        i = bisect_left(self.sorted_terms, w)
+                        if i == len(self.sorted_terms) or self.sorted_terms[i] != w:
+                            self.sorted_terms.insert(i, w)
+                    for g in trigrams(w):
+                        self.grams[g].add(w)
+                if postings.get(doc.id, 0) < weight:
+                    postings[doc.id] = weight
+                mine.add(w)
+
+    def _remove(self, emp_id):
+        doc = self.docs.pop(emp_id, None)
+        if doc is None:
+            return
+        self.by_group[doc.group].discard(emp_id)
+        for w in self.doc_terms.pop(emp_id, ()):
+            postings = self.terms.get(w)
+            if postings is not None:
+                postings.pop(emp_id, None)
+                # puste słowa zostają w sorted_terms/grams – bez kosztownego usuwania z listy
+
+    def replace_group(self, group, docs):
+        """Podmienia wszystkie dokumenty działu (po zapisie składu)."""
+        with self._lock:
+            for emp_id in list(self.by_group.get(group, ())):
+                self._remove(emp_id)
+            for doc in docs:
+                self._remove(doc.id)            # przeniesienie z innego działu
+                self._add(doc)
+
+    def rebuild(self, docs):
+        with self._lock:
+            self.__init__()
+            new_terms = []
+            for doc in docs:
+                self._add(doc, new_terms)
+            self.sorted_terms = sorted(new_terms)
+
+    # ---- wyszukiwanie ----
+
+    def _matches(self, word):
+        """{emp_id: wynik} dla jednego słowa zapytania: dokładne > prefiks > trygramy."""
+        out = {}
+
+        def take(term, quality):
+            postings = self.terms.get(term, {})
+            if not out and quality == EXACT:
+                out.update(postings)
+                return
+            for emp_id, weight in postings.items():
+                score = weight * quality
+                if score > out.get(emp_id, 0):
+                    out[emp_id] = score
+
+        take(word, EXACT)
+        i = bisect_left(self.sorted_terms, word)
+        while i < len(self.sorted_terms) and self.sorted_terms[i].startswith(word):
+            if self.sorted_terms[i] != word:
+                take(self.sorted_terms[i], PREFIX)
+            i += 1
+        # trygramy tylko, gdy słowo nie trafiło wprost ani prefiksem (literówka)
+        if not out and len(word) >= 3:
+            grams = trigrams(word)
+            shared = defaultdict(int)
+            for g in grams:
+                for term in self.grams.get(g, ()):
+                    shared[term] += 1
+            for term, n in shared.items():
+                sim = n / (len(grams) + len(term) - n)    # słowo ma len(term) trygramów
+                if sim >= MIN_SIMILARITY:
+                    take(term, FUZZY * sim)
+        return out
+
+    def search(self, query, limit=DEFAULT_LIMIT, groups=None):
+        """(liczba trafień, [(wynik, Doc)] – najlepsze `limit`); groups – tylko te działy."""
+        ws = words(_PHONE_GAPS.sub("", str(query or "")))
+        if not ws or max(map(len, ws)) < MIN_QUERY:
+            return 0, []
+        with self._lock:
+            scores = None
+            for w in dict.fromkeys(ws):
+                found = self._matches(w)
+                if scores is None:
+                    scores = found
+                else:
+                    scores = {emp_id: s + found[emp_id] for emp_id, s in scores.items() if emp_id in found}
+                if not scores:
+                    return 0, []
+            hits = [(s, self.docs[emp_id]) for emp_id, s in scores.items()]
+        if groups is not None:
+            groups = set(groups)
+            hits = [h for h in hits if h[1].group in groups]
+        return len(hits), heapq.nsmallest(limit, hits, key=lambda h: (-h[0], h[1].name, h[1].group))
+
+
+# ---- źródło danych i świeżość ----
+
+def touch(root, *groups):
+    """Oznacza składy działów jako zmienione (dla wszystkich procesów)."""
+    d = storage.roster_stamps_dir(root)
+    d.mkdir(parents=True, exist_ok=True)
+    for group in set(groups):
+        if not group:
+            continue
+        path = d / storage.roster_stamp_name(group)
+        tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        tmp.write_text(f"{time.time_ns()}\n", encoding="utf-8")
+        os.replace(tmp, path)
+
+
+# mtime systemu plików ma ziarno kilku ms – dwa zapisy tuż po sobie mogą
+# dać ten sam stempel. Świeżym (młodszym niż RACY_NS) nie ufamy: katalog
+# przeglądamy wtedy zawsze, a z pliku czytamy treść (time_ns zapisu).
+RACY_NS = 2_000_000_000
+
+
+def read_stamps(root) -> dict:
+    """{dział: stempel} stempli składu."""
+    out = {}
+    try:
+        entries = list(os.scandir(storage.roster_stamps_dir(root)))
+    except FileNotFoundError:
+        return out
+    racy = time.time_ns() - RACY_NS
+    for e in entries:
+        group = storage.roster_stamp_group(e.name)
+        if group is not None:
+            try:
+                mtime = e.stat().st_mtime_ns
+                out[group] = (mtime, Path(e.path).read_text(encoding="utf-8").strip() if mtime > racy else "")
+            except FileNotFoundError:
+                pass
+    return out
+
+
+def _dir_stamp(root):
+    try:
+        st = storage.roster_stamps_dir(root).stat()
+    except FileNotFoundError:
+        return None
+    if st.st_mtime_ns > time.time_ns() - RACY_NS:
+        return None                     # świeży – nie pomijamy przeglądu stempli
+    return (st.st_mtime_ns, st.st_ino)
+
+
+def load_docs(groups=None):
+    """Dokumenty z bazy (wszystkie albo wybranych działów) – dwa zapytania."""
+    from ..models import Employee
+
+    qs = Employee.objects.all()
+    if groups is not None:
+        qs = qs.filter(department__name__in=list(groups))
+    skills = defaultdict(list)
+    for emp_id, skill in (Employee.skills.through.objects.filter(employee__in=qs)
+                          .order_by("skill_id").values_list("employee__emp_id", "skill__name")):
+        skills[emp_id].append(skill)
+    rows = qs.order_by("department_id", "order", "id").values_list(
+        "emp_id", "department__name", "name", "position", "contact", "email")
+    return [Doc(r[0], r[1], r[2], r[3], r[4], r[5], tuple(skills.get(r[0], ()))) for r in rows]
+
+
+class LiveIndex:
+    """
+    Indeks trzymany w zgodzie ze stemplami składu w DATA_DIR.
+
+    factory() tworzy pusty indeks z metodami rebuild(elementy)
+    i replace_group(dział, elementy); load(groups=None) czyta elementy
+    (z atrybutem .group) z bazy – wszystkie albo tylko zmienionych działów.
+    """
+
+    def __init__(self, factory=StaffIndex, load=load_docs):
+        self.factory, self.load = factory, load
+        self.index = factory()
+        self._built = False
+        self._dir = None
+        self._stamps = {}
+        self._lock = threading.Lock()
+
+    def refresh(self, root):
+        dir_stamp = _dir_stamp(root)
+        if self._built and dir_stamp is not None and dir_stamp == self._dir:
+            return self.index
+        with self._lock:
+            if self._built and dir_stamp is not None and dir_stamp == self._dir:
+                return self.index
+            stamps = read_stamps(root)
+            if not self._built:
+                self.index.rebuild(self.load())
+                self._built = True
+            else:
+                changed = [g for g, s in stamps.items() if self._stamps.get(g) != s]
+                if changed:
+                    items = defaultdict(list)
+                    for item in self.load(changed):
+                        items[item.group].append(item)
+                    for g in changed:
+                        self.index.replace_group(g, items.get(g, ()))
+            self._dir, self._stamps = dir_stamp, stamps
+        return self.index
+
+    def reset(self):
+        with self._lock:
+            self.index = self.factory()
+            self._built = False
+            self._dir, self._stamps = None, {}
+
+
+live = LiveIndex()
+
+
+def as_dict(score, doc: Doc) -> dict:
+    return {"id": doc.id, "name": doc.name, "group": doc.group, "position": doc.position,
+            "contact": doc.contact, "email": doc.email, "skills": list(doc.skills),
+            "score": round(score, 3)}
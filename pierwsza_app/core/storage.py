@@ -0,0 +1,215 @@
+# pierwsza_app/core/storage.py
+"""
+Układ plików w DATA_DIR: jeden katalog na dział, siatki miesięcy w podkatalogach lat.
+
+    departments/<dział>/users.json              kopia składu (dane są w bazie)
+    departments/<dział>/grafik_plan.json        kopia planu dziennego (dane są w bazie)
+    departments/<dział>/<rok>/<miesiąc>.json    siatka miesiąca
+    departments/<dział>/<rok>/karta_*.pdf       karty ze starego generatora
+    departments/<dział>/<rok>/archive.json      zamknięty rok (core/archive.py) zamiast siatek
+    departments/<dział>/<rok>/events/<miesiąc>.jsonl      zdarzenia zmian komórek (core/events.py)
+    departments/<dział>/<rok>/snapshots/<miesiąc>/*.json  migawki siatki do odtwarzania stanu
+    departments/<dział>/autosave.log            dziennik autosave czekający na zapis (core/writebehind.py)
+    departments/<dział>/autosave.rejected       edycje z dziennika, których nie dało się zapisać (np. rok zamknięty)
+    departments/<dział>/.lock                   blokada zapisu siatek działu (locked())
+    departments/<dział>/.events.lock            blokada dopisywania zdarzeń (locked(..., name="events"))
+    roster_stamps/<dział>.stamp                 stempel zmiany składu (indeks wyszukiwarki, core/search.py)
+    history/, EMP_INDEX.json, groups.json, skills_catalog.json – bez zmian
+
+Zmiana nazwy działu to jedno rename() katalogu, usunięcie – jedno rmtree(),
+bez przeglądania wszystkich plików i bez łapania działów o wspólnym prefiksie.
+Funkcje przyjmują root, żeby generator danych syntetycznych (inny DATA_DIR
+niż bieżący proces) i migrator korzystały z tego samego układu.
+"""
+import re
+import shutil
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:             # Windows (serwer deweloperski) – blokada tylko w obrębie procesu
+    fcntl = None
+
+DEPARTMENTS = "departments"
+ROSTER_STAMPS = "roster_stamps"
+MONTHS = ("Styczeń", "Luty", "Marzec", "Kwiecień", "Maj", "Czerwiec",
+          "Lipiec", "Sierpień", "Wrzesień", "Październik", "Listopad", "Grudzień")
+
+
+def department_dir(root, group: str) -> Path:
+    group = str(group)
+    if not group.strip() or group in (".", "..") or "/" in group or "\\" in group:
+        raise ValueError(f"Nieprawidłowa nazwa działu: {group!r}")
+    return Path(root) / DEPARTMENTS / group
+
+
+def users_file(root, group: str) -> Path:
+    return department_dir(root, group) / "users.json"
+
+
+def plan_file(root, group: str) -> Path:
+    return department_dir(root, group) / "grafik_plan.json"
+
+
+def year_dir(root, group: str, year) -> Path:
+    return department_dir(root, group) / str(year)
+
+
+def month_file(root, group: str, month: str, year) -> Path:
+    return year_dir(root, group, year) / f"{month}.json"
+
+
+def events_file(root, group: str, month: str, year) -> Path:
+    return year_dir(root, group, year) / "events" / f"{month}.jsonl"
+
+
+def snapshots_dir(root, group: str, month: str, year) -> Path:
+    return year_dir(root, group, year) / "snapshots" / month
+
+
+def archive_file(root, group: str, year) -> Path:
+    return year_dir(root, group, year) / "archive.json"
+
+
+def autosave_log(root, group: str) -> Path:
+    return department_dir(root, group) / "autosave.log"
+
+
+def autosave_rejected(root, group: str) -> Path:
+    return department_dir(root, group) / "autosave.rejected"
+
+
+def lock_file(root, group: str, name: str = "") -> Path:
+    return department_dir(root, group) / (f".{name}.lock" if name else ".lock")
+
+
+_held = threading.local()           # ścieżka blokady -> [tryb, głębokość] w bieżącym wątku
+_local_locks = {}
+_local_guard = threading.Lock()
+
+
+@contextmanager
+def locked(root, group: str, shared=False, name=""):
+    """
+    Blokada zapisu siatek działu – wspólna dla wątków i procesów (flock).
+    shared=True: wielu naraz (dopisywanie do dziennika autosave); bez –
+    na wyłączność (zapis plików miesięcy). W obrębie wątku zagnieżdża się.
+    name – osobna blokada działu (np. "events"); zawsze brana wewnątrz
+    głównej, nigdy odwrotnie.
+    """
+    path = lock_file(root, group, name)
+    held = getattr(_held, "paths", None)
+    if held is None:
+        held = _held.paths = {}
+    mine = held.get(path)
+    if mine is not None:
+        if mine[0] and not shared:
+            raise RuntimeError(f"Blokada działu {group}: nie można podnieść współdzielonej do wyłącznej.")
+        mine[1] += 1
+        try:
+            yield
+        finally:
+            mine[1] -= 1
+        return
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if fcntl is None:
+        with _local_guard:
+            lock = _local_locks.setdefault(path, threading.Lock())
+        with lock:
+            held[path] = [shared, 1]
+            try:
+                yield
+            finally:
+                del held[path]
+        return
+    with open(path, "a+b") as f:
+        fcntl.flock(f, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        held[path] = [shared, 1]
+        try:
+            yield
+        finally:
+            del held[path]
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def roster_stamps_dir(root) -> Path:
+    return Path(root) / ROSTER_STAMPS
+
+
+def roster_stamp_name(group: str) -> str:
+    return department_dir(".", group).name + ".stamp"
+
+
+def roster_stamp_group(file_name: str):
+    """Nazwa działu z nazwy pliku stempla albo None (plik tymczasowy / obcy)."""
+    return file_name[:-len(".stamp")] if file_name.endswith(".stamp") else None
+
+
+def department_years(root, group: str) -> list[int]:
+    """Lata, dla których dział ma siatki (jedno listowanie katalogu działu)."""
+    d = department_dir(root, group)
+    if not d.is_dir():
+        return []
+    return sorted(int(p.name) for p in d.iterdir() if p.is_dir() and p.name.isdigit())
+
+
+def rename_department(root, old: str, new: str):
+    src, dst = department_dir(root, old), department_dir(root, new)
+    if not src.exists():
+        return
+    if dst.exists():
+        raise FileExistsError(f"Katalog działu {new} już istnieje.")
+    src.rename(dst)
+
+
+def delete_department(root, group: str):
+    shutil.rmtree(department_dir(root, group), ignore_errors=True)
+
+
+# ---- stary płaski układ: {dział}_users.json, {dział}_{miesiąc}_{rok}.json, ... ----
+
+_MONTHS_RE = "|".join(MONTHS)
+# (wzorzec nazwy, (root, części nazwy, nazwa pliku) -> ścieżka docelowa)
+_LEGACY = (
+    (re.compile(r"^(?P<group>.+)_users\.json$"),
+     lambda root, g, name: users_file(root, g["group"])),
+    (re.compile(r"^(?P<group>.+)_grafik_plan\.json$"),
+     lambda root, g, name: plan_file(root, g["group"])),
+    (re.compile(rf"^(?P<group>.+)_(?P<month>{_MONTHS_RE})_(?P<year>\d{{4}})\.json$"),
+     lambda root, g, name: month_file(root, g["group"], g["month"], g["year"])),
+    (re.compile(rf"^(?:karta|grafik)_(?P<group>.+)_(?P<month>{_MONTHS_RE})_(?P<year>\d{{4}})\.pdf$"),
+     lambda root, g, name: year_dir(root, g["group"], g["year"]) / name),
+)
+
+
+def legacy_target(root, path: Path, groups):
+    """Docelowa ścieżka pliku ze starego układu albo None (nie nasz plik / nieznany dział)."""
+    # PDF-y miewały spacje zamienione na „_” – mapujemy obie postaci nazwy
+    known = {g.replace(" ", "_"): g for g in groups}
+    known.update({g: g for g in groups})
+    for pattern, target in _LEGACY:
+        m = pattern.match(path.name)
+        if m and m["group"] in known:
+            return target(root, dict(m.groupdict(), group=known[m["group"]]), path.name)
+    return None
+
+
+def migrate_legacy(root, groups, dry_run=False):
+    """Przenosi pliki działów z korzenia DATA_DIR do departments/; zwraca [(skąd, dokąd)]."""
+    root = Path(root)
+    moved = []
+    for path in sorted(root.iterdir()):
+        if not path.is_file():
+            continue
+        dst = legacy_target(root, path, groups)
+        if dst is None:
+            continue
+        if dst.exists():
+            raise FileExistsError(f"{dst} już istnieje – nie nadpisuję ({path.name}).")
+        moved.append((path, dst))
+        if not dry_run:
+            dst.parent.mkdir(parents=True, exist_ok=True)
+            path.rename(dst)
+    return moved
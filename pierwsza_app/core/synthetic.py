@@ -0,0 +1,140 @@
+# pierwsza_app/core/synthetic.py
+"""
+Generator syntetycznego szpitala do benchmarków.
+
+Tworzy w podanym katalogu dokładnie te pliki, które aplikacja czyta
+z DATA_DIR (układ z core/storage.py): groups.json, departments/<dział>/users.json,
+departments/<dział>/<rok>/<miesiąc>.json, departments/<dział>/grafik_plan.json,
+history/emp_{id}.json, skills_catalog.json i EMP_INDEX.json. Ten sam seed => identyczne dane. Działy i pracowników
+(oraz plany dzienne) proces roboczy przenosi do testowej bazy komendą
+import_roster_json.
+"""
+import calendar
+import json
+import os
+import random
+import subprocess
+import sys
+from datetime import date, timedelta
+from pathlib import Path
+
+from django.conf import settings
+
+from . import storage
+
+POLISH_MONTHS = ["Styczeń", "Luty", "Marzec", "Kwiecień", "Maj", "Czerwiec",
+                 "Lipiec", "Sierpień", "Wrzesień", "Październik", "Listopad", "Grudzień"]
+
+POSITIONS = ["Pielęgniarka", "Pielęgniarz", "Ratownik", "Lekarz", "Oddziałowa", "Opiekun medyczny"]
+SKILLS = ["Praca na SOR", "Zarządzanie", "Respiratoroterapia", "Dializy", "Pediatria",
+          "Kardiologia inwazyjna", "EKG", "Triage", "Transport medyczny", "Żywienie pozajelitowe"]
+FIRST = ["Anna", "Katarzyna", "Małgorzata", "Agnieszka", "Barbara", "Ewa", "Tomasz", "Piotr",
+         "Paweł", "Michał", "Łukasz", "Żaneta", "Zofia", "Jan", "Hanna", "Grzegorz"]
+LAST = ["Nowak", "Kowalska", "Wiśniewska", "Wójcik", "Kamińska", "Lewandowski", "Zieliński",
+        "Szymańska", "Woźniak", "Dąbrowski", "Kozłowska", "Jankowski", "Mazur", "Krawczyk"]
+
+# rozkład tokenów zbliżony do prawdziwych grafików (dużo pustych, zmiany 1/2/3, urlopy, L4)
+TOKENS = ["", "1", "2", "3", "C", "W", "X", "XZ", "UO", "UPK"]
+WEIGHTS = [30, 22, 14, 12, 3, 6, 8, 2, 1, 1]
+
+
+def _write(path: Path, obj, indent=2):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(obj, ensure_ascii=False, indent=indent), encoding="utf-8")
+
+
+def department_name(i: int) -> str:
+    return f"Dzial{i:03d}"
+
+
+def generate_hospital(root, departments=5, employees=40, years=1, start_year=2025,
+                      plan_rows=6, seed=1234):
+    """
+    Zapisuje dane N działów × M pracowników × Y lat do katalogu root.
+    Zwraca słownik z opisem (nazwy działów, lata, liczby plików).
+    """
+    rnd = random.Random(seed)
+    root = Path(root)
+    (root / "history").mkdir(parents=True, exist_ok=True)
+
+    year_list = [start_year + k for k in range(years)]
+    groups, next_id, files = [], 1, 0
+    _write(root / "skills_catalog.json", SKILLS)
+
+    for di in range(1, departments + 1):
+        dept = department_name(di)
+        groups.append({"name": dept, "login": "admin", "password": "admin"})
+
+        users, seen = [], set()
+        for _ in range(employees):
+            while True:
+                name = f"{rnd.choice(FIRST)} {rnd.choice(LAST)} {rnd.randint(1, 9999):04d}"
+                if name not in seen:
+                    seen.add(name)
+                    break
+            exam = date(start_year, 1, 1) + timedelta(days=rnd.randint(-30, 365 * (years + 1)))
+            users.append({
+                "id": str(next_id),
+                "name": name,
+                "position": rnd.choice(POSITIONS),
+                "contact": f"{rnd.randint(500, 899)}{rnd.randint(0, 999999):06d}",
+                "email": f"p{next_id}@szpital.example",
+                "medical_exam": exam.isoformat(),
+                "skills": {s: rnd.random() < 0.3 for s in SKILLS},
+            })
+            next_id += 1
+        _write(storage.users_file(root, dept), users)
+        files += 1
+
+        history = {u["id"]: [] for u in users}
+        for y in year_list:
+            for mi, month in enumerate(POLISH_MONTHS, start=1):
+                n_days = calendar.monthrange(y, mi)[1]
+                data = {}
+                for u in users:
+                    row = rnd.choices(TOKENS, WEIGHTS, k=n_days)
+                    data[u["name"]] = row
+                    hist = history[u["id"]]
+                    for d, tok in enumerate(row, start=1):
+                        if tok in ("1", "2", "3", "C"):
+                            hist.append({"date": f"{y:04d}-{mi:02d}-{d:02d}", "group": dept, "token": tok})
+                _write(storage.month_file(root, dept, month, y),
+                       {"group": dept, "month": month, "year": str(y), "data": data}, indent=4)
+                files += 1
+
+        for emp_id, entries in history.items():
+            _write(root / "history" / f"emp_{emp_id}.json", entries)
+            files += 1
+
+        plan = {}
+        day = date(year_list[0], 1, 1)
+        end = date(year_list[-1], 12, 31)
+        while day <= end:
+            picked = rnd.sample(users, min(plan_rows, len(users)))
+            plan[day.isoformat()] = [
+                {"name": u["name"], "position": u["position"], "contact": u["email"]} for u in picked
+            ]
+            day += timedelta(days=1)
+        _write(storage.plan_file(root, dept), plan)
+        files += 1
+
+    _write(root / "groups.json", groups)
+    _write(root / "EMP_INDEX.json", {"next": next_id})
+    return {
+        "departments": [g["name"] for g in groups],
+        "years": year_list,
+        "employees": employees,
+        "files": files + 3,
+    }
+
+
+def run_manage_in(data_dir, *args) -> int:
+    """
+    Uruchamia `manage.py <args>` w osobnym procesie z DATA_DIR=data_dir.
+    Ścieżki danych są ustalane przy imporcie modułów, więc podmiana katalogu
+    wymaga świeżego procesu. cwd = data_dir, jak na serwerze.
+    """
+    env = dict(os.environ, DATA_DIR=str(data_dir),
+               PYTHONPATH=os.pathsep.join(filter(None, [str(settings.BASE_DIR), os.environ.get("PYTHONPATH")])))
+    cmd = [sys.executable, str(Path(settings.BASE_DIR) / "manage.py"), *map(str, args)]
+    return subprocess.run(cmd, cwd=data_dir, env=env).returncode
@@ -0,0 +1,156 @@
+# pierwsza_app/core/tokens.py
+"""
+Katalog tokenów siatki – jedyne miejsce, w którym wartość komórki
+("1", "3", "C", "W", "UO", "xz", "12z", ...) zamienia się na liczby.
+
+Korzystają z niego karty pracy (pdf_karty), roczny raport godzin,
+statystyki panelu (count_stats, count_stats_from_history), reguły czasu
+pracy (labour_rules) i importy CSV.
+
+Każdy token kompiluje się raz do wektora kolumn (VECTOR):
+
+    hours   godziny pracy (1/2/3 -> 8, "xz" -> 8, "<n>z" -> n)
+    shift   1 za zmianę 1/2/3 (dzień pracy w statystykach)
+    night   8 h za zmianę nocną (3)
+    sick    1 za dzień chorobowego (C)
+    urlop_wypoczynkowy ... inne   8 h w kolumnie nieobecności karty
+
+Grid zamienia całą siatkę osoby × dni na kolumny naraz: każdy wiersz to
+map(vector, dni) i jedno zip(*) – bez rozgałęzień per komórka. Sumy
+(również ważone dniami – np. godziny świąteczne) liczy się potem
+na gotowych krotkach.
+"""
+import operator
+from collections import Counter
+from functools import lru_cache
+from typing import NamedTuple, Optional
+
+# kolumny nieobecności, w kolejności na karcie (po „Data”, „Liczba godzin pracy”, „Święta”, „Praca nocna”)
+LEAVE_COLUMNS = ("urlop_wypoczynkowy", "chorobowe", "urlop_okolicznosciowy", "opieka_nad_dzieckiem", "inne")
+SICK = LEAVE_COLUMNS.index("chorobowe")
+SHIFTS = (1, 2, 3)
+NIGHT_SHIFT = 3
+
+
+class Cell(NamedTuple):
+    """Skompilowana wartość komórki siatki."""
+    text: str               # kolumna „Liczba godzin pracy”
+    hours: int              # ile z tego wchodzi do sumy godzin pracy
+    shift: Optional[int]    # wartość liczbowa komórki (1/2/3 = zmiana), None dla tekstu
+    leave: Optional[int]    # indeks w LEAVE_COLUMNS (8 h) albo None
+    marked: bool            # niepusta i nie „xz” – w święto daje „X”
+
+
+def _leave(token, column):
+    return Cell(token, 0, None, LEAVE_COLUMNS.index(column) if column else None, True)
+
+
+TOKENS = {
+    "w": _leave("w", "urlop_wypoczynkowy"),
+    "wż": _leave("wż", "urlop_wypoczynkowy"),
+    "c": _leave("c", "chorobowe"),
+    "uo": _leave("uo", "urlop_okolicznosciowy"),
+    "upk": _leave("upk", "opieka_nad_dzieckiem"),
+    "up": _leave("up", "inne"),
+    "de": _leave("de", "inne"),
+    "mo": _leave("mo", "inne"),
+    "sz": _leave("sz", "inne"),
+    "ws": _leave("ws", "inne"),
+    "nu": _leave("nu", None),
+    "ub": _leave("ub", None),
+    "xz": Cell("8z", 8, None, None, False),
+    "": Cell("", 0, None, None, False),
+}
+
+# kody nieobecności (wielkie litery, jak w siatce): W, WŻ, C, UO, UPK, UP, DE, MO, SZ, WS, NU, UB
+ABSENCE_CODES = tuple(k.upper() for k, c in TOKENS.items() if c.marked and not c.hours)
+# tokeny zapisywane w historii pracownika i przyjmowane przez import siatki z CSV
+HISTORY_TOKENS = frozenset({"1", "2", "3", "C"})
+
+
+@lru_cache(maxsize=1024)
+def compile_cell(raw: str) -> Cell:
+    """Wartość spoza TOKENS: liczba (1/2/3 -> 8 h), „<n>z” albo dowolny tekst bez godzin."""
+    try:
+        n = int(raw)
+    except ValueError:
+        hours = 0
+        if raw.endswith("z"):
+            try:
+                hours = int(raw[:-1])
+            except ValueError:
+                pass
+        return Cell(raw, hours, None, None, raw.strip() != "")
+    hours = 8 if n in SHIFTS else n
+    return Cell(str(hours) if hours else "", hours, n, None, raw.strip() != "")
+
+
+def cell(raw) -> Cell:
+    raw = "" if raw is None else str(raw)
+    return TOKENS.get(raw.lower()) or compile_cell(raw)
+
+
+# ---- wektory i siatka ----
+
+VECTOR = ("hours", "shift", "night", "sick") + LEAVE_COLUMNS
+
+
+@lru_cache(maxsize=1024)
+def vector(raw: str) -> tuple:
+    """Kolumny VECTOR dla wartości komórki (jak na karcie: „XZ ” to tekst, nie 8 h)."""
+    c = cell(raw)
+    leave = [0] * len(LEAVE_COLUMNS)
+    if c.leave is not None:
+        leave[c.leave] = 8
+    return (c.hours, int(c.shift in SHIFTS), 8 if c.shift == NIGHT_SHIFT else 0,
+            int(c.leave == SICK), *leave)
+
+
+class Grid:
+    """
+    Siatka osoby × dni jako kolumny liczbowe: grid["hours"][i] to krotka
+    godzin kolejnych dni osoby names[i]. Brakujące dni (krótszy wiersz) są puste.
+    strip=True pomija białe znaki wokół wartości (statystyki panelu); karta
+    i raport godzin liczą wartości dosłownie.
+    """
+
+    __slots__ = ("names", "n_days", "rows", "columns")
+
+    def __init__(self, data: dict, n_days: int, names=None, strip=False):
+        self.names = list(data) if names is None else list(names)
+        self.n_days = n_days
+        self.rows = []                  # wartości komórek (str), po n_days na osobę
+        cols = [[] for _ in VECTOR]
+        empty = vector("")
+        for name in self.names:
+            row = (data.get(name) or [])[:n_days]
+            raw = ["" if v is None else str(v) for v in row] + [""] * (n_days - len(row))
+            if strip:
+                raw = [v.strip() for v in raw]
+            self.rows.append(raw)
+            per_column = zip(*map(vector, raw)) if n_days else ((),) * len(empty)
+            for col, values in zip(cols, per_column):
+                col.append(values)
+        self.columns = dict(zip(VECTOR, cols))
+
+    def __getitem__(self, column):
+        return self.columns[column]
+
+    def sums(self, column, days=None) -> list:
+        """Suma kolumny per osoba; `days` – tylko te dni (numery od 1)."""
+        if days is None:
+            return [sum(v) for v in self.columns[column]]
+        idx = [d - 1 for d in days]
+        return [sum(v[i] for i in idx) for v in self.columns[column]]
+
+    def dot(self, column, weights) -> list:
+        """Suma kolumny ważona dniami (weights – po jednej wadze na dzień)."""
+        return [sum(map(operator.mul, v, weights)) for v in self.columns[column]]
+
+    def counts(self, codes=ABSENCE_CODES) -> list:
+        """Liczba dni z każdym z kodów per osoba ({kod: n})."""
+        out = []
+        for raw in self.rows:
+            c = Counter(v.upper() for v in raw)
+            out.append({code: c[code] for code in codes})
+        return out
@@ -0,0 +1,19 @@
+# pierwsza_app/core/warmup.py
+"""
+Wczesne ładowanie podsystemu PDF (ReportLab, czcionka TTF, style kart).
+
+Domyślnie wszystko to ładuje się leniwie, przy pierwszym wydruku – worker,
+który obsługuje tylko autosave, nigdy za to nie płaci. Przy `gunicorn --preload`
+lepiej załadować PDF raz w procesie nadrzędnym, zanim fork() rozda go
+workerom: PDF_WARMUP=True sprawia, że PierwszaAppConfig.ready() woła warm_up().
+"""
+import time
+
+
+def warm_up() -> float:
+    """Importuje generatory PDF, rejestruje czcionkę i buduje style kart; zwraca czas w sekundach."""
+    t0 = time.perf_counter()
+    from . import fonts, pdf_grafik, pdf_karty  # noqa: F401
+    fonts.preload()
+    pdf_karty._Layout.get()
+    return time.perf_counter() - t0
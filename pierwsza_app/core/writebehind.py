@@ -0,0 +1,290 @@
+# pierwsza_app/core/writebehind.py
+"""
+Autosave z zapisem odroczonym (write-behind), włączany AUTOSAVE_WRITE_BEHIND=true.
+
+Bez niego każda komórka z table_edit.html przepisuje cały plik miesiąca
+i plik historii pracownika. W trybie write-behind autosave_cell tylko
+dopisuje linię JSON do dziennika działu (departments/<dział>/autosave.log,
+fsync) i dopiero wtedy potwierdza zapis. Zmiany zbierają się w pamięci
+po (miesiąc, rok, osoba, dzień) – ostatnia wartość wygrywa – a flush()
+zapisuje je paczką: jeden plik na miesiąc i jeden plik historii na
+osobę, po czym skraca dziennik.
+
+Kiedy flush:
+  * co AUTOSAVE_FLUSH_SECONDS (wątek w tle, w każdym procesie, który
+    dopisywał; przy starcie wątku także zaległe dzienniki wszystkich działów),
+  * gdy dziennik działu ma AUTOSAVE_FLUSH_EDITS linii,
+  * przed każdym zapisem całej siatki (utils.save_table_to_file), zamknięciem
+    roku i przy wyjściu procesu; ręcznie: manage.py autosave_flush.
+
+Po awarii dziennik zostaje na dysku: odczyty (utils.load_month_data) nakładają
+go na plik miesiąca, a najbliższy flush go odtwarza. Edycji, których flush
+nie może zapisać (rok zamknięty, dzień spoza miesiąca), nie gubimy po cichu:
+trafiają do logu błędów i do departments/<dział>/autosave.rejected.
+
+Historia pracownika (history/emp_*.json) powstaje dopiero przy flush – jest
+opóźniona względem siatki o najwyżej AUTOSAVE_FLUSH_SECONDS, a po awarii
+do odtworzenia dziennika. Zdarzenia siatki (core/events.py) zapisujemy od
+razu, więc w tym oknie historia i zdarzenia mogą się różnić; źródłem
+prawdy o stanie komórki są plik miesiąca z dziennikiem i zdarzenia.
+
+Dopisywanie trzyma blokadę działu współdzieloną, flush i zamknięcie roku –
+wyłączną (storage.locked), więc żadna linia nie zginie między odczytem
+a skróceniem dziennika, a autosave_cell sprawdza zamknięcie roku i dopisuje
+pod tą samą blokadą. Czytelnicy nie blokują: widzą tylko pełne linie.
+"""
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+
+from . import storage
+
+logger = logging.getLogger(__name__)
+
+# mtime ma ziarno kilku ms – świeżo zmienionemu dziennikowi nie ufamy i parsujemy go ponownie
+RACY_NS = 2_000_000_000
+
+
+def enabled() -> bool:
+    return bool(getattr(settings, "AUTOSAVE_WRITE_BEHIND", False))
+
+
+def flush_seconds() -> float:
+    return float(getattr(settings, "AUTOSAVE_FLUSH_SECONDS", 10.0))
+
+
+def flush_edits() -> int:
+    return int(getattr(settings, "AUTOSAVE_FLUSH_EDITS", 200))
+
+
+# ---- dziennik ----
+
+def encode(month, year, user, day, value) -> bytes:
+    entry = {"t": time.time_ns(), "month": month, "year": str(year), "user": user, "day": int(day), "value": value}
+    return (json.dumps(entry, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+
+
+def parse(raw: bytes) -> list:
+    """Pełne linie dziennika; urwana ostatnia (zapis w toku / awaria) i śmieci są pomijane."""
+    out = []
+    for line in raw.split(b"\n")[:-1]:
+        try:
+            e = json.loads(line)
+            out.append((e["month"], str(e["year"]), e["user"], int(e["day"]), str(e["value"])))
+        except (ValueError, KeyError, TypeError):
+            logger.warning("autosave.log: pominięto uszkodzoną linię %r", line[:200])
+    return out
+
+
+def coalesce(entries) -> dict:
+    """{(miesiąc, rok): {(osoba, dzień): wartość}} – ostatnia wartość komórki wygrywa."""
+    out = defaultdict(dict)
+    for month, year, user, day, value in entries:
+        out[(month, year)][(user, day)] = value
+    return dict(out)
+
+
+def _stat(path):
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+
+def log_stamp(root, group):
+    """Stempel dziennika działu (wchodzi do wersji danych miesiąca) albo None."""
+    return _stat(storage.autosave_log(root, group))
+
+
+class LogView:
+    """Sparsowane dzienniki działów w pamięci procesu, odświeżane po stemplu pliku."""
+
+    def __init__(self):
+        self._cache = {}            # ścieżka -> (stempel, {(miesiąc, rok): {(osoba, dzień): wartość}}, linie)
+        self._lock = threading.Lock()
+
+    def pending(self, root, group):
+        path = storage.autosave_log(root, group)
+        stamp = _stat(path)
+        if stamp is None or not stamp[1]:
+            return {}, 0
+        cached = self._cache.get(path)
+        if cached is not None and cached[0] == stamp and stamp[2] < time.time_ns() - RACY_NS:
+            return cached[1], cached[2]
+        try:
+            with open(path, "rb") as f:
+                raw = f.read()
+        except FileNotFoundError:
+            return {}, 0
+        entries = parse(raw)
+        edits = coalesce(entries)
+        with self._lock:
+            self._cache[path] = (stamp, edits, len(entries))
+        return edits, len(entries)
+
+    def forget(self, root, group):
+        with self._lock:
+            self._cache.pop(storage.autosave_log(root, group), None)
+
+
+view = LogView()
+
+
+def month_edits(root, group, month, year) -> dict:
+    """{(osoba, dzień): wartość} czekające w dzienniku dla miesiąca."""
+    edits, _ = view.pending(root, group)
+    return edits.get((month, str(year)), {})
+
+
+def overlay(data: dict, edits: dict) -> dict:
+    """Nakłada edycje na siatkę {osoba: [wartości]} (w miejscu); krótsze wiersze dopełnia pustymi."""
+    for (user, day), value in edits.items():
+        row = data.get(user)
+        if row is None:
+            row = data[user] = []
+        if len(row) < day:
+            row.extend([""] * (day - len(row)))
+        row[day - 1] = value
+    return data
+
+
+# ---- dopisywanie i opróżnianie ----
+
+def append(root, group, month, year, user, day, value):
+    """
+    Trwale dopisuje edycję komórki do dziennika działu (po powrocie można potwierdzić).
+    Pełny dziennik opróżnia flush_if_full() – wołany już poza blokadą współdzieloną.
+    """
+    line = encode(month, year, user, day, value)
+    path = storage.autosave_log(root, group)
+    with storage.locked(root, group, shared=True):
+        fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, line)
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+    flusher.watch(root, group)
+
+
+def flush_if_full(root, group) -> int:
+    """flush(), gdy dziennik działu ma AUTOSAVE_FLUSH_EDITS linii."""
+    _, n = view.pending(root, group)
+    return flush(root, group) if n >= flush_edits() else 0
+
+
+def flush(root, group) -> int:
+    """Zapisuje zaległe edycje działu paczką i skraca dziennik; zwraca liczbę zapisanych komórek."""
+    path = storage.autosave_log(root, group)
+    stamp = _stat(path)
+    if not stamp or not stamp[1]:
+        return 0
+    from ..views import apply_buffered_edits
+
+    with storage.locked(root, group):
+        try:
+            with open(path, "rb") as f:
+                raw = f.read()
+        except FileNotFoundError:
+            return 0
+        edits = coalesce(parse(raw))
+        rejected = []
+        if edits:
+            rejected = apply_buffered_edits(group, edits)
+            if rejected:
+                reject(root, group, rejected)
+        # wszystko z dziennika jest już w plikach (fsync) – pusty dziennik od nowa
+        with open(path, "r+b") as f:
+            f.truncate(0)
+            os.fsync(f.fileno())
+    view.forget(root, group)
+    return sum(len(cells) for cells in edits.values()) - len(rejected)
+
+
+def reject(root, group, rejected):
+    """[(miesiąc, rok, osoba, dzień, wartość, powód)] -> log błędów + autosave.rejected (fsync)."""
+    lines = []
+    for month, year, user, day, value, reason in rejected:
+        logger.error("autosave %s: odrzucono %s %s %s dzień %s = %r (%s)",
+                     group, month, year, user, day, value, reason)
+        entry = {"t": time.time_ns(), "month": month, "year": str(year), "user": user, "day": int(day),
+                 "value": value, "reason": reason}
+        lines.append(json.dumps(entry, ensure_ascii=False, separators=(",", ":")) + "\n")
+    fd = os.open(storage.autosave_rejected(root, group), os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        os.write(fd, "".join(lines).encode("utf-8"))
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def pending_groups(root) -> list:
+    """Działy z niepustym dziennikiem (jedno listowanie departments/)."""
+    out = []
+    try:
+        entries = list(os.scandir(os.path.join(root, storage.DEPARTMENTS)))
+    except FileNotFoundError:
+        return out
+    for e in entries:
+        if e.is_dir():
+            stamp = _stat(storage.autosave_log(root, e.name))
+            if stamp and stamp[1]:
+                out.append(e.name)
+    return sorted(out)
+
+
+def flush_all(root) -> dict:
+    """Odtwarza zaległe dzienniki wszystkich działów; {dział: komórki}."""
+    out = {}
+    for group in pending_groups(root):
+        try:
+            out[group] = flush(root, group)
+        except Exception:
+            logger.exception("autosave: nie udało się opróżnić dziennika działu %s", group)
+    return out
+
+
+class Flusher:
+    """Wątek w tle opróżniający dzienniki działów, do których ten proces dopisywał."""
+
+    def __init__(self):
+        self._groups = {}           # (root, dział) -> None (kolejność dodania)
+        self._lock = threading.Lock()
+        self._pid = None
+        self._wake = threading.Event()
+
+    def watch(self, root, group):
+        with self._lock:
+            self._groups[(str(root), group)] = None
+            if self._pid != os.getpid():            # pierwszy zapis w tym procesie (także po fork)
+                self._pid = os.getpid()
+                threading.Thread(target=self._run, args=(str(root),), name="autosave-flusher",
+                                 daemon=True).start()
+
+    def _run(self, root):
+        from django.db import connections
+
+        flush_all(root)                             # zaległości po awarii / restarcie
+        while not self._wake.wait(flush_seconds()):
+            self.flush_watched()
+            connections.close_all()                 # połączenia tego wątku – nie trzymamy ich między cyklami
+
+    def flush_watched(self):
+        with self._lock:
+            watched = list(self._groups)
+        for root, group in watched:
+            try:
+                flush(root, group)
+            except Exception:
+                logger.exception("autosave: nie udało się opróżnić dziennika działu %s", group)
+
+
+flusher = Flusher()
+atexit.register(flusher.flush_watched)
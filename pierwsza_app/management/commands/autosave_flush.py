@@ -0,0 +1,28 @@
+# pierwsza_app/management/commands/autosave_flush.py
+"""
+Zapisuje zaległe dzienniki autosave (core/writebehind.py) do plików miesięcy
+i historii – np. po awarii serwera albo przed kopią zapasową.
+
+    python manage.py autosave_flush
+    python manage.py autosave_flush --group Kardiologia
+"""
+from django.core.management.base import BaseCommand
+
+from pierwsza_app.core import writebehind
+from pierwsza_app.utils import BASE_DIR
+
+
+class Command(BaseCommand):
+    help = "Odtwarza dzienniki autosave działów (write-behind) do plików miesięcy i historii."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--group", action="append", help="dział (można powtórzyć); domyślnie wszystkie z dziennikiem")
+
+    def handle(self, *args, **opts):
+        groups = opts["group"] or writebehind.pending_groups(BASE_DIR)
+        total = 0
+        for group in groups:
+            n = writebehind.flush(BASE_DIR, group)
+            total += n
+            self.stdout.write(f"{group}: zapisano {n} komórek.")
+        self.stdout.write(self.style.SUCCESS(f"Działy: {len(groups)}, komórki: {total}."))
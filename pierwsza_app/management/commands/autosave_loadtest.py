@@ -0,0 +1,302 @@
+# pierwsza_app/management/commands/autosave_loadtest.py
+"""
+Generator obciążenia autosave: ilu równoczesnych edytorów przeżyje wdrożenie.
+
+Każdy symulowany edytor (wątek) loguje się do działu przez login_view
+i wysyła ruch jak z table_edit.html: wpisanie tokenu, odczekanie debounce,
+POST /autosave/, przerwa na "myślenie". Edytorzy w jednym dziale dostają
+rozłączne wiersze, więc oczekiwany stan końcowy to ostatnia potwierdzona
+wartość każdej komórki. Każda rozbieżność w pliku miesiąca = zgubiona
+aktualizacja i polecenie kończy się błędem.
+
+    # w procesie (klient testowy Django, dane syntetyczne w katalogu tymczasowym)
+    python manage.py autosave_loadtest --editors 20 --edits 50 --departments 2 --employees 40
+    python manage.py autosave_loadtest --editors 20 --edits 50 --write-behind
+
+    # działający serwer (prawdziwe dane – użyj kopii!)
+    python manage.py autosave_loadtest --url http://127.0.0.1:8000 --groups Kardiologia \\
+        --login admin --password admin --editors 10 --edits 30
+"""
+import csv
+import io
+import json
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from http.cookiejar import CookieJar
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+
+from pierwsza_app.core.synthetic import generate_hospital, run_manage_in, POLISH_MONTHS
+
+TOKENS = ["1", "2", "3", "C", "W", "X", ""]
+
+
+def _pct(sorted_vals, p):
+    if not sorted_vals:
+        return 0.0
+    return sorted_vals[min(len(sorted_vals) - 1, int(round(p / 100.0 * (len(sorted_vals) - 1))))]
+
+
+# -------------------------
+# TRANSPORTY: klient testowy / prawdziwy HTTP
+# -------------------------
+
+
+class TestClientSession:
+    def __init__(self, group, login, password):
+        from django.test import Client
+        self.group = group
+        self.client = Client()
+        r = self.client.post(f"/login/{urllib.parse.quote(group)}/", {"login": login, "password": password})
+        if r.status_code != 302 or "/panel/" not in r.get("Location", ""):
+            raise CommandError(f"Logowanie do {group} nie powiodło się.")
+
+    def autosave(self, body: dict) -> int:
+        r = self.client.post(f"/autosave/{urllib.parse.quote(self.group)}/",
+                             data=json.dumps(body), content_type="application/json")
+        return r.status_code
+
+    def export_month(self, month, year) -> str:
+        r = self.client.get(f"/export-month/{urllib.parse.quote(self.group)}/", {"month": month, "year": year})
+        return r.content.decode("utf-8-sig")
+
+
+class HttpSession:
+    def __init__(self, base_url, group, login, password):
+        self.base = base_url.rstrip("/")
+        self.group_q = urllib.parse.quote(group)
+        self.jar = CookieJar()
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(self.jar))
+        login_url = f"{self.base}/login/{self.group_q}/"
+        self.opener.open(login_url, timeout=30).read()
+        form = urllib.parse.urlencode({"login": login, "password": password,
+                                       "csrfmiddlewaretoken": self._csrf()}).encode()
+        req = urllib.request.Request(login_url, data=form, headers={"Referer": login_url})
+        with self.opener.open(req, timeout=30) as resp:
+            if "/panel/" not in resp.geturl():
+                raise CommandError(f"Logowanie do {group} nie powiodło się.")
+
+    def _csrf(self):
+        return next((c.value for c in self.jar if c.name == "csrftoken"), "")
+
+    def autosave(self, body: dict) -> int:
+        url = f"{self.base}/autosave/{self.group_q}/"
+        req = urllib.request.Request(url, data=json.dumps(body).encode(), method="POST", headers={
+            "Content-Type": "application/json", "X-CSRFToken": self._csrf(), "Referer": url})
+        try:
+            with self.opener.open(req, timeout=30) as resp:
+                resp.read()
+                return resp.status
+        except urllib.error.HTTPError as e:
+            return e.code
+
+    def export_month(self, month, year) -> str:
+        q = urllib.parse.urlencode({"month": month, "year": year})
+        with self.opener.open(f"{self.base}/export-month/{self.group_q}/?{q}", timeout=60) as resp:
+            return resp.read().decode("utf-8-sig")
+
+
+def _names_from_export(text):
+    rows = list(csv.reader(io.StringIO(text), delimiter=";"))
+    return {r[0]: r[1:] for r in rows[1:] if r}
+
+
+# -------------------------
+# SYMULACJA
+# -------------------------
+
+
+def run_load(make_session, groups, month, year, editors, edits, debounce, think, seed):
+    month_num = POLISH_MONTHS.index(month) + 1
+
+    # rozłączne wiersze per edytor (na podstawie aktualnej siatki działu)
+    plan = []
+    for g in groups:
+        names = sorted(_names_from_export(make_session(g).export_month(month, year)))
+        if not names:
+            raise CommandError(f"Dział {g} nie ma pracowników.")
+        plan.append((g, names))
+    assignments = []
+    for k in range(editors):
+        g, names = plan[k % len(plan)]
+        same_dept = [i for i in range(editors) if i % len(plan) == k % len(plan)]
+        slot, n_in_dept = same_dept.index(k), len(same_dept)
+        rows = names[slot::n_in_dept]
+        if rows:
+            assignments.append((k, g, rows))
+    if len(assignments) < editors:
+        raise CommandError("Więcej edytorów niż wierszy – zwiększ liczbę pracowników albo działów.")
+
+    latencies, errors, expected = [], [0], {}
+    lock = threading.Lock()
+    # logowanie przed startem – mierzymy tylko ruch autosave
+    sessions = {k: make_session(g) for k, g, _rows in assignments}
+    start_barrier = threading.Barrier(len(assignments))
+
+    def editor(k, group, rows):
+        er = random.Random(seed * 1000 + k)
+        session = sessions[k]
+        start_barrier.wait()
+        for _ in range(edits):
+            name, day, value = er.choice(rows), er.randint(1, 28), er.choice(TOKENS)
+            time.sleep(debounce)  # debounce z table_edit.html
+            body = {"year": str(year), "month": month_num, "user_name": name, "day": day, "value": value}
+            t0 = time.perf_counter()
+            try:
+                status = session.autosave(body)
+            except Exception:
+                status = 0
+            dt = time.perf_counter() - t0
+            with lock:
+                latencies.append(dt)
+                if status == 200:
+                    expected[(group, name, day)] = value
+                else:
+                    errors[0] += 1
+                    expected.pop((group, name, day), None)  # stan nieznany – nie weryfikujemy
+            time.sleep(er.uniform(*think))
+
+    threads = [threading.Thread(target=editor, args=a) for a in assignments]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - t0
+
+    # weryfikacja: ostatni zapis każdej komórki musi być w pliku
+    lost = []
+    for g in groups:
+        final = _names_from_export(make_session(g).export_month(month, year))
+        for (grp, name, day), value in expected.items():
+            if grp != g:
+                continue
+            row = final.get(name, [])
+            got = row[day - 1] if len(row) >= day else ""
+            if got != value:
+                lost.append((grp, name, day, value, got))
+
+    lat = sorted(latencies)
+    return {
+        "editors": len(assignments),
+        "requests": len(lat),
+        "errors": errors[0],
+        "wall_s": wall,
+        "throughput_rps": len(lat) / wall if wall else 0.0,
+        "p50_ms": _pct(lat, 50) * 1000,
+        "p95_ms": _pct(lat, 95) * 1000,
+        "p99_ms": _pct(lat, 99) * 1000,
+        "max_ms": (lat[-1] * 1000) if lat else 0.0,
+        "cells_checked": len(expected),
+        "lost_updates": lost,
+    }
+
+
+class Command(BaseCommand):
+    help = "Symuluje wielu równoczesnych edytorów autosave i sprawdza, czy żadna zmiana nie zginęła."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--editors", type=int, default=10)
+        parser.add_argument("--edits", type=int, default=30, help="zapisów na edytora")
+        parser.add_argument("--debounce-ms", type=int, default=400)
+        parser.add_argument("--think-ms", default="50:300", help="przerwa między edycjami, zakres min:max")
+        parser.add_argument("--month", default=POLISH_MONTHS[0])
+        parser.add_argument("--year", default="2025")
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument("--max-error-rate", type=float, default=0.0)
+        # działający serwer
+        parser.add_argument("--url", default="", help="adres serwera, np. http://127.0.0.1:8000")
+        parser.add_argument("--groups", default="", help="działy po przecinku (tryb --url)")
+        parser.add_argument("--login", default="admin")
+        parser.add_argument("--password", default="admin")
+        # tryb w procesie
+        parser.add_argument("--departments", type=int, default=2)
+        parser.add_argument("--employees", type=int, default=40)
+        parser.add_argument("--worker", action="store_true", help="(wewnętrzne) uruchom w bieżącym DATA_DIR")
+        parser.add_argument("--json", default="", help="zapisz raport do pliku JSON")
+        parser.add_argument("--write-behind", action="store_true",
+                            help="tryb w procesie: autosave przez dziennik działu (AUTOSAVE_WRITE_BEHIND)")
+
+    def handle(self, *args, **opts):
+        if opts["month"] not in POLISH_MONTHS:
+            raise CommandError(f"Nieznany miesiąc: {opts['month']}")
+        try:
+            think = tuple(int(x) / 1000.0 for x in opts["think_ms"].split(":"))
+            assert len(think) == 2 and think[0] <= think[1]
+        except Exception:
+            raise CommandError("--think-ms w formacie min:max (ms)")
+
+        if opts["url"]:
+            groups = [g.strip() for g in opts["groups"].split(",") if g.strip()]
+            if not groups:
+                raise CommandError("W trybie --url podaj --groups.")
+
+            def make_session(g):
+                return HttpSession(opts["url"], g, opts["login"], opts["password"])
+            return self._report(run_load(make_session, groups, opts["month"], opts["year"], opts["editors"],
+                                         opts["edits"], opts["debounce_ms"] / 1000.0, think, opts["seed"]), opts)
+
+        if opts["worker"]:
+            from django.conf import settings
+            from django.db import connection
+            from django.test.utils import setup_test_environment
+            from pierwsza_app.utils import load_groups
+
+            setup_test_environment()
+            if opts["write_behind"]:
+                settings.AUTOSAVE_WRITE_BEHIND = True
+            # plikowa baza testowa – wątki edytorów czytają ją równolegle
+            settings.DATABASES["default"].setdefault("TEST", {})["NAME"] = str(settings.DATA_DIR / "_loadtest.sqlite3")
+            connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+            call_command("import_roster_json", stdout=io.StringIO())  # działy z plików do bazy testowej
+            groups = [g["name"] for g in load_groups()]
+
+            def make_session(g):
+                return TestClientSession(g, opts["login"], opts["password"])
+            return self._report(run_load(make_session, groups, opts["month"], opts["year"], opts["editors"],
+                                         opts["edits"], opts["debounce_ms"] / 1000.0, think, opts["seed"]), opts)
+
+        # tryb domyślny: dane syntetyczne w katalogu tymczasowym + osobny proces
+        if opts["json"]:
+            opts["json"] = os.path.abspath(opts["json"])  # proces roboczy ma inny katalog bieżący
+        tmp = tempfile.mkdtemp(prefix="autosave_load_")
+        try:
+            generate_hospital(tmp, departments=opts["departments"], employees=opts["employees"],
+                              years=1, start_year=int(opts["year"]), seed=opts["seed"])
+            args = ["autosave_loadtest", "--worker"]
+            for k in ("editors", "edits", "debounce_ms", "think_ms", "month", "year", "seed",
+                      "max_error_rate", "json"):
+                if opts[k] not in ("", None):
+                    args += ["--" + k.replace("_", "-"), opts[k]]
+            if opts["write_behind"]:
+                args.append("--write-behind")
+            if run_manage_in(tmp, *args) != 0:
+                raise CommandError("Test obciążeniowy zakończył się błędem.")
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+    def _report(self, rep, opts):
+        self.stdout.write(f"edytorzy: {rep['editors']}, żądania: {rep['requests']}, czas: {rep['wall_s']:.1f} s")
+        self.stdout.write(f"przepustowość: {rep['throughput_rps']:.1f} req/s")
+        self.stdout.write(f"opóźnienie: p50={rep['p50_ms']:.1f} ms  p95={rep['p95_ms']:.1f} ms  "
+                          f"p99={rep['p99_ms']:.1f} ms  max={rep['max_ms']:.1f} ms")
+        rate = rep["errors"] / rep["requests"] if rep["requests"] else 0.0
+        self.stdout.write(f"błędy: {rep['errors']} ({rate:.2%})")
+        self.stdout.write(f"sprawdzone komórki: {rep['cells_checked']}, zgubione aktualizacje: {len(rep['lost_updates'])}")
+        for grp, name, day, want, got in rep["lost_updates"][:20]:
+            self.stdout.write(f"  {grp} / {name} / dzień {day}: oczekiwano {want!r}, w pliku {got!r}")
+        if opts["json"]:
+            with open(opts["json"], "w", encoding="utf-8") as f:
+                json.dump(rep, f, ensure_ascii=False, indent=2)
+        if rep["lost_updates"]:
+            raise CommandError(f"Zgubione aktualizacje: {len(rep['lost_updates'])}")
+        if rate > opts["max_error_rate"]:
+            raise CommandError(f"Odsetek błędów {rate:.2%} przekracza --max-error-rate")
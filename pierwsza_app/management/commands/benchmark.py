@@ -0,0 +1,399 @@
+# pierwsza_app/management/commands/benchmark.py
+"""
+Powtarzalny benchmark gorących ścieżek na syntetycznym szpitalu.
+
+    python manage.py benchmark --departments 10 --employees 60 --years 2 --output bench.json
+    python manage.py benchmark --output new.json --compare bench.json --threshold 0.25
+    python manage.py benchmark --input new.json --compare bench.json     # samo porównanie
+
+Dane są generowane (pierwsza_app/core/synthetic.py) do katalogu tymczasowego,
+a pomiary wykonuje osobny proces z DATA_DIR ustawionym na ten katalog
+i z testową bazą danych – prawdziwe pliki i db.sqlite3 pozostają nietknięte.
+Przy --compare polecenie kończy się błędem, gdy któryś przypadek zwolnił
+(mediana) o więcej niż --threshold.
+"""
+import io
+import json
+import platform
+import random
+import shutil
+import statistics
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+
+from pierwsza_app.core.synthetic import generate_hospital, run_manage_in, POLISH_MONTHS
+
+# nazwa -> (funkcja przygotowująca, domyślna liczba powtórzeń)
+CASES = {}
+
+
+def case(name, repeat=5):
+    def deco(fn):
+        CASES[name] = (fn, repeat)
+        return fn
+    return deco
+
+
+def summarize(samples):
+    s = sorted(samples)
+
+    def pct(p):
+        return s[min(len(s) - 1, int(round(p / 100.0 * (len(s) - 1))))]
+
+    return {
+        "n": len(s),
+        "mean_ms": round(statistics.fmean(s) * 1000, 3),
+        "p50_ms": round(pct(50) * 1000, 3),
+        "p95_ms": round(pct(95) * 1000, 3),
+        "min_ms": round(s[0] * 1000, 3),
+        "max_ms": round(s[-1] * 1000, 3),
+    }
+
+
+def compare_results(old, new, threshold, min_delta_ms=1.0):
+    """Zwraca listę (nazwa, stara p50, nowa p50, stosunek, regresja?)."""
+    rows = []
+    for name, cur in sorted(new.get("results", {}).items()):
+        prev = old.get("results", {}).get(name)
+        if not prev:
+            continue
+        a, b = prev["p50_ms"], cur["p50_ms"]
+        ratio = (b / a) if a else float("inf")
+        regressed = ratio > 1 + threshold and (b - a) > min_delta_ms
+        rows.append((name, a, b, ratio, regressed))
+    return rows
+
+
+# -------------------------
+# PRZYPADKI (wykonywane w procesie roboczym)
+# -------------------------
+
+
+class Context:
+    """Stan współdzielony przez przypadki: klient HTTP, wybrany dział i miesiąc."""
+
+    def __init__(self, meta, seed):
+        from django.test import Client
+        self.rnd = random.Random(seed)
+        self.meta = meta
+        self.group = meta["departments"][0]
+        self.year = str(meta["years"][0])
+        self.month = POLISH_MONTHS[0]
+        self.client = Client()
+        session = self.client.session
+        session["auth_group"] = self.group
+        session.save()
+
+    def users(self):
+        from pierwsza_app.views import load_users_norm
+        return load_users_norm(self.group)
+
+
+@case("autosave_cell", repeat=30)
+def _autosave(ctx):
+    names = [u["name"] for u in ctx.users()]
+    tokens = ["1", "2", "3", "C", ""]
+    url = f"/autosave/{ctx.group}/"
+
+    def run():
+        body = json.dumps({"year": ctx.year, "month": 1, "user_name": ctx.rnd.choice(names),
+                           "day": ctx.rnd.randint(1, 31), "value": ctx.rnd.choice(tokens)})
+        r = ctx.client.post(url, data=body, content_type="application/json")
+        assert r.status_code == 200, r.content
+    return run
+
+
+@case("edit_table_save")
+def _edit_save(ctx):
+    names = [u["name"] for u in ctx.users()]
+    url = f"/edycja/{ctx.group}/?month={ctx.month}&year={ctx.year}"
+
+    def run():
+        form = {"action": "save"}
+        for n in names:
+            for d in range(1, 32):
+                form[f"v__{n}__{d}"] = ctx.rnd.choice(["1", "2", "3", "", "C"])
+        r = ctx.client.post(url, data=form)
+        assert r.status_code == 302, r.status_code
+    return run
+
+
+@case("edit_table_render_compact", repeat=10)
+def _edit_render_compact(ctx):
+    url = f"/edycja/{ctx.group}/?month={ctx.month}&year={ctx.year}&compact=1"
+
+    def run():
+        assert ctx.client.get(url).status_code == 200
+    return run
+
+
+@case("edit_table_render_cells", repeat=5)
+def _edit_render_cells(ctx):
+    url = f"/edycja/{ctx.group}/?month={ctx.month}&year={ctx.year}&compact=0"
+
+    def run():
+        assert ctx.client.get(url).status_code == 200
+    return run
+
+
+@case("panel_show_stats")
+def _panel_stats(ctx):
+    years = ctx.meta["years"]
+    url = (f"/panel/{ctx.group}/?action=show_stats&from_month={POLISH_MONTHS[0]}&from_year={years[0]}"
+           f"&to_month={POLISH_MONTHS[-1]}&to_year={years[-1]}")
+
+    def run():
+        assert ctx.client.get(url).status_code == 200
+    return run
+
+
+@case("import_profiles_csv")
+def _import_profiles(ctx):
+    from django.core.files.uploadedfile import SimpleUploadedFile
+    url = f"/panel/{ctx.group}/import-csv/"
+    lines = ["Imię i nazwisko;Stanowisko;Kontakt (tel.);E-mail;Termin badań (RRRR-MM-DD);Umiejętności"]
+    for u in ctx.users():
+        lines.append(f"{u['name']};{u['position']};{u['contact']};{u['email']};{u['medical_exam']};EKG, Triage")
+    payload = ("\n".join(lines)).encode("utf-8")
+
+    def run():
+        f = SimpleUploadedFile("profile.csv", payload, content_type="text/csv")
+        assert ctx.client.post(url, data={"csv": f}).status_code == 302
+    return run
+
+
+@case("import_month_tokens_csv")
+def _import_month(ctx):
+    from django.core.files.uploadedfile import SimpleUploadedFile
+    url = f"/import-month/{ctx.group}/"
+    names = [u["name"] for u in ctx.users()]
+
+    def run():
+        # nowa siatka przy każdym powtórzeniu – inaczej import nie ma różnic do zapisania w historii
+        lines = ["Imię i nazwisko;" + ";".join(str(d) for d in range(1, 32))]
+        for n in names:
+            lines.append(n + ";" + ";".join(ctx.rnd.choice(["1", "2", "3", "C", ""]) for _ in range(31)))
+        f = SimpleUploadedFile("siatka.csv", "\n".join(lines).encode("utf-8"), content_type="text/csv")
+        r = ctx.client.post(url, data={"csv": f, "month": ctx.month, "year": ctx.year})
+        assert r.status_code == 302 and "Zaimportowano" in r["Location"], r.get("Location")
+    return run
+
+
+@case("grafik_view_get", repeat=10)
+def _grafik_get(ctx):
+    url = f"/grafik/{ctx.group}/?date={ctx.year}-01-15"
+
+    def run():
+        assert ctx.client.get(url).status_code == 200
+    return run
+
+
+@case("grafik_view_post")
+def _grafik_post(ctx):
+    users = ctx.users()[:6]
+    url = f"/grafik/{ctx.group}/"
+
+    def run():
+        data = {"date": f"{ctx.year}-01-{ctx.rnd.randint(1, 28):02d}",
+                "emp[]": [u["name"] for u in users],
+                "pos[]": [u["position"] for u in users],
+                "contact[]": [u["email"] for u in users]}
+        assert ctx.client.post(url, data=data).status_code == 302
+    return run
+
+
+@case("grafik_range_quarter", repeat=10)
+def _grafik_range_quarter(ctx):
+    url = f"/grafik/{ctx.group}/zakres/json/?from={ctx.year}-01-01&to={ctx.year}-03-31"
+
+    def run():
+        resp = ctx.client.get(url)
+        assert resp.status_code == 200 and len(resp.json()["days"]) == 90
+    return run
+
+
+@case("grafik_range_month_board", repeat=10)
+def _grafik_range_month(ctx):
+    url = f"/grafik/{ctx.group}/zakres/?span=month&date={ctx.year}-03-01"
+
+    def run():
+        assert ctx.client.get(url).status_code == 200
+    return run
+
+
+@case("pdf_grafik", repeat=3)
+def _pdf_grafik(ctx):
+    from pierwsza_app.views import generate_grafik_pdf_response, month_json_path, BASE_DIR
+    json_name = month_json_path(ctx.group, ctx.month, ctx.year).relative_to(BASE_DIR)
+
+    def run():
+        resp = generate_grafik_pdf_response(json_name)
+        assert b"".join(resp.streaming_content)[:4] == b"%PDF"
+    return run
+
+
+@case("pdf_karty", repeat=3)
+def _pdf_karty(ctx):
+    from pierwsza_app.views import generate_karty_pdf_response, month_json_path, BASE_DIR
+    json_name = month_json_path(ctx.group, ctx.month, ctx.year).relative_to(BASE_DIR)
+
+    def run():
+        resp = generate_karty_pdf_response(json_name)
+        assert b"".join(resp.streaming_content)[:4] == b"%PDF"
+    return run
+
+
+@case("pdf_employee_karta", repeat=10)
+def _pdf_employee_karta(ctx):
+    from urllib.parse import quote
+    name = ctx.users()[0]["name"]
+    m = POLISH_MONTHS.index(ctx.month) + 1
+    url = f"/employee/{ctx.group}/pdf/karta/{quote(name)}/?from={ctx.year}-{m:02d}"
+
+    def run():
+        resp = ctx.client.get(url)
+        assert resp.status_code == 200 and b"".join(resp.streaming_content)[:4] == b"%PDF"
+    return run
+
+
+@case("pdf_karty_legacy", repeat=3)
+def _pdf_karty_legacy(ctx):
+    """Stary RozliczKarty3 (plik w katalogu roboczym) – punkt odniesienia dla pdf_karty."""
+    import contextlib
+    import os
+    from RozliczKarty3 import save_tables_to_pdf
+    from pierwsza_app.views import month_json_path
+    path = month_json_path(ctx.group, ctx.month, ctx.year)
+    table_data = json.loads(path.read_text(encoding="utf-8"))
+    workdir = Path(tempfile.mkdtemp(prefix="bench_karty_"))
+
+    def run():
+        cwd = os.getcwd()
+        os.chdir(workdir)
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                save_tables_to_pdf(str(path), table_data)
+        finally:
+            os.chdir(cwd)
+        pdf = next(workdir.glob("karta_*.pdf"))
+        assert pdf.read_bytes()[:4] == b"%PDF"
+    return run
+
+
+def run_worker(meta, repeat, only, seed):
+    from django.db import connection
+    from django.test.utils import setup_test_environment
+
+    setup_test_environment()
+    connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    call_command("import_roster_json", stdout=io.StringIO())  # działy z plików do bazy testowej
+
+    ctx = Context(meta, seed)
+    results = {}
+    for name, (factory, default_repeat) in CASES.items():
+        if only and name not in only:
+            continue
+        fn = factory(ctx)
+        fn()  # rozgrzewka (importy, pierwsze wczytanie plików)
+        samples = []
+        for _ in range(repeat or default_repeat):
+            t0 = time.perf_counter()
+            fn()
+            samples.append(time.perf_counter() - t0)
+        results[name] = summarize(samples)
+    return results
+
+
+class Command(BaseCommand):
+    help = "Benchmark gorących ścieżek (autosave, zapis siatki, statystyki, importy, grafik, PDF) na danych syntetycznych."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--departments", type=int, default=5)
+        parser.add_argument("--employees", type=int, default=40)
+        parser.add_argument("--years", type=int, default=1)
+        parser.add_argument("--seed", type=int, default=1234)
+        parser.add_argument("--repeat", type=int, default=0, help="nadpisuje domyślną liczbę powtórzeń przypadków")
+        parser.add_argument("--only", default="", help="lista przypadków po przecinku")
+        parser.add_argument("--output", default="", help="zapisz wyniki do pliku JSON")
+        parser.add_argument("--input", default="", help="nie uruchamiaj – weź wyniki z pliku")
+        parser.add_argument("--compare", default="", help="plik z poprzednimi wynikami")
+        parser.add_argument("--threshold", type=float, default=0.25, help="dopuszczalny wzrost mediany (0.25 = 25%%)")
+        parser.add_argument("--keep", action="store_true", help="nie usuwaj katalogu z danymi")
+        parser.add_argument("--worker", default="", help="(wewnętrzne) plik wyników procesu roboczego")
+
+    def handle(self, *args, **opts):
+        only = {x.strip() for x in opts["only"].split(",") if x.strip()}
+        unknown = only - set(CASES)
+        if unknown:
+            raise CommandError(f"Nieznane przypadki: {', '.join(sorted(unknown))}. Dostępne: {', '.join(CASES)}")
+
+        if opts["worker"]:
+            meta = json.loads(Path(opts["worker"]).read_text(encoding="utf-8"))
+            meta["results"] = run_worker(meta, opts["repeat"], only, opts["seed"])
+            Path(opts["worker"]).write_text(json.dumps(meta, ensure_ascii=False), encoding="utf-8")
+            return
+
+        if opts["input"]:
+            report = json.loads(Path(opts["input"]).read_text(encoding="utf-8"))
+        else:
+            report = self._run(opts)
+
+        self._print(report)
+        if opts["output"]:
+            Path(opts["output"]).write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+            self.stdout.write(f"Zapisano wyniki: {opts['output']}")
+
+        if opts["compare"]:
+            old = json.loads(Path(opts["compare"]).read_text(encoding="utf-8"))
+            rows = compare_results(old, report, opts["threshold"])
+            self.stdout.write(f"\nPorównanie z {opts['compare']} (mediana, próg {opts['threshold']:.0%}):")
+            for name, a, b, ratio, regressed in rows:
+                flag = "  REGRESJA" if regressed else ""
+                self.stdout.write(f"  {name:<28} {a:>10.2f} -> {b:>10.2f} ms  x{ratio:.2f}{flag}")
+            bad = [r[0] for r in rows if r[4]]
+            if bad:
+                raise CommandError(f"Wykryto regresje: {', '.join(bad)}")
+
+    def _run(self, opts):
+        tmp = Path(tempfile.mkdtemp(prefix="bench_szpital_"))
+        try:
+            t0 = time.perf_counter()
+            meta = generate_hospital(tmp, departments=opts["departments"], employees=opts["employees"],
+                                     years=opts["years"], seed=opts["seed"])
+            self.stdout.write(f"Wygenerowano {meta['files']} plików w {time.perf_counter() - t0:.1f} s ({tmp})")
+            meta["params"] = {k: opts[k] for k in ("departments", "employees", "years", "seed", "repeat")}
+            meta_file = tmp / "_bench_meta.json"
+            meta_file.write_text(json.dumps(meta, ensure_ascii=False), encoding="utf-8")
+
+            args = ["benchmark", "--worker", meta_file, "--seed", opts["seed"], "--repeat", opts["repeat"]]
+            if opts["only"]:
+                args += ["--only", opts["only"]]
+            # cwd = DATA_DIR, jak na serwerze (stary generator kart pisze PDF do katalogu bieżącego)
+            if run_manage_in(tmp, *args) != 0:
+                raise CommandError("Proces benchmarku zakończył się błędem.")
+            report = json.loads(meta_file.read_text(encoding="utf-8"))
+        finally:
+            if opts["keep"]:
+                self.stdout.write(f"Dane pozostawione w {tmp}")
+            else:
+                shutil.rmtree(tmp, ignore_errors=True)
+
+        report["environment"] = {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+        }
+        return report
+
+    def _print(self, report):
+        p = report.get("params", {})
+        self.stdout.write(f"\nDziały: {p.get('departments')}, pracownicy/dział: {p.get('employees')}, "
+                          f"lata: {p.get('years')}, seed: {p.get('seed')}")
+        self.stdout.write(f"  {'przypadek':<28} {'n':>4} {'p50 ms':>10} {'p95 ms':>10} {'max ms':>10}")
+        for name, r in report.get("results", {}).items():
+            self.stdout.write(f"  {name:<28} {r['n']:>4} {r['p50_ms']:>10.2f} {r['p95_ms']:>10.2f} {r['max_ms']:>10.2f}")
@@ -0,0 +1,78 @@
+# pierwsza_app/management/commands/close_year.py
+"""
+Zamknięcie roku: dwanaście siatek działu -> jedno archiwum (core/archive.py).
+
+    python manage.py close_year 2024 --dry-run
+    python manage.py close_year 2024
+    python manage.py close_year 2024 --group Kardiologia
+    python manage.py close_year 2024 --verify          # sprawdź sumy kontrolne archiwów
+    python manage.py close_year 2024 --group Kardiologia --reopen
+
+Po zamknięciu siatki, statystyki i eksporty tego roku czytają archiwum
+(agregaty ndz/l4/workdays są policzone przy zamknięciu), a edycja, autosave
+i import CSV są odrzucane. --reopen odtwarza pliki miesięcy i usuwa archiwum.
+Bieżącego ani przyszłego roku nie zamykamy bez --force.
+"""
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from pierwsza_app.core import archive, storage, writebehind
+from pierwsza_app.models import Department
+from pierwsza_app.utils import BASE_DIR
+
+
+class Command(BaseCommand):
+    help = "Zamyka rok działów: siatki miesięcy -> DATA_DIR/departments/<dział>/<rok>/archive.json."
+
+    def add_arguments(self, parser):
+        parser.add_argument("year", type=int)
+        parser.add_argument("--group", action="append", help="dział (można powtórzyć); domyślnie wszystkie")
+        parser.add_argument("--dry-run", action="store_true", help="tylko wypisz, nic nie zmieniaj")
+        parser.add_argument("--verify", action="store_true", help="sprawdź istniejące archiwa")
+        parser.add_argument("--reopen", action="store_true", help="przywróć pliki miesięcy z archiwum")
+        parser.add_argument("--force", action="store_true", help="pozwól zamknąć bieżący rok")
+
+    def handle(self, *args, **opts):
+        from pierwsza_app.views import HISTORY_DIR, count_stats
+
+        year = opts["year"]
+        groups = opts["group"] or list(Department.objects.order_by("name").values_list("name", flat=True))
+        if not opts["verify"] and not opts["reopen"] and year >= date.today().year and not opts["force"]:
+            raise CommandError(f"Rok {year} jeszcze trwa – użyj --force, jeśli na pewno chcesz go zamknąć.")
+
+        done = 0
+        for group in groups:
+            def aggregate(month, data, group=group):
+                # te same liczniki co w panelu, liczone jeszcze z pliku miesiąca
+                return count_stats(group, [{"name": n} for n in data], [(month, str(year))])
+
+            try:
+                if opts["verify"]:
+                    payload = archive.load(BASE_DIR, group, year)
+                    if payload is None:
+                        continue
+                    archive.verify(payload, months=True)
+                    self.stdout.write(f"{group}: OK ({len(payload['months'])} mies.)")
+                elif opts["reopen"]:
+                    if opts["dry_run"]:
+                        self.stdout.write(f"{group}: do otwarcia: {archive.is_closed(BASE_DIR, group, year)}")
+                        continue
+                    months = archive.reopen_year(BASE_DIR, group, year)
+                    self.stdout.write(f"{group}: przywrócono {len(months)} mies.")
+                else:
+                    # pod blokadą działu: zaległy autosave trafia do plików miesięcy, nowy czeka
+                    with storage.locked(BASE_DIR, group):
+                        if not opts["dry_run"]:
+                            writebehind.flush(BASE_DIR, group)
+                        path, months = archive.close_year(BASE_DIR, group, year, HISTORY_DIR, aggregate,
+                                                          dry_run=opts["dry_run"])
+                    if not months:
+                        continue
+                    verb = "do zamknięcia" if opts["dry_run"] else "zamknięto"
+                    self.stdout.write(f"{group}: {verb} {len(months)} mies. -> {path.relative_to(BASE_DIR)}")
+            except (archive.ArchiveError, FileExistsError, FileNotFoundError, ValueError) as e:
+                raise CommandError(f"{group}: {e}")
+            done += 1
+
+        self.stdout.write(self.style.SUCCESS(f"Rok {year}: działy: {done}."))
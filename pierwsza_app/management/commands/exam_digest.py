@@ -0,0 +1,80 @@
+# pierwsza_app/management/commands/exam_digest.py
+"""
+E-mail zbiorczy o kończących się badaniach okresowych (core/exams.py):
+jedna wiadomość na dział, wszystkie wysłane w jednej sesji SMTP.
+
+    python manage.py exam_digest                       # najbliższe 30 dni
+    python manage.py exam_digest --days 14 --overdue --group Kardiologia
+    python manage.py exam_digest --to kadry@szpital.pl --dry-run
+
+Adresaci: --to, a bez niego EXAM_DIGEST_TO z ustawień (kadry, BHP). Gdy
+brak obu, działy są pomijane z ostrzeżeniem – terminy badań to dane
+o zdrowiu, więc nie wysyłamy ich na adresy z profili pracowników.
+Do uruchamiania z crona, np. codziennie rano.
+"""
+from datetime import date
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.core.management.base import BaseCommand, CommandError
+
+from pierwsza_app.core import exams, metrics
+from pierwsza_app.utils import BASE_DIR
+
+
+class Command(BaseCommand):
+    help = "Jeden e-mail na dział z listą badań okresowych kończących się w ciągu N dni."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=exams.WARN_DAYS,
+                            help=f"horyzont w dniach (domyślnie {exams.WARN_DAYS})")
+        parser.add_argument("--overdue", action="store_true", help="dołącz badania już po terminie")
+        parser.add_argument("--group", action="append", help="dział (można powtórzyć); domyślnie wszystkie")
+        parser.add_argument("--to", action="append", help="adresat (można powtórzyć); domyślnie EXAM_DIGEST_TO")
+        parser.add_argument("--date", help="dzień odniesienia RRRR-MM-DD (domyślnie dziś)")
+        parser.add_argument("--dry-run", action="store_true", help="tylko wypisz, nie wysyłaj")
+
+    def handle(self, *args, **opts):
+        from pierwsza_app.views import EMAIL_RE
+
+        if opts["days"] < 0:
+            raise CommandError("--days nie może być ujemne.")
+        today = date.today()
+        if opts["date"]:
+            today = exams.parse_exam(opts["date"])
+            if today is None:
+                raise CommandError(f"Nieprawidłowa data: {opts['date']}")
+
+        index = exams.live.refresh(BASE_DIR)
+        per_group = exams.digest(index.expiring(today, opts["days"], groups=opts["group"],
+                                                overdue=opts["overdue"]))
+        fixed = [a.strip() for a in (opts["to"] or getattr(settings, "EXAM_DIGEST_TO", [])) if a.strip()]
+        bad = [a for a in fixed if not EMAIL_RE.match(a)]
+        if bad:
+            raise CommandError(f"Nieprawidłowe adresy: {', '.join(bad)}")
+        from_email = getattr(settings, "DEFAULT_FROM_EMAIL", "no-reply@example.com")
+
+        messages = []
+        for group, entries in per_group.items():
+            if not fixed:
+                self.stderr.write(self.style.WARNING(
+                    f"{group}: brak adresatów (--to / EXAM_DIGEST_TO) – pomijam ({len(entries)} os.)."))
+                continue
+            recipients = fixed
+            body = exams.digest_text(group, entries, today, opts["days"])
+            if opts["dry_run"]:
+                self.stdout.write(f"== do: {', '.join(recipients)}\n{body}\n")
+            messages.append(EmailMessage(
+                subject=f"Badania okresowe – {group} ({len(entries)})", body=body,
+                from_email=from_email, to=recipients))
+
+        if not messages:
+            self.stdout.write("Brak badań do zgłoszenia.")
+            return
+        if opts["dry_run"]:
+            self.stdout.write(f"[dry-run] wiadomości: {len(messages)}")
+            return
+        # jedno połączenie dla wszystkich działów (backend SMTP otwiera je raz)
+        with metrics.track("send_mail"):
+            sent = get_connection(fail_silently=False).send_messages(messages)
+        self.stdout.write(self.style.SUCCESS(f"Wysłano {sent} z {len(messages)} wiadomości."))
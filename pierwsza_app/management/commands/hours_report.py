@@ -0,0 +1,59 @@
+# pierwsza_app/management/commands/hours_report.py
+"""
+Roczny raport godzin działów (core/hours_report.py) z wiersza poleceń.
+
+    python manage.py hours_report 2025
+    python manage.py hours_report 2025 --group Kardiologia --format json
+    python manage.py hours_report 2025 --output raport_2025.csv
+
+CSV ma kolumnę „Dział”, więc raporty kilku działów lądują w jednym pliku
+(nagłówek raz). Zamknięte lata czytane są z archiwum.
+"""
+import io
+import json
+
+from django.core.management.base import BaseCommand
+
+from pierwsza_app.core import hours_report
+from pierwsza_app.models import Department
+from pierwsza_app.utils import BASE_DIR, load_month_data, load_users_from_file
+
+
+class Command(BaseCommand):
+    help = "Roczne zestawienie godzin (praca, święta, noce, nieobecności) per osoba i miesiąc."
+
+    def add_arguments(self, parser):
+        parser.add_argument("year", type=int)
+        parser.add_argument("--group", action="append", help="dział (można powtórzyć); domyślnie wszystkie")
+        parser.add_argument("--format", choices=("csv", "json"), default="csv")
+        parser.add_argument("--output", help="plik wynikowy; domyślnie stdout")
+
+    def handle(self, *args, **opts):
+        year = str(opts["year"])
+        groups = opts["group"] or list(Department.objects.order_by("name").values_list("name", flat=True))
+
+        reports = []
+        for group in groups:
+            names = [u["name"] for u in load_users_from_file(group)]
+            reports.append(hours_report.cached_year_report(
+                BASE_DIR, group, year, lambda m, y, group=group: load_month_data(group, m, y), names))
+
+        if opts["format"] == "json":
+            text = json.dumps(reports, ensure_ascii=False, indent=2) + "\n"
+        else:
+            sio = io.StringIO()
+            for i, report in enumerate(reports):
+                part = io.StringIO()
+                hours_report.write_csv(report, part)
+                lines = part.getvalue().splitlines(keepends=True)
+                sio.writelines(lines if i == 0 else lines[1:])
+            text = sio.getvalue()
+
+        if opts["output"]:
+            with open(opts["output"], "w", encoding="utf-8-sig" if opts["format"] == "csv" else "utf-8",
+                      newline="") as f:
+                f.write(text)
+            people = sum(len(r["employees"]) for r in reports)
+            self.stderr.write(f"Zapisano {opts['output']}: działy {len(reports)}, osoby {people}.")
+        else:
+            self.stdout.write(text, ending="")
@@ -0,0 +1,157 @@
+# pierwsza_app/management/commands/import_roster_json.py
+"""
+Jednorazowa migracja działów, pracowników i planów dziennych z plików JSON do bazy.
+
+Czyta z DATA_DIR: groups.json, skills_catalog.json oraz kopie działów
+departments/{dział}/users.json i grafik_plan.json (przed migrate_data_layout:
+{dział}_users.json / {dział}_grafik_plan.json) i zapisuje je do tabel
+Department / Employee / Skill / DayPlan (plan rozbity na wiersz per dzień)
+w jednej transakcji, hurtowo (bulk_create / bulk_update). Ponowne uruchomienie jest bezpieczne:
+działy są dopasowywane po nazwie, pracownicy po stałym ID, a dane z plików
+nadpisują stan w bazie dla działów obecnych w groups.json.
+
+    python manage.py migrate
+    python manage.py import_roster_json
+    python manage.py import_roster_json --dry-run
+
+Pliki JSON zostają na miejscu (kopia zapasowa) – aplikacja już ich nie czyta.
+"""
+import json
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import CharField, Value
+from django.db.models.functions import Cast, Concat
+
+from pierwsza_app.models import Department, Employee, Skill, DayPlan
+from pierwsza_app.utils import GROUPS_FILE, users_path, plan_path, read_text, roster_changed, EMPLOYEE_FIELDS
+from pierwsza_app.views import normalize_users, BASE_DIR
+
+
+def _plan_days(dept):
+    """{dział}_grafik_plan.json -> [(data, wiersze)]; klucze, które nie są datą, pomijamy."""
+    days = _read_json(plan_path(dept), {})
+    out = []
+    for key, rows in (days.items() if isinstance(days, dict) else []):
+        try:
+            out.append((date.fromisoformat(str(key).strip()), rows))
+        except ValueError:
+            continue
+    return [(d, rows) for d, rows in out if isinstance(rows, list)]
+
+
+def _read_json(path, default):
+    if not path.exists():
+        return default
+    try:
+        return json.loads(read_text(path))
+    except Exception as e:
+        raise CommandError(f"Nie można odczytać {path.name}: {e}")
+
+
+class Command(BaseCommand):
+    help = "Importuje groups.json, {dział}_users.json i skills_catalog.json do bazy danych."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true", help="tylko policz, nic nie zapisuj")
+
+    def handle(self, *args, **opts):
+        groups = _read_json(GROUPS_FILE, [])
+        catalog = _read_json(BASE_DIR / "skills_catalog.json", [])
+        if not isinstance(groups, list) or not isinstance(catalog, list):
+            raise CommandError("Nieprawidłowy format groups.json lub skills_catalog.json.")
+
+        # dział -> lista znormalizowanych profili; duplikaty nazw / ID pomijamy
+        rosters, seen_ids, skipped = {}, set(), []
+        for g in groups:
+            dept = (g.get("name") or "").strip()
+            if not dept or dept in rosters:
+                continue
+            users, names = [], set()
+            for u in normalize_users(_read_json(users_path(dept), [])):
+                if not u["name"] or u["name"] in names or u["id"] in seen_ids:
+                    skipped.append(f"{dept}: {u['name'] or '(bez nazwy)'} [{u['id']}]")
+                    continue
+                names.add(u["name"])
+                seen_ids.add(u["id"])
+                users.append(u)
+            rosters[dept] = (g, users)
+        plans = {dept: _plan_days(dept) for dept in rosters}
+
+        skill_names = {}
+        for s in catalog:
+            s = str(s).strip()
+            if s:
+                skill_names.setdefault(s.casefold(), s)
+        for _, users in rosters.values():
+            for u in users:
+                for k, v in u["skills"].items():
+                    if v and k.strip():
+                        skill_names.setdefault(k.strip().casefold(), k.strip())
+
+        n_emp = sum(len(users) for _, users in rosters.values())
+        n_days = sum(len(p) for p in plans.values())
+        self.stdout.write(f"działy: {len(rosters)}, pracownicy: {n_emp}, umiejętności: {len(skill_names)}, "
+                          f"dni planu: {n_days}")
+        for s in skipped:
+            self.stdout.write(self.style.WARNING(f"pominięto duplikat: {s}"))
+        if opts["dry_run"]:
+            return
+
+        with transaction.atomic():
+            depts = self._import(rosters, skill_names)
+            DayPlan.objects.bulk_create(
+                [DayPlan(department=depts[dept], date=d, rows=rows) for dept, days in plans.items() for d, rows in days],
+                batch_size=500, update_conflicts=True, unique_fields=["department", "date"], update_fields=["rows"])
+        roster_changed(*Department.objects.values_list("name", flat=True))
+        self.stdout.write(self.style.SUCCESS("Zaimportowano."))
+
+    def _import(self, rosters, skill_names):
+        known = {s.name.casefold() for s in Skill.objects.all()}
+        Skill.objects.bulk_create([Skill(name=n) for k, n in skill_names.items() if k not in known])
+        skill_ids = {name.casefold(): pk for pk, name in Skill.objects.values_list("id", "name")}
+
+        depts = {}
+        for dept, (g, _) in rosters.items():
+            depts[dept], _ = Department.objects.update_or_create(
+                name=dept, defaults={"login": g.get("login", ""), "password": g.get("password", "")})
+
+        # skład działów z plików zastępuje skład w bazie
+        all_ids = [u["id"] for _, users in rosters.values() for u in users]
+        Employee.objects.filter(department__in=depts.values()).exclude(emp_id__in=all_ids).delete()
+        existing = {e.emp_id: e for e in Employee.objects.filter(emp_id__in=all_ids)}
+
+        to_create, to_update = [], []
+        for dept, (_, users) in rosters.items():
+            for order, u in enumerate(users):
+                e = existing.get(u["id"])
+                if e is None:
+                    e = Employee(emp_id=u["id"])
+                    to_create.append(e)
+                else:
+                    to_update.append(e)
+                e.department = depts[dept]
+                e.order = order
+                for f in EMPLOYEE_FIELDS:
+                    setattr(e, f, u[f])
+
+        # nazwy mogą się zamieniać między wierszami – najpierw zwalniamy unikalne (dział, nazwa)
+        if to_update:
+            Employee.objects.filter(pk__in=[e.pk for e in to_update]).update(
+                name=Concat(Value("~"), Cast("id", CharField())))
+            Employee.objects.bulk_update(to_update, ["department", "order", "name", *EMPLOYEE_FIELDS[1:]],
+                                         batch_size=500)
+        Employee.objects.bulk_create(to_create, batch_size=500)
+
+        Through = Employee.skills.through
+        by_id = dict(Employee.objects.filter(emp_id__in=all_ids).values_list("emp_id", "id"))
+        Through.objects.filter(employee_id__in=by_id.values()).delete()
+        links = []
+        for _, users in rosters.values():
+            for u in users:
+                for k, v in u["skills"].items():
+                    if v and k.strip():
+                        links.append(Through(employee_id=by_id[u["id"]], skill_id=skill_ids[k.strip().casefold()]))
+        Through.objects.bulk_create(links, batch_size=1000, ignore_conflicts=True)
+        return depts
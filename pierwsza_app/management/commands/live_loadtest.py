@@ -0,0 +1,152 @@
+# pierwsza_app/management/commands/live_loadtest.py
+"""
+Test obciążeniowy kanału na żywo (SSE).
+
+Tryb domyślny (w procesie): N bezczynnych subskrypcji huba w jednej pętli
+asyncio, potem seria publikacji z osobnego wątku (tak jak robi to autosave
+pod ASGI). Raportuje pamięć na połączenie i opóźnienie rozgłoszenia.
+
+Tryb --url: N surowych połączeń TCP do działającego serwera ASGI,
+trzymanych bezczynnie przez --hold sekund; raportuje ile przetrwało.
+
+    python manage.py live_loadtest --connections 300 --events 50
+    python manage.py live_loadtest --url "http://127.0.0.1:8000/live/Kardiologia/?month=1&year=2025" \\
+        --sessionid <cookie> --connections 300 --hold 60
+"""
+import asyncio
+import threading
+import time
+import tracemalloc
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+from pierwsza_app.core.live import GridHub, channel_name
+
+
+def _pct(sorted_vals, p):
+    if not sorted_vals:
+        return 0.0
+    k = min(len(sorted_vals) - 1, int(round(p / 100.0 * (len(sorted_vals) - 1))))
+    return sorted_vals[k]
+
+
+class Command(BaseCommand):
+    help = "Test obciążeniowy kanału SSE: wiele bezczynnych połączeń + rozgłaszanie zmian komórek."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--connections", type=int, default=300)
+        parser.add_argument("--events", type=int, default=50, help="liczba publikacji (tryb w procesie)")
+        parser.add_argument("--url", default="", help="adres /live/... działającego serwera ASGI")
+        parser.add_argument("--sessionid", default="", help="ciasteczko sessionid zalogowanego działu")
+        parser.add_argument("--hold", type=float, default=30.0, help="ile sekund trzymać połączenia (tryb --url)")
+
+    def handle(self, *args, **opts):
+        n = opts["connections"]
+        if n < 1:
+            raise CommandError("--connections musi być >= 1")
+        if opts["url"]:
+            asyncio.run(self._run_remote(opts["url"], opts["sessionid"], n, opts["hold"]))
+        else:
+            asyncio.run(self._run_local(n, opts["events"]))
+
+    # ---- w procesie ----
+    async def _run_local(self, n, events):
+        hub = GridHub()
+        channel = channel_name("LoadTest", "Styczeń", "2025")
+        latencies = []
+        received = [0]
+
+        async def client(sub):
+            while True:
+                payload = await sub.queue.get()
+                if payload is None:
+                    return
+                sent_at = float(payload.split('"t": ', 1)[1].rstrip("}"))
+                latencies.append(time.perf_counter() - sent_at)
+                received[0] += 1
+
+        tracemalloc.start()
+        base = tracemalloc.take_snapshot()
+        subs = [hub.subscribe(channel) for _ in range(n)]
+        tasks = [asyncio.create_task(client(s)) for s in subs]
+        await asyncio.sleep(0)
+        mem = sum(st.size_diff for st in tracemalloc.take_snapshot().compare_to(base, "filename"))
+        tracemalloc.stop()
+
+        def producer():
+            for i in range(events):
+                hub.publish(channel, {"user_name": "X", "day": 1 + i % 28, "value": "1",
+                                      "t": time.perf_counter()})
+                time.sleep(0.005)
+
+        t0 = time.perf_counter()
+        th = threading.Thread(target=producer)
+        th.start()
+        expected = n * events
+        while received[0] < expected and time.perf_counter() - t0 < 30:
+            await asyncio.sleep(0.01)
+        th.join()
+        elapsed = time.perf_counter() - t0
+
+        for t in tasks:
+            t.cancel()
+        for s in subs:
+            hub.unsubscribe(s)
+
+        lat = sorted(latencies)
+        self.stdout.write(f"połączenia: {n}, publikacje: {events}, dostarczone: {received[0]}/{expected}")
+        self.stdout.write(f"pamięć: {mem / 1024:.1f} KiB łącznie, {mem / n:.0f} B na połączenie")
+        self.stdout.write(
+            f"opóźnienie rozgłoszenia: p50={_pct(lat, 50) * 1000:.2f} ms  "
+            f"p95={_pct(lat, 95) * 1000:.2f} ms  max={(lat[-1] if lat else 0) * 1000:.2f} ms  "
+            f"(czas całkowity {elapsed:.2f} s)"
+        )
+        if received[0] < expected:
+            raise CommandError("Nie wszystkie wiadomości zostały dostarczone.")
+
+    # ---- działający serwer ----
+    async def _run_remote(self, url, sessionid, n, hold):
+        parts = urlsplit(url)
+        if parts.scheme != "http":
+            raise CommandError("Obsługiwane są tylko adresy http:// (test lokalny / za proxy).")
+        host, port = parts.hostname, parts.port or 80
+        path = parts.path + (f"?{parts.query}" if parts.query else "")
+        cookie = f"Cookie: sessionid={sessionid}\r\n" if sessionid else ""
+        request = (f"GET {path} HTTP/1.1\r\nHost: {parts.netloc}\r\nAccept: text/event-stream\r\n"
+                   f"{cookie}Connection: keep-alive\r\n\r\n").encode()
+
+        async def one():
+            try:
+                reader, writer = await asyncio.open_connection(host, port)
+                writer.write(request)
+                await writer.drain()
+                status = await asyncio.wait_for(reader.readline(), timeout=10)
+                if b" 200 " not in status:
+                    writer.close()
+                    return "http " + status.decode(errors="replace").strip()
+                deadline = time.monotonic() + hold
+                while (remaining := deadline - time.monotonic()) > 0:
+                    try:
+                        chunk = await asyncio.wait_for(reader.read(4096), timeout=remaining)
+                    except asyncio.TimeoutError:
+                        break
+                    if not chunk:
+                        return "zamknięte przez serwer"
+                writer.close()
+                return "ok"
+            except asyncio.TimeoutError:
+                return "timeout"
+            except OSError as e:
+                return f"błąd: {e}"
+
+        t0 = time.perf_counter()
+        results = await asyncio.gather(*(one() for _ in range(n)))
+        summary = {}
+        for r in results:
+            summary[r] = summary.get(r, 0) + 1
+        self.stdout.write(f"połączenia: {n}, trzymane {hold:.0f} s, czas {time.perf_counter() - t0:.1f} s")
+        for k, v in sorted(summary.items(), key=lambda kv: -kv[1]):
+            self.stdout.write(f"  {k}: {v}")
+        if summary.get("ok", 0) < n:
+            raise CommandError("Część połączeń nie przetrwała testu.")
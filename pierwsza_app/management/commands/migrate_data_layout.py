@@ -0,0 +1,51 @@
+# pierwsza_app/management/commands/migrate_data_layout.py
+"""
+Przenosi pliki działów z płaskiego DATA_DIR do katalogów per dział (core/storage.py).
+
+    {dział}_users.json              -> departments/{dział}/users.json
+    {dział}_grafik_plan.json        -> departments/{dział}/grafik_plan.json
+    {dział}_{miesiąc}_{rok}.json    -> departments/{dział}/{rok}/{miesiąc}.json
+    karta_/grafik_{dział}_....pdf   -> departments/{dział}/{rok}/
+
+    python manage.py migrate_data_layout --dry-run
+    python manage.py migrate_data_layout
+
+Działy to te z bazy (Department) i z groups.json – pliki innych nazw zostają
+na miejscu. Nazwa działu jest dopasowywana w całości, więc „Chirurgia”
+nie zabierze plików „Chirurgia_Dziecięca”. Ponowne uruchomienie jest
+bezpieczne (nie ma już czego przenosić); istniejący plik docelowy przerywa
+migrację zamiast go nadpisać.
+"""
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from pierwsza_app.core import storage
+from pierwsza_app.models import Department
+from pierwsza_app.utils import BASE_DIR, GROUPS_FILE, read_text
+
+
+class Command(BaseCommand):
+    help = "Przenosi pliki działów do DATA_DIR/departments/<dział>/[<rok>/]."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true", help="tylko wypisz, nic nie przenoś")
+
+    def handle(self, *args, **opts):
+        groups = set(Department.objects.values_list("name", flat=True))
+        if GROUPS_FILE.exists():
+            try:
+                groups.update((g.get("name") or "").strip() for g in json.loads(read_text(GROUPS_FILE)))
+            except Exception as e:
+                raise CommandError(f"Nie można odczytać groups.json: {e}")
+        groups.discard("")
+
+        try:
+            moved = storage.migrate_legacy(BASE_DIR, groups, dry_run=opts["dry_run"])
+        except (FileExistsError, ValueError) as e:
+            raise CommandError(str(e))
+
+        for src, dst in moved:
+            self.stdout.write(f"{src.name} -> {dst.relative_to(BASE_DIR)}")
+        verb = "Do przeniesienia" if opts["dry_run"] else "Przeniesiono"
+        self.stdout.write(self.style.SUCCESS(f"{verb}: {len(moved)} plików, działy: {len(groups)}."))
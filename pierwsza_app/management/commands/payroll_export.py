@@ -0,0 +1,53 @@
+# pierwsza_app/management/commands/payroll_export.py
+"""
+Eksport płacowy wszystkich działów do jednego CSV (core/payroll.py).
+
+    python manage.py payroll_export Styczeń 2025 Grudzień 2025 --output place_2025.csv
+    python manage.py payroll_export Marzec 2025 Marzec 2025 --workers 8 --group Kardiologia
+
+Postęp (dział po dziale) idzie na stderr, CSV na stdout albo do --output.
+"""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from pierwsza_app.core import payroll
+from pierwsza_app.utils import POLISH_MONTHS, load_groups
+
+
+class Command(BaseCommand):
+    help = "Profile + statystyki (workdays/ndz/l4) wszystkich działów dla zakresu miesięcy – jeden CSV."
+
+    def add_arguments(self, parser):
+        parser.add_argument("from_month")
+        parser.add_argument("from_year", type=int)
+        parser.add_argument("to_month")
+        parser.add_argument("to_year", type=int)
+        parser.add_argument("--group", action="append", help="dział (można powtórzyć); domyślnie wszystkie")
+        parser.add_argument("--workers", type=int, help="procesy robocze (domyślnie PAYROLL_WORKERS / rdzenie)")
+        parser.add_argument("--output", help="plik wynikowy; domyślnie stdout")
+
+    def handle(self, *args, **opts):
+        from pierwsza_app.views import months_between
+
+        for m in (opts["from_month"], opts["to_month"]):
+            if m not in POLISH_MONTHS:
+                raise CommandError(f"Nieznany miesiąc: {m}")
+        my = months_between(opts["from_month"], opts["from_year"], opts["to_month"], opts["to_year"])
+        if not my:
+            raise CommandError("Pusty zakres miesięcy.")
+        groups = opts["group"] or [g["name"] for g in load_groups()]
+        t0 = time.perf_counter()
+
+        def progress(done, total, group, n_rows):
+            self.stderr.write(f"[{done}/{total}] {group}: {n_rows} os. ({time.perf_counter() - t0:.1f} s)")
+
+        chunks = payroll.stream_csv(groups, my, workers=opts["workers"], progress=progress,
+                                    bom=bool(opts["output"]))
+        if opts["output"]:
+            with open(opts["output"], "w", encoding="utf-8", newline="") as f:
+                f.writelines(chunks)
+            self.stderr.write(self.style.SUCCESS(f"Zapisano {opts['output']}: działy {len(groups)}."))
+        else:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending="")
@@ -0,0 +1,73 @@
+# pierwsza_app/management/commands/scheduler_benchmark.py
+"""
+Pomiar generatora grafiku (pierwsza_app/core/scheduler.py) na syntetycznych działach.
+
+    python manage.py scheduler_benchmark
+    python manage.py scheduler_benchmark --sizes 20 100 500 --budget 3 --seed 1
+
+Dla każdej wielkości działu losuje skład (stanowiska/umiejętności jak w
+core/synthetic.py), kilka procent nieobecności (W / C / UO) i zapotrzebowanie
+dzienne ok. --load × liczba osób na stanowisku, rozłożone na zmiany 1/2/3
+w proporcji 45/35/20%. Nic nie czyta ani nie zapisuje w DATA_DIR.
+"""
+import calendar
+import random
+
+from django.core.management.base import BaseCommand
+
+from pierwsza_app.core.scheduler import generate_month, SHIFTS
+from pierwsza_app.core.synthetic import POSITIONS, SKILLS, FIRST, LAST
+
+ABSENCES = ["W", "C", "UO"]
+SHIFT_SPLIT = (0.45, 0.35, 0.20)
+
+
+def synthetic_department(size, year, month, rnd, load=0.6, absence=0.06):
+    employees = []
+    for i in range(size):
+        skills = {s: True for s in rnd.sample(SKILLS, rnd.randint(0, 3))}
+        employees.append({"name": f"{rnd.choice(LAST)} {rnd.choice(FIRST)} {i}",
+                          "position": rnd.choice(POSITIONS), "skills": skills})
+
+    n_days = calendar.monthrange(year, month)[1]
+    existing = {e["name"]: [rnd.choice(ABSENCES) if rnd.random() < absence else "" for _ in range(n_days)]
+                for e in employees}
+
+    per_position = {}
+    for e in employees:
+        per_position[e["position"]] = per_position.get(e["position"], 0) + 1
+    demand = {s: [] for s in SHIFTS}
+    for pos, count in sorted(per_position.items()):
+        daily = count * load
+        for s, share in zip(SHIFTS, SHIFT_SPLIT):
+            demand[s] += [pos] * int(round(daily * share))
+    return employees, demand, existing
+
+
+class Command(BaseCommand):
+    help = "Mierzy czas i jakość generatora grafiku na działach 20/100/500 osób."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", type=int, nargs="+", default=[20, 100, 500])
+        parser.add_argument("--budget", type=float, default=3.0, help="sekundy na przeszukiwanie")
+        parser.add_argument("--year", type=int, default=2025)
+        parser.add_argument("--month", type=int, default=3)
+        parser.add_argument("--load", type=float, default=0.6, help="sloty dziennie na osobę")
+        parser.add_argument("--seed", type=int, default=1)
+
+    def handle(self, *args, **opts):
+        year, month = opts["year"], opts["month"]
+        special = [d for d in range(1, calendar.monthrange(year, month)[1] + 1)
+                   if calendar.weekday(year, month, d) == 6]
+        self.stdout.write(f"{'osób':>5} {'slotów':>7} {'czas ms':>9} {'iteracji':>9} "
+                          f"{'luki':>5} {'koszt':>10} {'odchylenie od normy':>20}")
+        for size in opts["sizes"]:
+            rnd = random.Random(opts["seed"] + size)
+            employees, demand, existing = synthetic_department(size, year, month, rnd, load=opts["load"])
+            past = {e["name"]: rnd.randint(0, 3) for e in employees}
+            p = generate_month(employees, demand, existing, year, month, special_days=special,
+                               past_special=past, budget=opts["budget"], seed=opts["seed"])
+            n_slots = sum(len(v) for v in demand.values()) * calendar.monthrange(year, month)[1]
+            dev = [v["shifts"] - v["target"] for v in p.stats.values()] or [0]
+            self.stdout.write(f"{size:>5} {n_slots:>7} {p.elapsed * 1000:>9.0f} {p.iterations:>9} "
+                              f"{len(p.uncovered):>5} {p.cost:>10.0f} {min(dev):>+9} .. {max(dev):+d}")
@@ -0,0 +1,112 @@
+# pierwsza_app/management/commands/startup_benchmark.py
+"""
+Koszt startu workera: rozkład `python -X importtime` i czas do pierwszej odpowiedzi.
+
+    python manage.py startup_benchmark
+    python manage.py startup_benchmark --repeat 7 --top 20 --path /ping/
+
+Każdy pomiar to świeży proces, który robi to samo co worker gunicorna:
+django.setup() + załadowanie URL-i (a więc views.py), potem jedno żądanie
+przez handler WSGI. Czas do pierwszej odpowiedzi liczony jest od uruchomienia
+procesu. Drugi wariant to ten sam start z PDF_WARMUP=True (--preload), żeby
+było widać, ile kosztuje załadowanie podsystemu PDF.
+"""
+import os
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+IMPORT_SNIPPET = (
+    "import django; django.setup()\n"
+    "from django.urls import get_resolver; get_resolver().url_patterns\n"
+)
+FIRST_RESPONSE_SNIPPET = (
+    "import sys, time; t0 = time.perf_counter()\n"
+    "from django.core.wsgi import get_wsgi_application\n"
+    "from django.test import Client\n"
+    "app = get_wsgi_application()\n"
+    "r = Client(HTTP_HOST='localhost').get(sys.argv[1])\n"
+    "print(r.status_code, time.perf_counter() - t0)\n"
+)
+
+
+def _run(code, *args, env_extra=None, importtime=False):
+    env = dict(os.environ, DJANGO_SETTINGS_MODULE=os.environ.get("DJANGO_SETTINGS_MODULE", "moja_aplikacja.settings"),
+               **(env_extra or {}))
+    cmd = [sys.executable] + (["-X", "importtime"] if importtime else []) + ["-c", code, *args]
+    t0 = time.perf_counter()
+    proc = subprocess.run(cmd, cwd=str(settings.BASE_DIR), env=env, capture_output=True, text=True)
+    wall = time.perf_counter() - t0
+    if proc.returncode != 0:
+        raise CommandError(proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "proces zakończył się błędem")
+    return proc, wall
+
+
+def parse_importtime(stderr):
+    """[(moduł, self_us, cumulative_us)] z wyjścia -X importtime."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        try:
+            self_us, cum_us, name = (p.strip() for p in line.split(":", 1)[1].split("|"))
+            rows.append((name, int(self_us), int(cum_us)))
+        except ValueError:
+            continue
+    return rows
+
+
+class Command(BaseCommand):
+    help = "Mierzy import (-X importtime) i czas do pierwszej odpowiedzi świeżego workera."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument("--top", type=int, default=12, help="ile pakietów pokazać w rozkładzie")
+        parser.add_argument("--path", default="/ping/", help="adres pierwszego żądania")
+
+    def handle(self, *args, **opts):
+        repeat = max(1, opts["repeat"])
+
+        # --- rozkład importów (mediana z powtórzeń, per pakiet najwyższego poziomu) ---
+        per_pkg = defaultdict(list)
+        totals, views_cum, pdf_loaded = [], [], False
+        for _ in range(repeat):
+            proc, _ = _run(IMPORT_SNIPPET, importtime=True)
+            rows = parse_importtime(proc.stderr)
+            sums = defaultdict(int)
+            for name, self_us, cum_us in rows:
+                sums[name.split(".")[0]] += self_us
+                if name == "pierwsza_app.views":
+                    views_cum.append(cum_us)
+                if name.startswith("reportlab"):
+                    pdf_loaded = True
+            for pkg, us in sums.items():
+                per_pkg[pkg].append(us)
+            totals.append(sum(sums.values()))
+
+        self.stdout.write(f"Import (django.setup + URL-e), mediana z {repeat}: "
+                          f"{statistics.median(totals) / 1000:.1f} ms; "
+                          f"pierwsza_app.views: {statistics.median(views_cum or [0]) / 1000:.1f} ms; "
+                          f"ReportLab przy starcie: {'tak' if pdf_loaded else 'nie'}")
+        ranked = sorted(per_pkg.items(), key=lambda kv: -statistics.median(kv[1]))[:opts["top"]]
+        for pkg, samples in ranked:
+            self.stdout.write(f"  {pkg:<28} {statistics.median(samples) / 1000:8.1f} ms")
+
+        # --- czas do pierwszej odpowiedzi: leniwie vs PDF_WARMUP ---
+        self.stdout.write(f"\nCzas do pierwszej odpowiedzi ({opts['path']}), mediana z {repeat}:")
+        for label, env in (("leniwy PDF", {"PDF_WARMUP": "False"}), ("PDF_WARMUP=True", {"PDF_WARMUP": "True"})):
+            walls, inside = [], []
+            for _ in range(repeat):
+                proc, wall = _run(FIRST_RESPONSE_SNIPPET, opts["path"], env_extra=env)
+                status, elapsed = proc.stdout.split()[-2:]
+                if status != "200":
+                    raise CommandError(f"{opts['path']} zwrócił {status}")
+                walls.append(wall)
+                inside.append(float(elapsed))
+            self.stdout.write(f"  {label:<18} proces: {statistics.median(walls) * 1000:7.1f} ms   "
+                              f"w procesie: {statistics.median(inside) * 1000:7.1f} ms")
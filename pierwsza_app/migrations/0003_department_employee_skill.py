@@ -0,0 +1,56 @@
+# Generated by Django 5.2.5 on 2026-10-19 02:26
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pierwsza_app', '0002_alter_cell_options_alter_cell_unique_together_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Department',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=120, unique=True)),
+                ('login', models.CharField(max_length=120)),
+                ('password', models.CharField(max_length=120)),
+            ],
+            options={
+                'ordering': ['id'],
+            },
+        ),
+        migrations.CreateModel(
+            name='Skill',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=120, unique=True)),
+            ],
+            options={
+                'ordering': ['id'],
+            },
+        ),
+        migrations.CreateModel(
+            name='Employee',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('emp_id', models.CharField(max_length=20, unique=True)),
+                ('name', models.CharField(max_length=255)),
+                ('position', models.CharField(blank=True, max_length=255)),
+                ('contact', models.CharField(blank=True, max_length=255)),
+                ('email', models.CharField(blank=True, max_length=255)),
+                ('medical_exam', models.CharField(blank=True, db_index=True, max_length=10)),
+                ('order', models.PositiveIntegerField(default=0)),
+                ('department', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='employees', to='pierwsza_app.department')),
+                ('skills', models.ManyToManyField(blank=True, related_name='employees', to='pierwsza_app.skill')),
+            ],
+            options={
+                'ordering': ['department', 'order', 'id'],
+                'indexes': [models.Index(fields=['department', 'order'], name='pierwsza_ap_departm_b5d5a8_idx')],
+                'constraints': [models.UniqueConstraint(fields=('department', 'name'), name='unique_employee_name_per_department')],
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.5 on 2026-10-19 02:31
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pierwsza_app', '0003_department_employee_skill'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DayPlan',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('rows', models.JSONField(default=list)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('department', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='day_plans', to='pierwsza_app.department')),
+            ],
+            options={
+                'ordering': ['department', 'date'],
+                'constraints': [models.UniqueConstraint(fields=('department', 'date'), name='unique_day_plan_per_department')],
+            },
+        ),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 5.2.5 on 2026-10-19
+
+import json
+from datetime import date
+from pathlib import Path
+
+from django.conf import settings
+from django.db import migrations
+
+
+def split_plan_files(apps, schema_editor):
+    """
+    Rozbija plan działu (departments/<dział>/grafik_plan.json, przed
+    migrate_data_layout {dział}_grafik_plan.json) na wiersze DayPlan, jeden na dzień.
+
+    Przenosimy tylko format słownikowy {"RRRR-MM-DD": [wiersze]}. Najstarszy
+    format – sama lista wierszy bez daty, którą widok pokazywał pod każdą
+    datą – nie ma dnia, do którego dałoby się go przypisać; zostaje w pliku.
+
+    Dotyczy działów już obecnych w bazie: na świeżej bazie (migrate przed
+    import_roster_json) migracja nic nie robi, a plany wczytuje import.
+    Pliki zostają na miejscu jako kopia.
+    """
+    Department = apps.get_model("pierwsza_app", "Department")
+    DayPlan = apps.get_model("pierwsza_app", "DayPlan")
+    data_dir = Path(settings.DATA_DIR)
+
+    for dept in Department.objects.all():
+        path = data_dir / "departments" / dept.name / "grafik_plan.json"
+        if not path.exists():
+            path = data_dir / f"{dept.name}_grafik_plan.json"
+        if not path.exists():
+            continue
+        try:
+            days = json.loads(path.read_text(encoding="utf-8"))
+        except Exception:
+            continue
+        if not isinstance(days, dict):
+            continue
+        done = set(DayPlan.objects.filter(department=dept).values_list("date", flat=True))
+        plans = []
+        for key, rows in days.items():
+            try:
+                day = date.fromisoformat(str(key).strip())
+            except ValueError:
+                continue
+            if day not in done and isinstance(rows, list):
+                done.add(day)
+                plans.append(DayPlan(department=dept, date=day, rows=rows))
+        DayPlan.objects.bulk_create(plans, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pierwsza_app', '0004_dayplan'),
+    ]
+
+    operations = [
+        migrations.RunPython(split_plan_files, migrations.RunPython.noop),
+    ]
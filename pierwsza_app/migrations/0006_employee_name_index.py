@@ -0,0 +1,17 @@
+# Generated by Django 5.2.5 on 2026-10-19 02:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pierwsza_app', '0005_split_grafik_plan_files'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='employee',
+            index=models.Index(fields=['name'], name='pierwsza_ap_name_76ec86_idx'),
+        ),
+    ]
@@ -28,3 +28,77 @@ class Cell(models.Model):
 
     def __str__(self):
         return f"{self.user_name} {self.year}-{self.month:02d}-{self.day:02d} = {self.value or '-'}"
+
+
+class Skill(models.Model):
+    """Globalny katalog umiejętności (dawniej skills_catalog.json)."""
+    name = models.CharField(max_length=120, unique=True)
+
+    class Meta:
+        ordering = ["id"]
+
+    def __str__(self):
+        return self.name
+
+
+class Department(models.Model):
+    """Dział (dawniej wpis w groups.json)."""
+    name = models.CharField(max_length=120, unique=True)
+    login = models.CharField(max_length=120)
+    password = models.CharField(max_length=120)
+
+    class Meta:
+        ordering = ["id"]
+
+    def __str__(self):
+        return self.name
+
+
+class Employee(models.Model):
+    """Pracownik działu (dawniej wpis w {dział}_users.json)."""
+    emp_id = models.CharField(max_length=20, unique=True)   # stałe ID – klucz history/emp_{id}.json
+    department = models.ForeignKey(Department, on_delete=models.CASCADE, related_name="employees")
+    name = models.CharField(max_length=255)
+    position = models.CharField(max_length=255, blank=True)
+    contact = models.CharField(max_length=255, blank=True)  # telefon
+    email = models.CharField(max_length=255, blank=True)
+    medical_exam = models.CharField(max_length=10, blank=True, db_index=True)  # 'YYYY-MM-DD'
+    order = models.PositiveIntegerField(default=0)          # kolejność wierszy w dziale
+    skills = models.ManyToManyField(Skill, blank=True, related_name="employees")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["department", "name"],
+                name="unique_employee_name_per_department"
+            )
+        ]
+        indexes = [
+            models.Index(fields=["department", "order"]),
+            models.Index(fields=["name"]),   # katalog po nazwisku (plany, wysyłki)
+        ]
+        ordering = ["department", "order", "id"]
+
+    def __str__(self):
+        return f"{self.department.name} / {self.name}"
+
+
+class DayPlan(models.Model):
+    """Obsada jednego dnia w dziale (dawniej klucz w {dział}_grafik_plan.json)."""
+    department = models.ForeignKey(Department, on_delete=models.CASCADE, related_name="day_plans")
+    date = models.DateField()
+    rows = models.JSONField(default=list)   # [{"name", "position", "contact"}, ...]
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            # unikalność = indeks (dział, data) – odczyt/zapis dnia i zakresy dat
+            models.UniqueConstraint(
+                fields=["department", "date"],
+                name="unique_day_plan_per_department"
+            )
+        ]
+        ordering = ["department", "date"]
+
+    def __str__(self):
+        return f"{self.department.name} {self.date.isoformat()}"
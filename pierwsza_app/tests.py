@@ -1,3 +1,802 @@
-from django.test import TestCase
+import asyncio
+import importlib
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+from io import StringIO
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import iscoroutinefunction
+from django.apps import apps
+from django.core import mail
+from django.core.mail.backends import locmem
+from django.core.management import call_command
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from . import utils, views
+from .core import archive, events, exams, gridops, labour_rules, metrics, payroll, scheduler, search, storage, writebehind
+from .management.commands import exam_digest
+from .models import DayPlan, Department, Employee, Skill
+
+GROUP = "Testowy"
+
+
+class DataDirMixin:
+    """Osobny DATA_DIR na czas testu – moduły trzymają BASE_DIR jako stałą."""
+
+    def setUp(self):
+        super().setUp()
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.root = Path(tmp.name)
+        storage.department_dir(self.root, GROUP).mkdir(parents=True)
+        (self.root / "history").mkdir()
+        for module, name, value in ((utils, "BASE_DIR", self.root), (views, "BASE_DIR", self.root),
+                                    (views, "HISTORY_DIR", self.root / "history")):
+            patcher = mock.patch.object(module, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def write_month(self, month, year, data):
+        path = storage.month_file(self.root, GROUP, month, year)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        body = {"group": GROUP, "month": month, "year": str(year), "data": data}
+        path.write_text(json.dumps(body, ensure_ascii=False), encoding="utf-8")
+
+
+# ---- write-behind autosave (core/writebehind.py) ----
+
+class WriteBehindLogTests(TestCase):
+    def test_parse_skips_torn_last_line(self):
+        raw = (writebehind.encode("Marzec", 2025, "Anna", 1, "1")
+               + writebehind.encode("Marzec", 2025, "Anna", 2, "2"))
+        torn = raw + writebehind.encode("Marzec", 2025, "Anna", 3, "3")[:-10]
+        self.assertEqual(writebehind.parse(torn), [
+            ("Marzec", "2025", "Anna", 1, "1"),
+            ("Marzec", "2025", "Anna", 2, "2"),
+        ])
+
+    def test_parse_skips_garbage_line(self):
+        raw = b"{not json\n" + writebehind.encode("Maj", 2025, "Ewa", 4, "C")
+        with self.assertLogs("pierwsza_app.core.writebehind", level="WARNING"):
+            self.assertEqual(writebehind.parse(raw), [("Maj", "2025", "Ewa", 4, "C")])
+
+    def test_coalesce_keeps_last_write(self):
+        edits = writebehind.coalesce([
+            ("Marzec", "2025", "Anna", 1, "1"),
+            ("Marzec", "2025", "Anna", 1, "3"),
+            ("Marzec", "2025", "Ewa", 1, "W"),
+            ("Kwiecień", "2025", "Anna", 1, "2"),
+            ("Marzec", "2025", "Anna", 1, ""),
+        ])
+        self.assertEqual(edits, {
+            ("Marzec", "2025"): {("Anna", 1): "", ("Ewa", 1): "W"},
+            ("Kwiecień", "2025"): {("Anna", 1): "2"},
+        })
+
+    def test_overlay_pads_short_rows(self):
+        data = {"Anna": ["1"]}
+        writebehind.overlay(data, {("Anna", 3): "C", ("Ewa", 2): "W"})
+        self.assertEqual(data, {"Anna": ["1", "", "C"], "Ewa": ["", "W"]})
+
+
+class WriteBehindFlushTests(DataDirMixin, TestCase):
+    def write_log(self, *entries):
+        with open(storage.autosave_log(self.root, GROUP), "ab") as f:
+            for entry in entries:
+                f.write(writebehind.encode(*entry))
+
+    def test_flush_writes_month_and_truncates_log(self):
+        self.write_month("Marzec", 2025, {"Anna": ["1"] * 31})
+        self.write_log(("Marzec", 2025, "Anna", 2, "W"), ("Marzec", 2025, "Anna", 2, "C"))
+        self.assertEqual(writebehind.flush(self.root, GROUP), 1)
+        self.assertEqual(utils.load_month_file(GROUP, "Marzec", 2025)["Anna"][:3], ["1", "C", "1"])
+        self.assertEqual(storage.autosave_log(self.root, GROUP).stat().st_size, 0)
+
+    def test_flush_into_closed_year_rejects_instead_of_dropping(self):
+        self.write_month("Marzec", 2023, {"Anna": ["1"] * 31})
+        archive.close_year(self.root, GROUP, 2023, self.root / "history", lambda month, data: {})
+        self.write_month("Marzec", 2025, {"Anna": [""] * 31})
+        self.write_log(("Marzec", 2023, "Anna", 5, "W"), ("Marzec", 2025, "Anna", 5, "2"))
+
+        with self.assertLogs("pierwsza_app.core.writebehind", level="ERROR"):
+            self.assertEqual(writebehind.flush(self.root, GROUP), 1)
+
+        rejected = [json.loads(line) for line in
+                    storage.autosave_rejected(self.root, GROUP).read_text(encoding="utf-8").splitlines()]
+        self.assertEqual([(r["year"], r["user"], r["day"], r["value"]) for r in rejected],
+                         [("2023", "Anna", 5, "W")])
+        self.assertEqual(archive.month_data(self.root, GROUP, "Marzec", 2023)["Anna"][4], "1")
+        self.assertEqual(utils.load_month_file(GROUP, "Marzec", 2025)["Anna"][4], "2")
+        self.assertEqual(storage.autosave_log(self.root, GROUP).stat().st_size, 0)
+
+
+# ---- historia siatki jako zdarzenia (core/events.py) ----
+
+class EventsTests(DataDirMixin, TestCase):
+    MONTH, YEAR = "Marzec", "2025"
+
+    def setUp(self):
+        super().setUp()
+        self.clock = 1_000_000
+        patcher = mock.patch.object(events.time, "time_ns", side_effect=self.tick)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tick(self):
+        self.clock += 1000
+        return self.clock
+
+    def record(self, user, day, old, new, **kw):
+        events.record(self.root, GROUP, self.MONTH, self.YEAR, [events.Change(user, day, old, new)],
+                      base=lambda: {}, **kw)
+        return self.clock
+
+    def test_as_of_around_snapshot_boundaries(self):
+        states, grid = [], {}
+        with mock.patch.object(events, "SNAPSHOT_BYTES", 300):
+            for i in range(12):
+                user, day = ("Anna", "Ewa")[i % 2], i % 5 + 1
+                row = grid.get(user) or []
+                old = row[day - 1] if day <= len(row) else ""
+                t = self.record(user, day, old, str(i))
+                events.apply(grid, user, day, str(i))
+                states.append((t, json.loads(json.dumps(grid))))
+        snaps = events.snapshots(self.root, GROUP, self.MONTH, self.YEAR)
+        self.assertGreaterEqual(len(snaps), 3)          # genesis + co najmniej dwie
+
+        for t, want in states:
+            for at in (t, t + 1):
+                state = events.as_of(self.root, GROUP, self.MONTH, self.YEAR, at)
+                self.assertTrue(state["exact"])
+                self.assertEqual(state["data"], want, f"as_of({at})")
+        # tuż przed każdą migawką (poza genesis) – stan sprzed zdarzenia, które ją zamknęło
+        by_t = dict(states)
+        ts = [t for t, _ in states]
+        for _, snap_t, _ in snaps[1:]:
+            i = ts.index(snap_t)
+            state = events.as_of(self.root, GROUP, self.MONTH, self.YEAR, snap_t - 1)
+            self.assertEqual(state["data"], by_t[ts[i - 1]])
+        before = events.as_of(self.root, GROUP, self.MONTH, self.YEAR, 0)
+        self.assertFalse(before["exact"])
+        self.assertEqual(before["data"], {})
+
+    def test_event_times_follow_file_order_when_clock_goes_back(self):
+        self.record("Anna", 1, "", "1")
+        self.clock -= 10**9
+        self.record("Anna", 2, "", "2")
+        ts = [e["t"] for _, e in events.read_events(self.root, GROUP, self.MONTH, self.YEAR)]
+        self.assertLess(ts[0], ts[1])
+
+    def test_undoable_skips_undone_and_filters_editor(self):
+        self.record("Anna", 1, "", "1", editor="a")
+        self.record("Anna", 2, "", "2", editor="b")
+        self.record("Anna", 3, "", "3", editor="a")
+        (last_offset, last), = events.undoable(self.root, GROUP, self.MONTH, self.YEAR, 1)
+        self.assertEqual(last["day"], 3)
+        events.record(self.root, GROUP, self.MONTH, self.YEAR, [events.Change("Anna", 3, "3", "")],
+                      src="undo", extra=[{"undo": last_offset}])
+
+        days = [e["day"] for _, e in events.undoable(self.root, GROUP, self.MONTH, self.YEAR, 5)]
+        self.assertEqual(days, [2, 1])
+        mine = [e["day"] for _, e in events.undoable(self.root, GROUP, self.MONTH, self.YEAR, 5, editor="a")]
+        self.assertEqual(mine, [1])
+
+
+# ---- operacje zbiorcze na siatce (core/gridops.py) ----
+
+class GridOpsTests(TestCase):
+    PATTERN = gridops.parse_pattern("1, 1,2,2,w,W")
+
+    def test_rotation_staggers_people(self):
+        cells = gridops.rotation({}, ["Anna", "Ewa", "Jan"], 1, 6, self.PATTERN, stagger=2)
+        self.assertEqual(cells, {
+            "Anna": dict(enumerate(["1", "1", "2", "2", "W", "W"], 1)),
+            "Ewa": dict(enumerate(["2", "2", "W", "W", "1", "1"], 1)),
+            "Jan": dict(enumerate(["W", "W", "1", "1", "2", "2"], 1)),
+        })
+
+    def test_rotation_start_before_range_keeps_phase(self):
+        cells = gridops.rotation({}, ["Anna"], 4, 6, self.PATTERN, start=1)
+        self.assertEqual(cells, {"Anna": {4: "2", 5: "W", 6: "W"}})
+
+    def test_rotation_only_empty_keeps_filled_and_skips_unchanged(self):
+        table = {"Anna": ["C", "", " ", "2"], "Ewa": ["1"]}
+        cells = gridops.rotation(table, ["Anna", "Ewa"], 1, 4, self.PATTERN, stagger=1, only_empty=True)
+        self.assertEqual(cells, {"Anna": {2: "1", 3: "2"}, "Ewa": {2: "2", 3: "2", 4: "W"}})
+        # bez only_empty nadpisujemy, ale komórek już równych wzorowi nie zwracamy
+        cells = gridops.rotation(table, ["Anna"], 1, 4, self.PATTERN)
+        self.assertEqual(cells, {"Anna": {1: "1", 2: "1", 3: "2"}})
+
+    def test_copy_pattern_aligns_weekdays(self):
+        shift = gridops.weekday_shift(date(2025, 2, 1), date(2025, 3, 1))   # sob -> sob
+        self.assertEqual(shift, 0)
+        shift = gridops.weekday_shift(date(2025, 3, 1), date(2025, 4, 1))   # sob -> wt
+        self.assertEqual(shift, 3)
+        source = {"Anna": [str(d % 7) for d in range(1, 32)]}
+        cells = gridops.copy_pattern({}, source, ["Anna", "Ewa"], 28, 30, 31, shift)
+        # 28+3 = 31, 29+3 = 32 -> 25, 30+3 = 33 -> 26; osoby bez wiersza w źródle bez zmian
+        self.assertEqual(cells, {"Anna": {28: "3", 29: "4", 30: "5"}})
+
+
+# ---- reguły czasu pracy (core/labour_rules.py) ----
+
+class LabourRulesTests(TestCase):
+    TOKENS = ("1", "2", "3", "3", "w", "C", "", " ")
+
+    def setUp(self):
+        self.rand = random.Random(20250301)
+        self.validator = views.month_validator("Marzec", 2025)
+
+    def random_row(self, n):
+        return [self.rand.choice(self.TOKENS) for _ in range(n)]
+
+    def full(self, row, lo=1, hi=None):
+        """Pełne sprawdzenie wiersza zawężone do kotwic lo..hi (+ reguły miesięczne)."""
+        hi = self.validator.n_days if hi is None else hi
+        return [v for v in self.validator.validate_row(row) if v["day"] is None or lo <= v["day"] <= hi]
+
+    def test_apply_matches_full_recheck(self):
+        v = self.validator
+        for _ in range(20):
+            row = self.random_row(self.rand.randrange(v.n_days + 1))      # także wiersze krótsze niż miesiąc
+            state = v.state(row)
+            row = row + [""] * (v.n_days - len(row))
+            for _ in range(60):
+                day, value = self.rand.randint(1, v.n_days), self.rand.choice(self.TOKENS)
+                row[day - 1] = value
+                found, (lo, hi) = v.apply(state, day, value)
+                self.assertEqual(found, self.full(row, lo, hi), f"dzień {day} = {value!r}")
+            # sumy miesięczne po serii edycji jak policzone od zera
+            fresh = v.state(row)
+            self.assertEqual((state.hours, state.absent, state.row), (fresh.hours, fresh.absent, fresh.row))
+
+    def test_check_changed_matches_full_recheck(self):
+        v = self.validator
+        for _ in range(20):
+            old = self.random_row(v.n_days)
+            new = list(old)
+            days = self.rand.sample(range(1, v.n_days + 1), self.rand.randint(1, 8))
+            state = v.state(old)
+            for day in days:
+                new[day - 1] = self.rand.choice(self.TOKENS)
+                v.set(state, day, new[day - 1])
+            found = v.check_changed(state, days)
+            anchors = {k for d in days for k in range(v.window(d)[0], v.window(d)[1] + 1)}
+            want = [x for x in v.validate_row(new) if x["day"] is None or x["day"] in anchors]
+            self.assertEqual(found, want)
+            # naruszenia spoza okien się nie zmieniły
+            outside = [x for x in v.validate_row(old) if x["day"] is not None and x["day"] not in anchors]
+            self.assertEqual(outside, [x for x in v.validate_row(new)
+                                       if x["day"] is not None and x["day"] not in anchors])
+
+    def test_rules_fire(self):
+        v = self.validator
+        rules = {x["rule"] for x in v.validate_row(["3", "1"] + ["1"] * 8 + [""] * 21)}
+        self.assertEqual(rules, {"rest_11h", "max_consecutive"})
+        streak = v.n_days - labour_rules.MAX_CONSECUTIVE_DAYS
+        self.assertEqual([x["rule"] for x in v.validate_row(["1"] * v.n_days)],
+                         ["max_consecutive"] * streak + ["overtime"])
+
+
+# ---- roczne archiwum działu (core/archive.py) ----
+
+class ArchiveTests(DataDirMixin, TestCase):
+    MARCH = {"Anna": ["1", "2", "W"], "Ewa": ["C", "", "3"]}
+    APRIL = {"Anna": ["3", "3", "3"]}
+
+    def setUp(self):
+        super().setUp()
+        self.history = self.root / "history"
+        entries = [{"date": "2023-03-01", "token": "1", "group": GROUP},
+                   {"date": "2023-03-02", "token": "2", "group": "Inny"},
+                   {"date": "2024-01-02", "token": "3", "group": GROUP}]
+        (self.history / "emp_7.json").write_text(json.dumps(entries), encoding="utf-8")
+        self.write_month("Marzec", 2023, self.MARCH)
+        self.write_month("Kwiecień", 2023, self.APRIL)
+
+    def close(self):
+        return archive.close_year(self.root, GROUP, 2023, self.history,
+                                  lambda month, data: {name: {"rows": len(row)} for name, row in data.items()})
+
+    def rewrite(self, path, payload):
+        """Podmienia archiwum tylko do odczytu (z nowym stemplem, żeby ominąć cache)."""
+        os.chmod(path, 0o644)
+        path.write_text(json.dumps(payload, ensure_ascii=False), encoding="utf-8")
+        st = path.stat()
+        os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+
+    def test_close_verify_reopen_round_trip(self):
+        path, months = self.close()
+        self.assertEqual(months, ["Marzec", "Kwiecień"])
+        self.assertFalse(storage.month_file(self.root, GROUP, "Marzec", 2023).exists())
+        self.assertFalse(path.stat().st_mode & 0o222)
+
+        payload = archive.load(self.root, GROUP, 2023)
+        archive.verify(payload, months=True)
+        self.assertEqual(archive.month_data(self.root, GROUP, "Marzec", 2023), self.MARCH)
+        self.assertEqual(archive.month_aggregates(self.root, GROUP, "Kwiecień", 2023), {"Anna": {"rows": 3}})
+        self.assertEqual(payload["history"], {"7": [{"date": "2023-03-01", "token": "1"}]})
+        self.assertTrue(archive.is_closed(self.root, GROUP, 2023))
+
+        self.assertEqual(archive.reopen_year(self.root, GROUP, 2023), ["Marzec", "Kwiecień"])
+        self.assertFalse(archive.is_closed(self.root, GROUP, 2023))
+        self.assertEqual(utils.load_month_file(GROUP, "Kwiecień", 2023), self.APRIL)
+
+    def test_close_twice_or_dry_run(self):
+        path, months = archive.close_year(self.root, GROUP, 2023, self.history, dict, dry_run=True)
+        self.assertEqual(months, ["Marzec", "Kwiecień"])
+        self.assertFalse(path.exists())
+        self.close()
+        with self.assertRaises(FileExistsError):
+            self.close()
+
+    def test_load_rejects_tampered_file(self):
+        path, _ = self.close()
+        payload = archive.load(self.root, GROUP, 2023)
+        tampered = json.loads(json.dumps(payload))
+        tampered["months"]["Marzec"]["data"]["Anna"][0] = "W"
+        self.rewrite(path, tampered)
+        with self.assertRaises(archive.ArchiveError):
+            archive.load(self.root, GROUP, 2023)
+
+    def test_month_checksum_mismatch_blocks_reopen(self):
+        path, _ = self.close()
+        tampered = json.loads(json.dumps(archive.load(self.root, GROUP, 2023)))
+        tampered["months"]["Kwiecień"]["data"]["Anna"][2] = "W"
+        tampered["sha256"] = archive.digest({k: v for k, v in tampered.items() if k != "sha256"})
+        self.rewrite(path, tampered)
+
+        archive.verify(archive.load(self.root, GROUP, 2023))       # suma pliku się zgadza, miesiąca – nie
+        with self.assertRaises(archive.ArchiveError):
+            archive.verify(archive.load(self.root, GROUP, 2023), months=True)
+        with self.assertRaises(archive.ArchiveError):
+            archive.reopen_year(self.root, GROUP, 2023)
+        self.assertFalse(storage.month_file(self.root, GROUP, "Kwiecień", 2023).exists())
+
+
+class MonthStampTests(DataDirMixin, TestCase):
+    def age(self, path, seconds=10):
+        st = path.stat()
+        os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns - seconds * 10**9))
+
+    def test_fresh_month_file_is_not_trusted(self):
+        self.write_month("Marzec", 2025, {"Anna": ["1"]})
+        path = storage.month_file(self.root, GROUP, "Marzec", 2025)
+        self.assertIsNone(views._month_stamp(GROUP, "Marzec", "2025"))
+        self.age(path)
+        stamp = views._month_stamp(GROUP, "Marzec", "2025")
+        self.assertEqual(stamp[:2], (path.stat().st_mtime_ns, path.stat().st_size))
+
+        # zapis tej samej długości z tym samym mtime dałby stary stempel – świeży log też unieważnia
+        storage.autosave_log(self.root, GROUP).write_bytes(writebehind.encode("Marzec", 2025, "Anna", 1, "2"))
+        self.assertIsNone(views._month_stamp(GROUP, "Marzec", "2025"))
+
+    def test_state_cache_skips_untrusted_stamp(self):
+        cache = labour_rules.StateCache()
+        state = views.month_validator("Marzec", "2025").state(["1"])
+        cache.put("kanał", "Anna", None, state)
+        self.assertIsNone(cache.get("kanał", "Anna", None))
+        cache.put("kanał", "Anna", (1, 2, None), state)
+        self.assertIs(cache.get("kanał", "Anna", (1, 2, None)), state)
+        self.assertIsNone(cache.get("kanał", "Anna", (1, 3, None)))
+
+
+# ---- badania okresowe (core/exams.py, manage.py exam_digest) ----
+
+class ExamIndexTests(TestCase):
+    TODAY = date(2025, 3, 10)
+
+    def exam(self, days, name, group=GROUP):
+        return exams.Exam(self.TODAY + timedelta(days=days), group, name, name, "")
+
+    def test_expiring_window_is_inclusive(self):
+        index = exams.ExamIndex()
+        index.rebuild([self.exam(-1, "Wczoraj"), self.exam(0, "Dziś"), self.exam(14, "Ostatni"),
+                       self.exam(15, "Za późno"), self.exam(7, "Inny", group="Inny")])
+        self.assertEqual([e.name for e in index.expiring(self.TODAY, 14)], ["Dziś", "Inny", "Ostatni"])
+        self.assertEqual([e.name for e in index.expiring(self.TODAY, 14, groups=[GROUP])], ["Dziś", "Ostatni"])
+        self.assertEqual([e.name for e in index.expiring(self.TODAY, 0, overdue=True)], ["Wczoraj", "Dziś"])
+        self.assertEqual(index.expiring(self.TODAY + timedelta(days=1), 5), [])       # luka 11–16.03
+        self.assertEqual(exams.ExamIndex().expiring(self.TODAY), [])
+
+
+@override_settings(EMAIL_BACKEND="django.core.mail.backends.locmem.EmailBackend", EXAM_DIGEST_TO=[])
+class ExamDigestTests(DataDirMixin, TestCase):
+    TODAY = date(2025, 3, 10)
+
+    def setUp(self):
+        super().setUp()
+        patcher = mock.patch.object(exam_digest, "BASE_DIR", self.root)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        exams.live.reset()
+        self.addCleanup(exams.live.reset)
+        for group, people in ((GROUP, {"Anna": 0, "Ewa": 30, "Jan": 31, "Olga": -1}),
+                              ("Chirurgia", {"Piotr": 5}),
+                              ("Pusty", {"Zofia": 90})):
+            dept = Department.objects.create(name=group, login=group.lower(), password="x")
+            for i, (name, days) in enumerate(people.items()):
+                Employee.objects.create(emp_id=f"{group}-{i}", department=dept, name=name,
+                                        email=f"{name.lower()}@szpital.pl",
+                                        medical_exam=str(self.TODAY + timedelta(days=days)))
+
+    def digest(self, *args):
+        out, err = StringIO(), StringIO()
+        call_command("exam_digest", "--date", str(self.TODAY), *args, stdout=out, stderr=err)
+        return out.getvalue(), err.getvalue()
+
+    def test_one_message_per_department_in_one_batch(self):
+        sent = []
+        original = locmem.EmailBackend.send_messages
+
+        def send_messages(backend, messages):
+            sent.append((id(backend), len(messages)))
+            return original(backend, messages)
+
+        with mock.patch.object(locmem.EmailBackend, "send_messages", send_messages), \
+                mock.patch.object(exam_digest, "get_connection", wraps=exam_digest.get_connection) as conn:
+            self.digest("--to", "kadry@szpital.pl", "--to", "bhp@szpital.pl")
+
+        conn.assert_called_once()
+        self.assertEqual([n for _, n in sent], [2])
+        self.assertEqual([m.subject for m in mail.outbox],
+                         ["Badania okresowe – Chirurgia (1)", f"Badania okresowe – {GROUP} (2)"])
+        for m in mail.outbox:
+            self.assertEqual(m.to, ["kadry@szpital.pl", "bhp@szpital.pl"])
+        body = mail.outbox[1].body
+        self.assertIn("Anna: 2025-03-10 (dziś)", body)          # pierwszy dzień okna
+        self.assertIn("Ewa: 2025-04-09 (za 30 dni)", body)      # ostatni dzień okna
+        self.assertNotIn("Jan", body)
+        self.assertNotIn("Olga", body)
+        self.assertNotIn("@", body)                             # adresy pracowników nie trafiają do treści
+
+    def test_overdue_and_settings_recipients(self):
+        with override_settings(EXAM_DIGEST_TO=["kadry@szpital.pl"]):
+            self.digest("--overdue", "--group", GROUP)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ["kadry@szpital.pl"])
+        self.assertIn("Olga: 2025-03-09 (po terminie 1 dni)", mail.outbox[0].body)
+
+    def test_without_recipients_nothing_is_sent(self):
+        out, err = self.digest()
+        self.assertEqual(mail.outbox, [])
+        self.assertIn("brak adresatów", err)
+        self.assertIn("Brak badań do zgłoszenia.", out)
+
+    def test_empty_window_sends_nothing(self):
+        out, _ = self.digest("--to", "kadry@szpital.pl", "--days", "3", "--group", "Pusty")
+        self.assertEqual(mail.outbox, [])
+        self.assertIn("Brak badań do zgłoszenia.", out)
+
+
+# ---- POST /edycja/<dział>/operacje/ (views.bulk_grid_edit) ----
+
+class BulkGridEditTests(DataDirMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        dept = Department.objects.create(name=GROUP, login="t", password="x")
+        for i, name in enumerate(("Anna", "Ewa")):
+            Employee.objects.create(emp_id=f"9{i}", department=dept, name=name, order=i)
+        session = self.client.session
+        session["auth_group"] = GROUP
+        session.save()
+
+    def post(self, **payload):
+        payload = {"month": "Marzec", "year": "2025", **payload}
+        return self.client.post(f"/edycja/{GROUP}/operacje/", json.dumps(payload),
+                                content_type="application/json")
+
+    def test_window_reaches_past_range_to_clear_fixed_violations(self):
+        self.write_month("Marzec", 2025, {"Anna": ["1"] * 7, "Ewa": []})
+        self.assertEqual(views.month_validator("Marzec", "2025").validate_row(["1"] * 7)[0]["day"], 7)
+
+        res = self.post(op="clear", names=["Anna"], **{"from": 1, "to": 1}).json()
+        self.assertTrue(res["ok"])
+        self.assertEqual(res["cells"], {"Anna": {"1": ""}})
+        # naruszenie z dnia 7 zniknęło – okno musi je obejmować, choć zakres to 1..1
+        self.assertEqual(res["window"], {"Anna": [1, 1 + labour_rules.MAX_CONSECUTIVE_DAYS]})
+        self.assertEqual(res["violations"], {})
+
+    def test_names_must_be_strings(self):
+        for names in ([["Anna"]], [{"n": 1}], "Anna"):
+            res = self.post(op="clear", names=names)
+            self.assertEqual(res.status_code, 400, names)
+
+
+# ---- generator grafiku (core/scheduler.py) ----
+
+class SchedulerTests(TestCase):
+    YEAR, MONTH, DAYS = 2025, 3, 31
+
+    def setUp(self):
+        self.employees = [{"name": f"P{i}", "position": "Pielęgniarka", "skills": {}} for i in range(8)]
+        self.employees.append({"name": "Lekarz", "position": "Lekarz", "skills": {"pielęgniarka": True}})
+        self.demand = {"1": ["Pielęgniarka", "Pielęgniarka"], "2": ["Pielęgniarka"], "3": ["Pielęgniarka"]}
+        self.existing = {"P0": ["C"] * 5, "P1": ["", "3", "", "", "W"], "Lekarz": ["1"] * 6}
+
+    def test_proposal_keeps_hard_rules_and_fixed_cells(self):
+        for seed in (1, 2, 3):
+            proposal = scheduler.generate_month(self.employees, self.demand, self.existing, self.YEAR,
+                                                self.MONTH, special_days=(2, 9, 16, 23, 30), budget=0.2,
+                                                seed=seed)
+            validator = labour_rules.MonthValidator(self.DAYS, norm_days=())
+            for e in self.employees:
+                name = e["name"]
+                fixed = self.existing.get(name, [])
+                row = proposal.grid.get(name) or [""] * self.DAYS
+                for d, token in enumerate(fixed):
+                    if token:
+                        self.assertEqual(row[d], "", f"{name} dzień {d + 1} (seed {seed})")
+                merged = [fixed[d] if d < len(fixed) and fixed[d] else row[d] for d in range(self.DAYS)]
+                self.assertTrue(set(merged) <= {"", "1", "2", "3", "C", "W"}, merged)
+                # P1: po stałej nocce w dniu 2 dzień 3 nie może być ranną ani popołudniową
+                if name == "P1":
+                    self.assertNotIn(merged[2], ("1", "2"))
+                found = [v for v in validator.validate_row(merged) if v["day"] is not None]
+                self.assertEqual(found, [], f"{name} (seed {seed}): {merged}")
+            # obsady wystarcza (Lekarz wchodzi przez umiejętność), więc żaden slot nie zostaje pusty
+            self.assertEqual(proposal.uncovered, [])
+
+
+# ---- skład działu w bazie (utils.py) ----
+
+class RosterSaveTests(DataDirMixin, TestCase):
+    def test_skill_catalog_read_once_per_save(self):
+        Department.objects.create(name=GROUP, login="t", password="x")
+        Skill.objects.create(name="EKG")
+        users = [{"id": str(100 + i), "name": f"Osoba {i}", "skills": {"ekg": True, "Triaż": i % 2 == 0}}
+                 for i in range(6)]
+        with CaptureQueriesContext(connection) as ctx:
+            utils.save_users_to_file(GROUP, users)
+        # cały katalog (bez JOIN z powiązaniami, które skills.set czyta per osoba)
+        catalog = [q for q in ctx.captured_queries
+                   if 'FROM "pierwsza_app_skill"' in q["sql"] and "JOIN" not in q["sql"]]
+        self.assertEqual(len(catalog), 1)
+        # „ekg” trafia w istniejące „EKG”, „Triaż” powstaje raz
+        self.assertEqual(sorted(Skill.objects.values_list("name", flat=True)), ["EKG", "Triaż"])
+        saved = utils.load_users_from_file(GROUP)
+        self.assertEqual([sorted(u["skills"]) for u in saved[:2]], [["EKG", "Triaż"], ["EKG"]])
+
+
+# ---- metryki (core/metrics.py) ----
+
+class MetricsMiddlewareTests(TestCase):
+    def setUp(self):
+        patcher = mock.patch.object(metrics, "ENABLED", True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        metrics.reset()
+        self.addCleanup(metrics.reset)
+        self.request = RequestFactory().get("/x/")
+
+    def requests_total(self, status):
+        key = ("app_requests_total", (("view", "unresolved"), ("method", "GET"), ("status", status)))
+        return metrics._counters.get(key, 0)
+
+    def test_sync_chain(self):
+        mw = metrics.MetricsMiddleware(lambda request: HttpResponse(status=204))
+        self.assertFalse(iscoroutinefunction(mw))
+        self.assertEqual(mw(self.request).status_code, 204)
+        self.assertEqual(self.requests_total("204"), 1)
+
+    def test_async_chain_stays_async(self):
+        async def view(request):
+            return HttpResponse(status=202)
+
+        async def failing(request):
+            raise RuntimeError
+
+        mw = metrics.MetricsMiddleware(view)
+        self.assertTrue(iscoroutinefunction(mw))
+        self.assertEqual(asyncio.run(mw(self.request)).status_code, 202)
+        with self.assertRaises(RuntimeError):
+            asyncio.run(metrics.MetricsMiddleware(failing)(self.request))
+        self.assertEqual((self.requests_total("202"), self.requests_total("500")), (1, 1))
+
+
+# ---- eksport płacowy (core/payroll.py) ----
+
+class FakePool:
+    """ProcessPoolExecutor bez procesów – zapisuje wywołania shutdown()."""
+    shutdowns = []
+
+    def __init__(self, **kwargs):
+        pass
+
+    def map(self, fn, jobs):
+        return ((group, [[group]]) for group, _ in jobs)
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        self.shutdowns.append((wait, cancel_futures))
+
+
+class PayrollStreamTests(TestCase):
+    def setUp(self):
+        FakePool.shutdowns = []
+        patcher = mock.patch.object(payroll, "ProcessPoolExecutor", FakePool)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch.object(payroll.connections, "close_all")
+        self.close_all = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_pool_waits_only_when_fully_consumed(self):
+        self.assertEqual([g for g, _ in payroll.department_results(["A", "B", "C"], None, workers=3)],
+                         ["A", "B", "C"])
+        self.assertEqual(FakePool.shutdowns, [(True, False)])
+
+        results = payroll.department_results(["A", "B", "C"], None, workers=3)
+        next(results)
+        results.close()                                 # klient się rozłączył
+        self.assertEqual(FakePool.shutdowns[1:], [(False, True)])
+
+    def chunks(self, closed, delay=0.0):
+        try:
+            for i in range(3):
+                time.sleep(delay)
+                yield f"{i};"
+        finally:
+            closed.set()
+
+    def test_astream_yields_all_and_closes_thread_connections(self):
+        closed = threading.Event()
+
+        async def consume():
+            return [c async for c in payroll.astream(self.chunks(closed))]
+
+        self.assertEqual(asyncio.run(consume()), ["0;", "1;", "2;"])
+        self.assertTrue(closed.is_set())
+        self.assertGreaterEqual(self.close_all.call_count, 4)   # każdy next() + koniec
+
+    def test_astream_cancelled_mid_chunk_closes_generator_later(self):
+        closed = threading.Event()
+
+        async def consume():
+            stream = payroll.astream(self.chunks(closed, delay=0.2))
+            task = asyncio.ensure_future(stream.__anext__())
+            await asyncio.sleep(0.05)
+            task.cancel()                               # rozłączenie w trakcie liczenia kawałka
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+            await stream.aclose()
+            await asyncio.sleep(0.4)                    # next() w wątku kończy, potem close()
+
+        asyncio.run(consume())
+        self.assertTrue(closed.is_set())
+
+
+class CompactGridTests(TestCase):
+    def test_build_compact_grid_dictionary(self):
+        grid = views.build_compact_grid([{"name": "Anna"}, {"name": "Ewa"}],
+                                        {"Anna": ["1", "", "W"], "Ewa": ["W"]}, 3)
+        self.assertEqual(grid, {"names": ["Anna", "Ewa"], "days": 3, "tokens": ["", "1", "W"],
+                                "cells": [[1, 0, 2], [2, 0, 0]]})
+
+
+# ---- wyszukiwarka personelu (core/search.py) ----
+
+def staff_doc(emp_id, name, position="", group=GROUP, skills=()):
+    return search.Doc(emp_id, group, name, position, "", "", tuple(skills))
+
+
+class StaffSearchTests(TestCase):
+    def setUp(self):
+        self.index = search.StaffIndex()
+        self.index.rebuild([
+            staff_doc("1", "Anna Kowalska", "Pielęgniarka"),
+            staff_doc("2", "Ewa Pielech", "Lekarz"),
+            staff_doc("3", "Jan Nowak", "Ratownik", skills=["Pielęgnacja ran"]),
+            staff_doc("4", "Łucja Żak", "Sekretarka", group="Chirurgia"),
+        ])
+
+    def ids(self, query, **kw):
+        return [doc.id for _, doc in self.index.search(query, **kw)[1]]
+
+    def test_query_without_diacritics_ranks_by_field(self):
+        # „pielegn” = prefiks „pielegniarka” (stanowisko) i „pielegnacja” (umiejętność), nie „pielech”
+        self.assertEqual(self.ids("pielegn"), ["1", "3"])
+        self.assertEqual(self.ids("lucja zak"), ["4"])
+        self.assertEqual(self.ids("Żak", groups=[GROUP]), [])
+
+    def test_typo_falls_back_to_trigrams(self):
+        self.assertEqual(self.ids("kowalsak"), ["1"])
+        self.assertEqual(self.ids("kowalska nowak"), [])         # AND między słowami
+
+    def test_empty_and_one_letter_queries_return_nothing(self):
+        for query in ("", "   ", "a", "ż", "a e"):
+            self.assertEqual(self.index.search(query), (0, []), query)
+        self.assertEqual(self.ids("an k"), ["1"])               # pojedyncza litera obok dłuższego słowa
+
+
+class LiveIndexTests(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.root = Path(tmp.name)
+        self.docs = [staff_doc("1", "Anna Kowalska", "Pielęgniarka")]
+        self.loads = []
+        self.live = search.LiveIndex(search.StaffIndex, self.load)
+
+    def load(self, groups=None):
+        self.loads.append(groups)
+        return [d for d in self.docs if groups is None or d.group in groups]
+
+    def test_rebuilds_only_touched_departments(self):
+        self.assertEqual(len(self.live.refresh(self.root)), 1)
+        self.docs.append(staff_doc("2", "Ewa Nowak", "Lekarz"))
+        self.docs.append(staff_doc("3", "Jan Zieliński", group="Chirurgia"))
+        self.assertEqual(len(self.live.refresh(self.root)), 1)  # bez stempla zmiany nie widać
+        self.assertEqual(self.loads, [None])
+
+        search.touch(self.root, GROUP)
+        index = self.live.refresh(self.root)
+        self.assertEqual(self.loads, [None, [GROUP]])
+        self.assertEqual([d.id for _, d in index.search("nowak")[1]], ["2"])
+        self.assertEqual(index.search("zielinski"), (0, []))
+
+        # ponowny zapis tego samego działu w obrębie ziarna mtime też jest widoczny
+        self.docs[1] = staff_doc("2", "Ewa Nowak-Wiśniewska", "Lekarz")
+        search.touch(self.root, GROUP)
+        self.assertEqual([d.id for _, d in self.live.refresh(self.root).search("wisniewska")[1]], ["2"])
+
+    def test_trusted_directory_stamp_skips_rescan(self):
+        self.live.refresh(self.root)
+        search.touch(self.root, GROUP)
+        stamps = storage.roster_stamps_dir(self.root)
+        for path in (*stamps.iterdir(), stamps):
+            st = path.stat()
+            os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns - 10 * 10**9))
+        self.live.refresh(self.root)
+        with mock.patch.object(search, "read_stamps", side_effect=AssertionError("przegląd stempli")):
+            self.live.refresh(self.root)
+
+
+# ---- migracja 0005: plan dzienny z pliku do DayPlan ----
+
+class SplitPlanMigrationTests(TestCase):
+    migration = importlib.import_module("pierwsza_app.migrations.0005_split_grafik_plan_files")
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.root = Path(tmp.name)
+        override = override_settings(DATA_DIR=self.root)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def write(self, path, data):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+
+    def test_moves_dated_days_and_keeps_existing_rows(self):
+        row = {"name": "Anna", "position": "Pielęgniarka", "contact": ""}
+        flat = Department.objects.create(name="Stary", login="s", password="x")
+        split = Department.objects.create(name=GROUP, login="t", password="x")
+        legacy = Department.objects.create(name="Lista", login="l", password="x")
+        DayPlan.objects.create(department=flat, date=date(2025, 3, 2), rows=[{"name": "z bazy"}])
+        self.write(self.root / "Stary_grafik_plan.json",
+                   {"2025-03-01": [row], "2025-03-02": [row], "szkic": [row], "2025-03-03": {"x": 1}})
+        self.write(storage.plan_file(self.root, GROUP), {"2025-04-01": []})
+        self.write(self.root / "Lista_grafik_plan.json", [row])          # format bez daty – zostaje w pliku
+
+        self.migration.split_plan_files(apps, None)
+        self.migration.split_plan_files(apps, None)                       # ponownie – bez duplikatów
+
+        plans = {(p.department.name, p.date.isoformat()): p.rows for p in DayPlan.objects.all()}
+        self.assertEqual(plans, {
+            ("Stary", "2025-03-01"): [row],
+            ("Stary", "2025-03-02"): [{"name": "z bazy"}],
+            (GROUP, "2025-04-01"): [],
+        })
+        self.assertFalse(DayPlan.objects.filter(department=legacy).exists())
+        self.assertTrue((self.root / "Stary_grafik_plan.json").exists())
+        self.assertTrue(split.day_plans.exists())
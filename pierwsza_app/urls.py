@@ -20,19 +20,40 @@ urlpatterns = [
     path("export-month/<str:group>/", views.export_month_tokens_csv, name="export_month_tokens_csv"),
     path("import-month/<str:group>/", views.import_month_tokens_csv, name="import_month_tokens_csv"),
 
+    # roczny raport godzin (CSV / JSON)
+    path("raport-godzin/<str:group>/", views.hours_report, name="hours_report"),
+
+    # wyszukiwarka personelu wszystkich działów (JSON)
+    path("szukaj/", views.staff_search, name="staff_search"),
+
+    # eksport płacowy wszystkich działów (administrator)
+    path("eksport-plac/", views.export_payroll_csv, name="export_payroll_csv"),
+
     # autosave komórki (AJAX)  <<< DODANE >>>
     path("autosave/<str:group>/", views.autosave_cell, name="autosave_cell"),
+    # historia siatki: stan na dzień, ostatnie zmiany, cofanie
+    path("historia-siatki/<str:group>/", views.grid_as_of, name="grid_as_of"),
+    path("historia-siatki/<str:group>/zdarzenia/", views.grid_events, name="grid_events"),
+    path("historia-siatki/<str:group>/cofnij/", views.undo_grid_edits, name="undo_grid_edits"),
+    # push zmian komórek na żywo (SSE, wymaga ASGI)
+    path("live/<str:group>/", views.live_stream, name="live_stream"),
 
     # grafik (widok dzienny) + notyfikacja e-mail
     path("grafik/<str:group>/", views.grafik_view, name="grafik"),
     path("grafik/<str:group>/notify-email/", views.notify_email, name="notify_email"),
+    # grafik – zakres dat (tablica tygodnia/miesiąca + JSON)
+    path("grafik/<str:group>/zakres/", views.grafik_range, name="grafik_range"),
+    path("grafik/<str:group>/zakres/json/", views.grafik_range_json, name="grafik_range_json"),
 
     # edycja siatki
     path("edycja/<str:group>/", views.edit_table, name="edit"),
+    path("edycja/<str:group>/propozycja/", views.propose_month, name="propose_month"),
+    path("edycja/<str:group>/operacje/", views.bulk_grid_edit, name="bulk_grid_edit"),
 
     # inne
     path("tabela/<str:group>/", views.tabela, name="tabela"),
     path("set-schedule/<str:group>/", views.set_schedule, name="set_schedule"),
+    path("employee/<str:group>/pdf/<str:kind>/<path:emp_name>/", views.employee_pdf, name="employee_pdf"),
     path("employee/<str:group>/<path:emp_name>/", views.employee_profile, name="employee_profile"),
     path("delete-group/<str:group>/", views.delete_group, name="delete_group"),
     path("ping/", views.ping, name="ping"),
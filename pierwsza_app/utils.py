@@ -1,71 +1,266 @@
-import json, calendar
+import json, calendar, os, threading
 from pathlib import Path
 from django.conf import settings
+from django.db import transaction
+from django.db.models import Max
 
-BASE_DIR = Path(settings.BASE_DIR)
+from .models import Department, Employee, Skill, DayPlan
+from .core.metrics import instrumented, record_io
+from .core import archive, events, search, storage, writebehind
+
+BASE_DIR = Path(settings.DATA_DIR)  # katalog danych (domyślnie katalog projektu)
 
 POLISH_MONTHS = { "Styczeń":1, "Luty":2, "Marzec":3, "Kwiecień":4, "Maj":5, "Czerwiec":6,
                   "Lipiec":7, "Sierpień":8, "Wrzesień":9, "Październik":10, "Listopad":11, "Grudzień":12 }
 
-# ---- GRUPY (działy) ----
+# ---- ODCZYT / ZAPIS PLIKÓW DANYCH (liczone w metrykach) ----
+def read_text(p: Path) -> str:
+    raw = p.read_bytes()
+    record_io("read", len(raw))
+    return raw.decode("utf-8")
+
+def write_text(p: Path, text: str, durable: bool = False):
+    """Zapis przez plik tymczasowy + os.replace – czytelnik nigdy nie widzi połowy pliku.
+    durable=True dodatkowo fsync (przed skróceniem dziennika autosave)."""
+    raw = text.encode("utf-8")
+    tmp = p.with_name(f".{p.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    with open(tmp, "wb") as f:
+        f.write(raw)
+        if durable:
+            f.flush()
+            os.fsync(f.fileno())
+    os.replace(tmp, p)
+    record_io("write", len(raw))
+
+# ---- GRUPY (działy) – tabela Department ----
+# groups.json / {dział}_users.json / skills_catalog.json czyta już tylko
+# komenda import_roster_json (jednorazowa migracja danych do bazy).
 GROUPS_FILE = BASE_DIR / "groups.json"
 
+def _group_dict(d):
+    return {"name": d.name, "login": d.login, "password": d.password}
+
 def load_groups():
-    if GROUPS_FILE.exists():
-        try:
-            return json.loads(GROUPS_FILE.read_text(encoding="utf-8"))
-        except Exception:
-            return []
-    return []
-
-def save_groups(groups):
-    data = []
-    for g in groups:
-        # przechowujemy tylko dane, bez „widżetów” (jak w Tkinter) :contentReference[oaicite:2]{index=2}
-        data.append({"name": g["name"].strip(), "login": g["login"], "password": g["password"]})
-    GROUPS_FILE.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
-
-def get_group(groups, name):
-    name = name.strip()
-    for g in groups:
-        if g["name"].strip() == name:
-            return g
-    return None
+    return [_group_dict(d) for d in Department.objects.order_by("id")]
+
+def get_group(name):
+    d = Department.objects.filter(name=name.strip()).first()
+    return _group_dict(d) if d else None
+
+def create_group(name, login, password):
+    Department.objects.create(name=name.strip(), login=login, password=password)
+
+def update_group(group, **fields):
+    """Jeden UPDATE po indeksie unikalnym (np. login/hasło albo nowa nazwa)."""
+    n = Department.objects.filter(name=group.strip()).update(**fields)
+    if "name" in fields:
+        roster_changed(group, fields["name"])
+    return n
+
+def delete_group_record(name):
+    """Usuwa dział razem z pracownikami (CASCADE)."""
+    Department.objects.filter(name=name.strip()).delete()
+    roster_changed(name.strip())
+
+# ---- UŻYTKOWNICY (pracownicy) – tabela Employee ----
+def roster_changed(*groups):
+    """Po zapisie składu: indeks wyszukiwarki (core/search.py) przeindeksuje te działy."""
+    search.touch(BASE_DIR, *groups)
 
-# ---- UŻYTKOWNICY (pracownicy) ----
 def users_path(group: str) -> Path:
-    return BASE_DIR / f"{group}_users.json"
+    """Kopia składu działu – czyta ją już tylko import (przed migrate_data_layout: stary płaski plik)."""
+    p = storage.users_file(BASE_DIR, group)
+    return p if p.exists() else BASE_DIR / f"{group}_users.json"
+
+EMPLOYEE_FIELDS = ("name", "position", "contact", "email", "medical_exam")
+
+def employee_dict(e):
+    d = {"id": e.emp_id}
+    for f in EMPLOYEE_FIELDS:
+        d[f] = getattr(e, f)
+    d["skills"] = {s.name: True for s in e.skills.all()}
+    return d
+
+def employees_qs(group: str):
+    return (Employee.objects.filter(department__name=group)
+            .order_by("order", "id").prefetch_related("skills"))
 
 def load_users_from_file(group: str):
-    p = users_path(group)
-    try:
-        return json.loads(p.read_text(encoding="utf-8"))
-    except Exception:
-        return []
+    return [employee_dict(e) for e in employees_qs(group)]
+
+def load_all_users():
+    """Wszyscy pracownicy wszystkich działów jednym zapytaniem: [(dział, słownik bez skills)]."""
+    rows = (Employee.objects.select_related("department")
+            .order_by("department_id", "order", "id")
+            .values_list("department__name", "emp_id", *EMPLOYEE_FIELDS))
+    return [(r[0], {"id": r[1], **dict(zip(EMPLOYEE_FIELDS, r[2:]))}) for r in rows]
+
+def _skill_map():
+    """{nazwa.casefold(): id} katalogu umiejętności – jedno zapytanie na cały zapis składu."""
+    return {name.casefold(): sid for sid, name in Skill.objects.values_list("id", "name")}
 
-def save_users_to_file(group: str, users: list[str]):
-    p = users_path(group)
-    p.write_text(json.dumps(users, ensure_ascii=False, indent=2), encoding="utf-8")
+def _skill_ids(skills_map, known):
+    """ID umiejętności zaznaczonych w słowniku; brakujące dopisuje do katalogu (i do `known`)."""
+    names = [str(k).strip() for k, v in (skills_map or {}).items() if v and str(k).strip()]
+    ids = []
+    for n in names:
+        sid = known.get(n.casefold())
+        if sid is None:
+            sid = known[n.casefold()] = Skill.objects.create(name=n).id
+        ids.append(sid)
+    return ids
+
+def save_users_to_file(group: str, users: list[dict]):
+    """
+    Synchronizuje skład działu z listą słowników (kolejność = kolejność listy).
+    Pracownicy spoza listy są usuwani z działu; ID z innego działu = przeniesienie.
+    Pojedyncze akcje panelu używają węższych helperów poniżej.
+    """
+    with transaction.atomic():
+        dept = Department.objects.get(name=group)
+        ids = [str(u["id"]) for u in users]
+        dept.employees.exclude(emp_id__in=ids).delete()
+        existing = {e.emp_id: e for e in Employee.objects.filter(emp_id__in=ids).select_related("department")}
+        moved_from = {e.department.name for e in existing.values()}
+        known = _skill_map()
+        for order, u in enumerate(users):
+            e = existing.get(str(u["id"])) or Employee(emp_id=str(u["id"]))
+            e.department = dept
+            e.order = order
+            for f in EMPLOYEE_FIELDS:
+                setattr(e, f, (u.get(f) or "").strip())
+            e.save()
+            e.skills.set(_skill_ids(u.get("skills"), known))
+    roster_changed(group, *moved_from)
+
+def add_employee(group: str, emp_id: str, name: str) -> bool:
+    """INSERT na końcu listy działu. False gdy nazwa jest już zajęta."""
+    dept = Department.objects.get(name=group)
+    if dept.employees.filter(name=name).exists():
+        return False
+    last = dept.employees.aggregate(m=Max("order"))["m"]
+    Employee.objects.create(department=dept, emp_id=emp_id, name=name,
+                            order=0 if last is None else last + 1)
+    roster_changed(group)
+    return True
+
+def remove_employee(group: str, name: str):
+    Employee.objects.filter(department__name=group, name=name).delete()
+    roster_changed(group)
+
+def move_employee(group: str, name: str, step: int):
+    """Zamienia pozycję z sąsiadem (step=-1 w górę, +1 w dół) – dwa UPDATE-y."""
+    with transaction.atomic():
+        rows = list(Employee.objects.select_for_update()
+                    .filter(department__name=group).order_by("order", "id")
+                    .values_list("id", "name", "order"))
+        idx = next((i for i, r in enumerate(rows) if r[1] == name), None)
+        if idx is None or not (0 <= idx + step < len(rows)):
+            return
+        (pk_a, _, ord_a), (pk_b, _, ord_b) = rows[idx], rows[idx + step]
+        Employee.objects.filter(pk=pk_a).update(order=ord_b)
+        Employee.objects.filter(pk=pk_b).update(order=ord_a)
+
+def update_employee(group: str, emp_name: str, skills=None, **fields):
+    """UPDATE pól profilu; skills (słownik nazwa -> bool) podmienia powiązania M2M."""
+    with transaction.atomic():
+        n = Employee.objects.filter(department__name=group, name=emp_name).update(**fields)
+        if n and skills is not None:
+            e = Employee.objects.get(department__name=group, name=fields.get("name", emp_name))
+            e.skills.set(_skill_ids(skills, _skill_map()))
+    if n:
+        roster_changed(group)
+    return n
+
+def transfer_employee(group: str, name: str, target: str) -> str | None:
+    """Przeniesienie = jeden UPDATE department_id. Zwraca komunikat błędu albo None."""
+    tgt = Department.objects.filter(name=target).first()
+    if tgt is None:
+        return f"Nie ma działu {target}."
+    if tgt.employees.filter(name=name).exists():
+        return f"{name} już istnieje w dziale {target}."
+    last = tgt.employees.aggregate(m=Max("order"))["m"]
+    moved = Employee.objects.filter(department__name=group, name=name).update(
+        department=tgt, order=0 if last is None else last + 1)
+    if not moved:
+        return "Nie znaleziono pracownika do przeniesienia."
+    roster_changed(group, target)
+    return None
+
+# ---- PLAN DZIENNY (widok „Ustaw grafik”) – tabela DayPlan ----
+def plan_path(group: str) -> Path:
+    """Stary plik z całą historią planu – czyta go już tylko import."""
+    p = storage.plan_file(BASE_DIR, group)
+    return p if p.exists() else BASE_DIR / f"{group}_grafik_plan.json"
+
+def load_day_plan(group: str, day) -> list:
+    """Wiersze jednego dnia – jedno zapytanie po indeksie (dział, data)."""
+    rows = (DayPlan.objects.filter(department__name=group, date=day)
+            .values_list("rows", flat=True).first())
+    return rows or []
+
+def load_day_plans(group: str, start, end) -> dict:
+    """{data: wiersze} dla zakresu [start, end] – jedno zapytanie zakresowe po tym samym indeksie."""
+    qs = (DayPlan.objects.filter(department__name=group, date__range=(start, end))
+          .values_list("date", "rows"))
+    return {d: rows for d, rows in qs}
+
+def employee_directory(names) -> dict:
+    """nazwa -> {email, phone, position, department} dla podanych osób (dowolny dział), jedno zapytanie."""
+    rows = (Employee.objects.filter(name__in=set(names))
+            .order_by("department_id", "order")
+            .values_list("name", "email", "contact", "position", "department__name"))
+    return {n: {"email": e, "phone": c, "position": p, "department": d} for n, e, c, p, d in rows}
+
+def save_day_plan(group: str, day, rows: list):
+    dept_id = Department.objects.filter(name=group).values_list("id", flat=True).get()
+    DayPlan.objects.update_or_create(department_id=dept_id, date=day, defaults={"rows": rows})
 
 # ---- DANE MIESIĄCA (grafik) ----
 def month_json_path(group: str, month: str, year: str|int) -> Path:
-    return BASE_DIR / f"{group}_{month}_{year}.json"
+    return storage.month_file(BASE_DIR, group, month, year)
 
-def load_month_data(group, month, year):
+def load_month_file(group, month, year):
+    """Sam plik miesiąca – bez edycji czekających w dzienniku autosave."""
     p = month_json_path(group, month, year)
     if p.exists():
         try:
-            obj = json.loads(p.read_text(encoding="utf-8"))
+            obj = json.loads(read_text(p))
             return obj.get("data", {})
         except Exception:
             return {}
     return {}
 
-def save_table_to_file(group, month, year, table_dict):
+@instrumented("load_month_data")
+def load_month_data(group, month, year):
+    # zamknięty rok: jedno archiwum działu zamiast dwunastu plików
+    archived = archive.month_data(BASE_DIR, group, month, year)
+    if archived is not None:
+        return {name: list(row) for name, row in archived.items()}
+    # plik + edycje z dziennika autosave, których jeszcze nie zapisano (tryb write-behind)
+    return writebehind.overlay(load_month_file(group, month, year),
+                               writebehind.month_edits(BASE_DIR, group, month, year))
+
+def write_month_file(group, month, year, table_dict, durable=False):
     p = month_json_path(group, month, year)
     payload = {"group": group, "month": month, "year": str(year), "data": table_dict}
-    p.write_text(json.dumps(payload, ensure_ascii=False, indent=4), encoding="utf-8")
+    p.parent.mkdir(parents=True, exist_ok=True)
+    write_text(p, json.dumps(payload, ensure_ascii=False, indent=4), durable=durable)
     return str(p)
 
+@instrumented("save_table_to_file")
+def save_table_to_file(group, month, year, table_dict, who="", src="", editor=""):
+    """Zapis całej siatki; zmienione komórki trafiają do historii zdarzeń (core/events.py)."""
+    if archive.is_closed(BASE_DIR, group, year):
+        raise archive.ClosedYearError(f"Rok {year} jest zamknięty – siatka {month} jest tylko do odczytu.")
+    with storage.locked(BASE_DIR, group):
+        # starsze edycje z dziennika najpierw – inaczej nadpisałyby ten zapis przy późniejszym opróżnieniu
+        writebehind.flush(BASE_DIR, group)
+        old = load_month_file(group, month, year)
+        path = write_month_file(group, month, year, table_dict)
+        events.record(BASE_DIR, group, month, year, events.diff(old, table_dict), who=who, src=src,
+                      base=lambda: old, editor=editor)
+        return path
+
 def days_in_month(month, year):
     return calendar.monthrange(int(year), POLISH_MONTHS[month])[1]
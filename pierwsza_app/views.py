@@ -1,33 +1,47 @@
-from .core.pdf_grafik import generate_pdf_response as generate_grafik_pdf_response
+from asgiref.sync import sync_to_async
 from django.shortcuts import render, redirect
-from django.http import HttpResponse, FileResponse, HttpResponseRedirect, JsonResponse, Http404
+from django.http import HttpResponse, FileResponse, HttpResponseRedirect, JsonResponse, Http404, StreamingHttpResponse
 from django.conf import settings
 from django.views.decorators.http import require_POST
 from django.views.decorators.cache import never_cache
+from django.contrib.admin.views.decorators import staff_member_required
 from django.core.mail import send_mail, BadHeaderError
 from django.utils.text import slugify
 
 from pathlib import Path
 from datetime import date, timedelta
 from collections import defaultdict
-from urllib.parse import unquote
+from contextlib import nullcontext
+from urllib.parse import unquote, quote
+from functools import lru_cache, partial
 import csv
 import io
 import json
 import re
+import time
 
 from .utils import (
     POLISH_MONTHS,
-    load_groups, save_groups, get_group,
-    users_path, load_users_from_file, save_users_to_file,
-    load_month_data, save_table_to_file, days_in_month,
+    load_groups, get_group, create_group, update_group, delete_group_record,
+    load_users_from_file, load_all_users, save_users_to_file,
+    add_employee, remove_employee, move_employee, update_employee, transfer_employee,
+    load_day_plan, load_day_plans, save_day_plan, employee_directory,
+    load_month_data, load_month_file, save_table_to_file, write_month_file, days_in_month, month_json_path,
+    read_text, write_text, roster_changed,
 )
+from .models import Skill
+from schedule.models import ScheduleTemplate
+from .core import metrics
+from .core.live import hub as live_hub, channel_name as live_channel, sse_events
+from .core.scheduler import generate_month, SHIFTS
+from .core.labour_rules import MonthValidator, states as labour_states
+from .core import archive, events, exams, gridops, payroll, search, storage, tokens, writebehind
+from .core import hours_report as hours_report_core
 
 # -------------------------
 # ŚCIEŻKI / PLIKI
 # -------------------------
-BASE_DIR = Path(settings.BASE_DIR)
-SKILLS_FILE = BASE_DIR / "skills_catalog.json"
+BASE_DIR = Path(settings.DATA_DIR)  # katalog danych (domyślnie katalog projektu)
 
 # =========================
 # STAŁE ID PRACOWNIKA + HISTORIA
@@ -40,7 +54,7 @@ HISTORY_DIR.mkdir(exist_ok=True)
 def _load_emp_index():
     try:
         if EMP_INDEX.exists():
-            return json.loads(EMP_INDEX.read_text(encoding="utf-8"))
+            return json.loads(read_text(EMP_INDEX))
     except Exception:
         pass
     return {"next": 1}
@@ -50,8 +64,7 @@ def next_employee_id() -> str:
     idx = _load_emp_index()
     n = int(idx.get("next", 1))
     idx["next"] = n + 1
-    EMP_INDEX.write_text(json.dumps(
-        idx, ensure_ascii=False, indent=2), encoding="utf-8")
+    write_text(EMP_INDEX, json.dumps(idx, ensure_ascii=False, indent=2))
     return str(n)
 
 
@@ -59,31 +72,40 @@ def history_path_for(emp_id: str) -> Path:
     return HISTORY_DIR / f"emp_{emp_id}.json"
 
 
+@metrics.instrumented("append_history")
 def append_history(emp_id: str, day_iso: str, group: str, token: str):
     """
     Zapis 'ostatni stan' dla danego dnia.
     token może być: '1','2','3','C' LUB '' (puste = wyczyszczono).
     """
-    if not emp_id or not day_iso:
+    append_history_days(emp_id, group, {day_iso: token})
+
+
+def append_history_days(emp_id: str, group: str, days: dict, durable: bool = False):
+    """Jak append_history, ale dla wielu dni naraz ({'RRRR-MM-DD': token}) – jeden odczyt i zapis pliku."""
+    days = {(d or "").strip(): (t or "").strip().upper() for d, t in days.items() if (d or "").strip()}
+    if not emp_id or not days:
         return
     path = history_path_for(emp_id)
     try:
-        data = json.loads(path.read_text(encoding="utf-8")
-                          ) if path.exists() else []
+        data = json.loads(read_text(path)) if path.exists() else []
     except Exception:
         data = []
 
-    # usuń poprzednie wpisy z tą samą datą
-    day_iso = (day_iso or "").strip()
-    token = (token or "").strip().upper()
-    data = [rec for rec in data if (rec.get("date") or "").strip() != day_iso]
+    # usuń poprzednie wpisy z tymi datami
+    data = [rec for rec in data if (rec.get("date") or "").strip() not in days]
 
     # dopisz aktualny stan (może być pusty)
-    entry = {"date": day_iso, "group": group, "token": token}
-    data.append(entry)
+    for day_iso, token in days.items():
+        data.append({"date": day_iso, "group": group, "token": token})
+
+    write_text(path, json.dumps(data, ensure_ascii=False, indent=2), durable=durable)
 
-    path.write_text(json.dumps(data, ensure_ascii=False,
-                    indent=2), encoding="utf-8")
+
+def history_token(value) -> str:
+    """Token zapisywany w historii: 1/2/3/C, każda inna wartość = wyczyszczono."""
+    tok = (value or "").strip().upper()
+    return tok if tok in tokens.HISTORY_TOKENS else ""
 
 # -------------------------
 # KATALOG UMIEJĘTNOŚCI (GLOBALNY)
@@ -91,80 +113,77 @@ def append_history(emp_id: str, day_iso: str, group: str, token: str):
 
 
 def load_skill_catalog():
-    try:
-        if SKILLS_FILE.exists():
-            data = json.loads(SKILLS_FILE.read_text(encoding="utf-8"))
-            if isinstance(data, list):
-                out, seen = [], set()
-                for x in data:
-                    s = str(x).strip()
-                    k = s.casefold()
-                    if s and k not in seen:
-                        seen.add(k)
-                        out.append(s)
-                return out
-    except Exception:
-        pass
-    return []
+    return list(Skill.objects.order_by("id").values_list("name", flat=True))
 
 
 def save_skill_catalog(catalog):
-    uniq, seen = [], set()
+    """Dopisuje brakujące pozycje katalogu (bez rozróżniania wielkości liter)."""
+    known = {s.casefold() for s in load_skill_catalog()}
+    new = []
     for x in catalog or []:
         s = str(x).strip()
         k = s.casefold()
-        if s and k not in seen:
-            seen.add(k)
-            uniq.append(s)
-    SKILLS_FILE.write_text(json.dumps(
-        uniq, ensure_ascii=False, indent=2), encoding="utf-8")
+        if s and k not in known:
+            known.add(k)
+            new.append(Skill(name=s))
+    Skill.objects.bulk_create(new)
 
 
 def delete_skill_globally(skill_name: str) -> bool:
     """
     Usuwa umiejętność z katalogu globalnego ORAZ ze wszystkich profili
-    we wszystkich działach. Zwraca True jeśli coś faktycznie usunięto.
+    (powiązania M2M znikają razem z wierszem). Zwraca True jeśli coś usunięto.
     """
-    target = (skill_name or "").strip()
-    if not target:
+    key = (skill_name or "").strip().casefold()
+    if not key:
         return False
-    key = target.casefold()
-
-    # 1) katalog
-    catalog = load_skill_catalog()
-    new_catalog = [s for s in catalog if s.casefold() != key]
-    changed_catalog = (len(new_catalog) != len(catalog))
-    if changed_catalog:
-        save_skill_catalog(new_catalog)
-
-    # 2) profile
-    changed_any_user = False
-    for g in load_groups():
-        dept = g["name"]
-        users = load_users_norm(dept)
-        changed_dept = False
-        for u in users:
-            skills_map = u.get("skills") or {}
-            new_map = {k: v for k, v in skills_map.items()
-                       if k.casefold() != key}
-            if new_map != skills_map:
-                u["skills"] = new_map
-                changed_dept = True
-                changed_any_user = True
-        if changed_dept:
-            save_users_to_file(dept, users)
-
-    return changed_catalog or changed_any_user
+    ids = [pk for pk, name in Skill.objects.values_list("id", "name") if name.casefold() == key]
+    groups = set(Skill.objects.filter(pk__in=ids).values_list("employees__department__name", flat=True))
+    deleted = Skill.objects.filter(pk__in=ids).delete()[0] > 0
+    roster_changed(*(g for g in groups if g))
+    return deleted
 
 
 # -------------------------
 # PDF
 # -------------------------
+# ReportLab, czcionka TTF i style kart ładują się przy pierwszym
+# wydruku, a nie przy starcie workera (większość workerów obsługuje tylko
+# autosave). Przy gunicorn --preload: PDF_WARMUP=True (core/warmup.py).
 
-try:
-    from .core.pdf_karty import generate_karty_pdf_response
-except Exception:
-    generate_karty_pdf_response = None
+
+def generate_grafik_pdf_response(file_name):
+    from .core.pdf_grafik import generate_pdf_response
+    return generate_pdf_response(file_name)
+
+
+def generate_karty_pdf_response(file_name):
+    from .core.pdf_karty import generate_karty_pdf_response as generate
+    return generate(file_name)
+
+
+def month_pdf_response(action, table_data):
+    """Grafik/karty działu z siatki w pamięci (zamknięty rok – nie ma pliku miesiąca)."""
+    group, month, year = table_data["group"], table_data["month"], table_data["year"]
+    try:
+        if action == "karty":
+            from .core.pdf_karty import render_karty
+            pdf, name = render_karty(table_data), f"karta_{group}_{month}_{year}.pdf"
+        else:
+            from .core.pdf_grafik import render_grafik
+            pdf, name = render_grafik([table_data]), f"grafik_{group.replace(' ', '_')}_{month}_{year}.pdf"
+    except ValueError as e:
+        raise Http404(str(e))
+    return FileResponse(io.BytesIO(pdf), as_attachment=True, filename=name)
+
+
+def render_employee_pdf(kind, tables):
+    """Karta albo grafik jednej osoby (tables – miesiące z jednym wierszem w "data")."""
+    if kind == "karta":
+        from .core.pdf_karty import render_karty_months
+        return render_karty_months(tables)
+    from .core.pdf_grafik import render_grafik
+    return render_grafik(tables, pad=False)
 
 # -------------------------
 # E-MAIL
@@ -228,8 +247,9 @@ def notify_email(request, group):
     from_email = getattr(settings, "DEFAULT_FROM_EMAIL",
                          "no-reply@example.com")
     try:
-        sent = send_mail(subject=subject, message=message, from_email=from_email,
-                         recipient_list=recipients, fail_silently=False)
+        with metrics.track("send_mail"):
+            sent = send_mail(subject=subject, message=message, from_email=from_email,
+                             recipient_list=recipients, fail_silently=False)
         return JsonResponse({"ok": True, "sent": int(sent), "recipients": recipients, "missing_email_for": missing})
     except BadHeaderError:
         return JsonResponse({"ok": False, "detail": "Nieprawidłowy nagłówek e-mail."}, status=400)
@@ -237,7 +257,7 @@ def notify_email(request, group):
         return JsonResponse({"ok": False, "detail": f"Błąd wysyłki: {e}"}, status=500)
 
 # -------------------------
-# USERS – normalizacja / migracja
+# USERS – normalizacja (import starych plików JSON)
 # -------------------------
 
 
@@ -287,25 +307,9 @@ def normalize_users(users_list):
     return norm
 
 
+@metrics.instrumented("load_users_norm")
 def load_users_norm(group):
-    raw = load_users_from_file(group)
-    users = normalize_users(raw)
-
-    needs_migration = False
-    if any(isinstance(x, str) for x in (raw or [])):
-        needs_migration = True
-    else:
-        for x in (raw or []):
-            if isinstance(x, dict):
-                required = ("id", "contact", "position",
-                            "email", "medical_exam", "skills")
-                if any(k not in x for k in required) or not (x.get("id") or "").strip():
-                    needs_migration = True
-                    break
-
-    if needs_migration:
-        save_users_to_file(group, users)
-    return users
+    return load_users_from_file(group)
 
 # -------------------------
 # START
@@ -324,14 +328,14 @@ def start(request):
         if not (name and login and password):
             return render(request, "pierwsza_app/start.html", {"groups": groups, "error": "Wypełnij wszystkie pola."})
 
-        if get_group(groups, name):
+        if get_group(name):
             return render(request, "pierwsza_app/start.html", {"groups": groups, "error": f"Dział „{name}” już istnieje."})
 
-        groups.append({"name": name, "login": login, "password": password})
-        save_groups(groups)
+        name_error = _group_name_error(name)
+        if name_error:
+            return render(request, "pierwsza_app/start.html", {"groups": groups, "error": name_error})
 
-        if not users_path(name).exists():
-            save_users_to_file(name, [])
+        create_group(name, login, password)
 
         return redirect("login", group=name)
 
@@ -344,8 +348,7 @@ def start(request):
 
 @never_cache
 def login_view(request, group):
-    groups = load_groups()
-    g = get_group(groups, group)
+    g = get_group(group)
     if not g:
         return redirect("start")
 
@@ -356,11 +359,28 @@ def login_view(request, group):
 
         if (login == g["login"] and password == g["password"]) or (login == "admin" and password == "admin"):
             request.session["auth_group"] = group
+            request.session["auth_login"] = login      # „kto” w historii zmian siatki
             return redirect("panel", group=group)
         error = "Niepoprawny login lub hasło."
 
     return render(request, "pierwsza_app/login.html", {"group": group, "error": error})
 
+def actor(request) -> str:
+    """Kto zmienia siatkę: konto Django (administrator) albo login działu z sesji."""
+    if request.user.is_authenticated:
+        return request.user.get_username()
+    return request.session.get("auth_login") or request.session.get("auth_group") or ""
+
+
+def editor_id(value) -> str:
+    """Identyfikator przeglądarki z table_edit.html (localStorage) – login działu jest wspólny dla planistów."""
+    return re.sub(r"[^0-9A-Za-z_-]", "", str(value or ""))[:64]
+
+
+def mine_filter(request, editor):
+    """(who, editor) dla „moich” zmian: po przeglądarce, a bez jej identyfikatora – po loginie."""
+    return (None, editor) if editor else (actor(request), None)
+
 # -------------------------
 # POMOCNICZE – zakres miesięcy
 # -------------------------
@@ -422,55 +442,99 @@ def _is_sunday_or_holiday(y: int, m: int, d: int) -> bool:
     return wd == 6 or _is_polish_holiday(y, m, d)
 
 
+# -------------------------
+# Zasady czasu pracy (core/labour_rules.py)
+# -------------------------
+
+
+@lru_cache(maxsize=64)
+def month_validator(month, year) -> MonthValidator:
+    """Walidator miesiąca; dni normy = pn–pt bez świąt."""
+    y, m = int(year), POLISH_MONTHS[month]
+    n_days = days_in_month(month, year)
+    norm_days = [d for d in range(1, n_days + 1)
+                 if date(y, m, d).weekday() < 5 and not _is_polish_holiday(y, m, d)]
+    return MonthValidator(n_days, norm_days)
+
+
+def _month_stamp(group, month, year):
+    """
+    (mtime_ns, rozmiar) pliku miesiąca + stempel dziennika autosave – ważność stanów w labour_states.
+    None (stan liczony od nowa), gdy plik albo dziennik zmienił się w ostatnich RACY_NS: dwa zapisy
+    tej samej długości w obrębie ziarna mtime dałyby ten sam stempel (jak w search.py i writebehind.py).
+    """
+    try:
+        st = month_json_path(group, month, year).stat()
+    except OSError:
+        return None
+    log = writebehind.log_stamp(BASE_DIR, group)
+    racy = time.time_ns() - writebehind.RACY_NS
+    if st.st_mtime_ns > racy or (log is not None and log[2] > racy):
+        return None
+    return (st.st_mtime_ns, st.st_size, log)
+
+
+def _labour_summary(violations: dict) -> str:
+    names = sorted(violations)
+    more = f" i {len(names) - 5} innych" if len(names) > 5 else ""
+    return f"Naruszenia zasad czasu pracy: {sum(len(v) for v in violations.values())} ({', '.join(names[:5])}{more})."
+
+
 def count_stats(group, employees, month_year_list):
-    WORK_TOKENS = {"1", "2", "3"}
+    """ndz (zmiany w niedziele/święta), l4 (dni C) i workdays (zmiany pn–sob) per osoba."""
     stats = {e["name"]: {"ndz": 0, "l4": 0, "workdays": 0} for e in employees}
+    names = list(stats)
 
     for month_name, year_str in month_year_list:
+        # zamknięty rok: gotowe agregaty z archiwum, bez przeglądania dni
+        agg = archive.month_aggregates(BASE_DIR, group, month_name, year_str)
+        if agg is not None:
+            for e in employees:
+                for key, val in (agg.get(e["name"]) or {}).items():
+                    stats[e["name"]][key] += val
+            continue
+
         y = int(year_str)
         m = POLISH_MONTHS[month_name]
         n_days = days_in_month(month_name, year_str)
-        data = load_month_data(group, month_name, year_str)
-
-        for e in employees:
-            row = data.get(e["name"], []) or []
-            for d in range(1, n_days + 1):
-                v = ((row[d - 1] if len(row) >= d else "") or "").strip()
-                if v.upper() == "C":
-                    stats[e["name"]]["l4"] += 1
-                if v in WORK_TOKENS:
-                    if _is_sunday_or_holiday(y, m, d):
-                        stats[e["name"]]["ndz"] += 1
-                    else:
-                        wd = date(y, m, d).weekday()
-                        if wd in (0, 1, 2, 3, 4, 5):
-                            stats[e["name"]]["workdays"] += 1
+        special, workdays = [], []   # zmiana w dniu liczy się jako ndz albo jako dzień roboczy (pn–sob)
+        for d in range(1, n_days + 1):
+            if _is_sunday_or_holiday(y, m, d):
+                special.append(d)
+            elif date(y, m, d).weekday() != 6:
+                workdays.append(d)
+
+        grid = tokens.Grid(load_month_data(group, month_name, year_str), n_days, names, strip=True)
+        columns = zip(grid.sums("shift", special), grid.sums("sick"), grid.sums("shift", workdays))
+        for name, (ndz, l4, wd) in zip(names, columns):
+            s = stats[name]
+            s["ndz"] += ndz
+            s["l4"] += l4
+            s["workdays"] += wd
     return stats
 
 
 def update_group_credentials(group, login, password):
-    groups = load_groups()
-    for g in groups:
-        if g["name"].strip() == group.strip():
-            g["login"] = login
-            g["password"] = password
-    save_groups(groups)
+    update_group(group, login=login, password=password)
 
 
-def rename_group_and_files(old, new):
-    groups = load_groups()
-    for g in groups:
-        if g["name"].strip() == old.strip():
-            g["name"] = new
-    save_groups(groups)
+def _group_name_error(name):
+    """Nazwa działu jest nazwą katalogu w DATA_DIR/departments/."""
+    try:
+        storage.department_dir(BASE_DIR, name)
+    except ValueError:
+        return "Nazwa działu nie może zawierać znaków „/” ani „\\” i nie może być „.” ani „..”."
+    return None
 
-    old_users = users_path(old)
-    new_users = users_path(new)
-    if old_users.exists():
-        old_users.rename(new_users)
 
-    for f in BASE_DIR.glob(f"{old}_*.json"):
-        f.rename(BASE_DIR / f.name.replace(f"{old}_", f"{new}_"))
+def rename_group_and_files(old, new):
+    # jeden rename() katalogu działu zamiast przeglądania wszystkich plików
+    storage.rename_department(BASE_DIR, old, new)
+    try:
+        update_group(old, name=new)
+    except Exception:
+        storage.rename_department(BASE_DIR, new, old)
+        raise
 
 # -------------------------
 # STATYSTYKI Z HISTORII (po ID)
@@ -480,7 +544,7 @@ def rename_group_and_files(old, new):
 def count_stats_from_history(employees, date_from, date_to):
     stats_by_id = {e["id"]: {"ndz": 0, "l4": 0, "workdays": 0}
                    for e in employees}
-    VALID = {"1", "2", "3", "C", ""}  # dopuszczamy też pusty stan
+    VALID = tokens.HISTORY_TOKENS | {""}  # dopuszczamy też pusty stan
 
     for e in employees:
         emp_id = e.get("id")
@@ -490,7 +554,7 @@ def count_stats_from_history(employees, date_from, date_to):
         if not path.exists():
             continue
         try:
-            entries = json.loads(path.read_text(encoding="utf-8"))
+            entries = json.loads(read_text(path))
         except Exception:
             entries = []
 
@@ -511,9 +575,10 @@ def count_stats_from_history(employees, date_from, date_to):
             if not (date_from <= dt <= date_to):
                 continue
 
-            if tok == "C":
+            c = tokens.cell(tok)
+            if c.leave == tokens.SICK:
                 stats_by_id[emp_id]["l4"] += 1
-            elif tok in {"1", "2", "3"}:
+            elif c.shift in tokens.SHIFTS:
                 if _is_sunday_or_holiday(y, m, d):
                     stats_by_id[emp_id]["ndz"] += 1
                 else:
@@ -529,6 +594,35 @@ def count_stats_from_history(employees, date_from, date_to):
             e["id"], {"ndz": 0, "l4": 0, "workdays": 0})
     return by_name
 
+# -------------------------
+# WYSZUKIWARKA PERSONELU (core/search.py)
+# -------------------------
+
+
+@never_cache
+def staff_search(request):
+    """
+    Wyszukiwanie personelu we wszystkich działach – JSON, wyniki od najlepszego.
+    GET: q, limit (domyślnie 20, maks. 100), group (opcjonalnie, można powtórzyć)
+    """
+    if not request.session.get("auth_group") and not request.user.is_staff:
+        return JsonResponse({"ok": False, "detail": "Nie zalogowano."}, status=401)
+    q = (request.GET.get("q") or "").strip()
+    try:
+        limit = int(request.GET.get("limit") or search.DEFAULT_LIMIT)
+    except ValueError:
+        return JsonResponse({"ok": False, "detail": "Nieprawidłowy limit."}, status=400)
+    limit = min(max(limit, 1), search.MAX_LIMIT)
+    groups = request.GET.getlist("group") or None
+
+    t0 = time.perf_counter()
+    total, hits = search.live.refresh(BASE_DIR).search(q, limit=limit, groups=groups)
+    return JsonResponse({
+        "ok": True, "q": q, "total": total, "limit": limit,
+        "took_ms": round((time.perf_counter() - t0) * 1000, 3),
+        "results": [search.as_dict(score, doc) for score, doc in hits],
+    })
+
 # -------------------------
 # PANEL
 # -------------------------
@@ -550,19 +644,20 @@ def panel(request, group):
     to_month = request.GET.get("to_month", "Grudzień")
     to_year = request.GET.get("to_year", "2025")
 
-    visible_users = [u for u in users if q.lower(
-    ) in u["name"].lower()] if q else users
+    if q:
+        # fragment nazwiska jak dotąd + indeks (stanowisko, telefon, e-mail, umiejętności, bez ogonków)
+        _, hits = search.live.refresh(BASE_DIR).search(q, limit=max(len(users), 1), groups=[group])
+        found = {doc.id for _, doc in hits}
+        visible_users = [u for u in users if q.lower() in u["name"].lower() or u["id"] in found]
+    else:
+        visible_users = users
 
-    # Pomocnicze: liczba dni do wygaśnięcia badań
+    # Pomocnicze: liczba dni do wygaśnięcia badań (indeks terminów wszystkich działów)
     today = date.today()
+    exam_index = exams.live.refresh(BASE_DIR)
 
     def _days_left_to_exam(u):
-        s = (u.get("medical_exam") or "").strip()
-        try:
-            y, m, d = map(int, s.split("-"))
-            return (date(y, m, d) - today).days
-        except Exception:
-            return None
+        return exam_index.days_left(u.get("id"), today)
 
     if request.method == "POST":
         action = request.POST.get("action")
@@ -570,13 +665,7 @@ def panel(request, group):
         if action == "add_employee":
             new_emp = (request.POST.get("new_emp") or "").strip()
             if new_emp:
-                if not any(u["name"] == new_emp for u in users):
-                    users.append({
-                        "id": next_employee_id(),
-                        "name": new_emp, "position": "", "contact": "",
-                        "email": "", "medical_exam": "", "skills": {},
-                    })
-                    save_users_to_file(group, users)
+                if add_employee(group, next_employee_id(), new_emp):
                     info = f"Dodano pracownika: {new_emp}"
                 else:
                     error = "Taki pracownik już istnieje."
@@ -585,25 +674,14 @@ def panel(request, group):
 
         elif action == "remove_employee":
             emp = request.POST.get("emp", "")
-            users = [u for u in users if u["name"] != emp]
-            save_users_to_file(group, users)
+            remove_employee(group, emp)
             info = f"Usunięto: {emp}"
 
         elif action == "move_up":
-            emp = request.POST.get("emp", "")
-            idx = next((i for i, u in enumerate(
-                users) if u["name"] == emp), None)
-            if idx is not None and idx > 0:
-                users[idx - 1], users[idx] = users[idx], users[idx - 1]
-                save_users_to_file(group, users)
+            move_employee(group, request.POST.get("emp", ""), -1)
 
         elif action == "move_down":
-            emp = request.POST.get("emp", "")
-            idx = next((i for i, u in enumerate(
-                users) if u["name"] == emp), None)
-            if idx is not None and idx < len(users) - 1:
-                users[idx + 1], users[idx] = users[idx], users[idx + 1]
-                save_users_to_file(group, users)
+            move_employee(group, request.POST.get("emp", ""), 1)
 
         elif action == "edit_employee":
             old = (request.POST.get("old_emp") or "").strip()
@@ -613,33 +691,20 @@ def panel(request, group):
 
             if not new_name:
                 error = "Podaj nowe nazwisko i imię."
+            elif new_name != old and any(u["name"] == new_name for u in users):
+                error = f"Pracownik o nazwie „{new_name}” już istnieje."
             else:
-                for u in users:
-                    if u["name"] == old:
-                        u["name"] = new_name
-                        u["position"] = new_pos
-                        u["contact"] = new_contact
-                        break
-                save_users_to_file(group, users)
+                update_employee(group, old, name=new_name,
+                                position=new_pos, contact=new_contact)
                 info = f"Zmieniono dane pracownika: {old} → {new_name}"
 
         elif action == "transfer_employee":
             emp = (request.POST.get("emp") or "").strip()
             target = (request.POST.get("target_group") or "").strip()
             if emp and target and target != group:
-                src_user = next((u for u in users if u["name"] == emp), None)
-                if not src_user:
-                    error = "Nie znaleziono pracownika do przeniesienia."
-                else:
-                    tgt_users = load_users_norm(target)
-                    if any(u["name"] == emp for u in tgt_users):
-                        error = f"{emp} już istnieje w dziale {target}."
-                    else:
-                        tgt_users.append(src_user)
-                        save_users_to_file(target, tgt_users)
-                        users = [u for u in users if u["name"] != emp]
-                        save_users_to_file(group, users)
-                        info = f"Przeniesiono {emp} do działu {target}."
+                error = transfer_employee(group, emp, target)
+                if not error:
+                    info = f"Przeniesiono {emp} do działu {target}."
             else:
                 error = "Wybierz inny dział."
 
@@ -664,9 +729,13 @@ def panel(request, group):
 
         elif action == "rename_group":
             new_name = (request.POST.get("new_name") or "").strip()
-            if new_name and new_name != group:
-                rename_group_and_files(group, new_name)
-                return redirect("panel", group=new_name)
+            if new_name and new_name != group and get_group(new_name):
+                error = f"Dział „{new_name}” już istnieje."
+            elif new_name and new_name != group:
+                error = _group_name_error(new_name)
+                if not error:
+                    rename_group_and_files(group, new_name)
+                    return redirect("panel", group=new_name)
             else:
                 error = "Podaj inną (nową) nazwę działu."
 
@@ -697,7 +766,7 @@ def panel(request, group):
 
         for u in visible_users:
             days_left = _days_left_to_exam(u)
-            exam_soon = (days_left is not None) and (0 <= days_left <= 30)
+            exam_soon = (days_left is not None) and (0 <= days_left <= exams.WARN_DAYS)
             table_rows.append({
                 "name": u["name"],
                 "position": u.get("position", ""),
@@ -712,7 +781,7 @@ def panel(request, group):
     else:
         for u in visible_users:
             days_left = _days_left_to_exam(u)
-            exam_soon = (days_left is not None) and (0 <= days_left <= 30)
+            exam_soon = (days_left is not None) and (0 <= days_left <= exams.WARN_DAYS)
             table_rows.append({
                 "name": u["name"],
                 "position": u.get("position", ""),
@@ -951,28 +1020,24 @@ def grafik_view(request, group):
     date_str = (request.GET.get("date") or request.POST.get(
         "date") or _date.today().isoformat()).strip()
 
-    groups = load_groups()
     all_employees_map = defaultdict(list)   # dept -> [names]
     # name -> {contact(email prefer), email, phone, position, department}
     employees_meta = {}
 
-    for g in groups:
-        dept = g["name"]
-        users_in_dept = load_users_norm(dept)
-        for u in users_in_dept:
-            name = (u.get("name") or "").strip()
-            if not name:
-                continue
-            email = (u.get("email") or "").strip()
-            phone = (u.get("contact") or "").strip()
-            all_employees_map[dept].append(name)
-            employees_meta[name] = {
-                "contact": email or phone,     # UI zawsze widzi maila gdy jest
-                "email": email,
-                "phone": phone,
-                "position": (u.get("position") or "").strip(),
-                "department": dept,
-            }
+    for dept, u in load_all_users():
+        name = (u.get("name") or "").strip()
+        if not name:
+            continue
+        email = (u.get("email") or "").strip()
+        phone = (u.get("contact") or "").strip()
+        all_employees_map[dept].append(name)
+        employees_meta[name] = {
+            "contact": email or phone,     # UI zawsze widzi maila gdy jest
+            "email": email,
+            "phone": phone,
+            "position": (u.get("position") or "").strip(),
+            "department": dept,
+        }
 
     current_users = load_users_norm(group)
     employee_list = []
@@ -985,23 +1050,15 @@ def grafik_view(request, group):
         })
     employee_names = [u["name"] for u in current_users]
 
-    plan_path = BASE_DIR / f"{group}_grafik_plan.json"
     info, error = None, None
-    all_days = {}
-    if plan_path.exists():
-        try:
-            data = json.loads(plan_path.read_text(encoding="utf-8"))
-            if isinstance(data, dict):
-                all_days = data
-            elif isinstance(data, list):
-                all_days = {date_str: data}
-            else:
-                all_days = {}
-        except Exception:
-            all_days = {}
-            error = "Nie udało się wczytać wcześniejszego szkicu (uszkodzony plik)."
+    try:
+        day = _date.fromisoformat(date_str)
+    except ValueError:
+        day = _date.today()
+        error = f"Nieprawidłowa data „{date_str}” – pokazano dzisiejszą."
+        date_str = day.isoformat()
 
-    if request.method == "POST":
+    if request.method == "POST" and not error:   # zła data: nie zapisujemy pod dzisiejszą
         emps = request.POST.getlist("emp[]")
         poss = request.POST.getlist("pos[]")
         # w formularzu pole nazywa się 'contact'
@@ -1020,17 +1077,15 @@ def grafik_view(request, group):
             rows.append({"name": name, "position": pos,
                         "contact": contact_val})
 
-        all_days[date_str] = rows
         try:
-            plan_path.write_text(json.dumps(
-                all_days, ensure_ascii=False, indent=2), encoding="utf-8")
+            save_day_plan(group, day, rows)
             info = f"Zapisano {len(rows)} wierszy dla {date_str}."
         except Exception as e:
             error = f"Nie udało się zapisać: {e}"
 
         return redirect(f"{request.path}?date={date_str}")
 
-    rows = all_days.get(date_str, []) or []
+    rows = load_day_plan(group, day)
     for r in rows:
         n = (r.get("name") or "").strip()
         email_pref = (employees_meta.get(n, {}) or {}).get("email", "")
@@ -1053,6 +1108,125 @@ def grafik_view(request, group):
         },
     )
 
+# -------------------------
+# GRAFIK – zakres dat (tydzień / miesiąc / kwartał)
+# -------------------------
+PLAN_RANGE_MAX_DAYS = 92   # pełny kwartał
+WEEKDAYS_SHORT = ["Pn", "Wt", "Śr", "Cz", "Pt", "So", "Nd"]
+
+
+def _plan_range_from_request(request):
+    """
+    ?from=RRRR-MM-DD&to=RRRR-MM-DD albo ?date=RRRR-MM-DD&span=week|month.
+    Zwraca (od, do, span, błąd).
+    """
+    span = request.GET.get("span") or "week"
+    try:
+        if request.GET.get("from") or request.GET.get("to"):
+            start = date.fromisoformat((request.GET.get("from") or "").strip())
+            end = date.fromisoformat((request.GET.get("to") or "").strip())
+            span = "range"
+        else:
+            anchor = date.fromisoformat((request.GET.get("date") or date.today().isoformat()).strip())
+            if span == "month":
+                start = anchor.replace(day=1)
+                end = (start + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+            else:
+                span = "week"
+                start = anchor - timedelta(days=anchor.weekday())
+                end = start + timedelta(days=6)
+    except ValueError:
+        return None, None, span, "Daty muszą mieć format RRRR-MM-DD."
+    if end < start:
+        return None, None, span, "Data końcowa jest wcześniejsza niż początkowa."
+    if (end - start).days + 1 > PLAN_RANGE_MAX_DAYS:
+        return None, None, span, f"Zakres może mieć najwyżej {PLAN_RANGE_MAX_DAYS} dni."
+    return start, end, span, None
+
+
+def plan_range_payload(group, start, end):
+    """
+    Plany działu dla [start, end] + dane osób z planów.
+    Dwa zapytania niezależnie od długości zakresu: plany (indeks dział+data)
+    i katalog pracowników (po nazwisku).
+    """
+    plans = load_day_plans(group, start, end)
+    meta = employee_directory(
+        (r.get("name") or "").strip() for rows in plans.values() for r in rows)
+    days = []
+    d = start
+    while d <= end:
+        rows = []
+        for r in plans.get(d) or []:
+            name = (r.get("name") or "").strip()
+            m = meta.get(name) or {}
+            rows.append({
+                "name": name,
+                "position": (r.get("position") or "").strip(),
+                "contact": m.get("email") or (r.get("contact") or "").strip(),
+                "department": m.get("department", ""),
+            })
+        days.append({"date": d.isoformat(), "weekday": d.weekday(), "rows": rows})
+        d += timedelta(days=1)
+    return {"group": group, "from": start.isoformat(), "to": end.isoformat(), "days": days}
+
+
+@never_cache
+def grafik_range_json(request, group):
+    """GET /grafik/<group>/zakres/json/?from=&to= – plany wielu dni jednym żądaniem."""
+    if request.session.get("auth_group") != group:
+        return JsonResponse({"ok": False, "detail": "Nie zalogowano do tego działu."}, status=401)
+    start, end, _span, error = _plan_range_from_request(request)
+    if error:
+        return JsonResponse({"ok": False, "detail": error}, status=400)
+    return JsonResponse({"ok": True, **plan_range_payload(group, start, end)})
+
+
+@never_cache
+def grafik_range(request, group):
+    """Tablica tygodnia / miesiąca: kalendarz z obsadą każdego dnia (tylko podgląd)."""
+    if request.session.get("auth_group") != group:
+        return redirect("login", group=group)
+
+    start, end, span, error = _plan_range_from_request(request)
+    weeks = []
+    prev_q = next_q = ""
+    if not error:
+        payload = plan_range_payload(group, start, end)
+        by_date = {x["date"]: x for x in payload["days"]}
+        # siatka pełnych tygodni (Pn–Nd); dni spoza zakresu są puste
+        d = start - timedelta(days=start.weekday())
+        last = end + timedelta(days=6 - end.weekday())
+        while d <= last:
+            week = []
+            for _ in range(7):
+                week.append({"date": d.isoformat(), "day": d.day, "in_range": start <= d <= end,
+                             "today": d == date.today(), "rows": (by_date.get(d.isoformat()) or {}).get("rows", [])})
+                d += timedelta(days=1)
+            weeks.append(week)
+        if span == "month":
+            prev_q = f"span=month&date={(start - timedelta(days=1)).replace(day=1).isoformat()}"
+            next_q = f"span=month&date={(end + timedelta(days=1)).isoformat()}"
+        elif span == "week":
+            prev_q = f"span=week&date={(start - timedelta(days=7)).isoformat()}"
+            next_q = f"span=week&date={(start + timedelta(days=7)).isoformat()}"
+        else:
+            step = timedelta(days=(end - start).days + 1)
+            prev_q = f"from={(start - step).isoformat()}&to={(end - step).isoformat()}"
+            next_q = f"from={(start + step).isoformat()}&to={(end + step).isoformat()}"
+
+    return render(request, "pierwsza_app/grafik_range.html", {
+        "group": group,
+        "span": span,
+        "start": start.isoformat() if start else "",
+        "end": end.isoformat() if end else "",
+        "prev_q": prev_q,
+        "next_q": next_q,
+        "weekdays": WEEKDAYS_SHORT,
+        "weeks": weeks,
+        "error": error,
+    })
+
 # -------------------------
 # SKRÓT „Ustaw grafik”
 # -------------------------
@@ -1085,8 +1259,7 @@ def logout_view(request, group=None):
 
 
 def delete_group(request, group):
-    groups = load_groups()
-    g = get_group(groups, group)
+    g = get_group(group)
     if not g:
         return redirect("start")
 
@@ -1096,34 +1269,9 @@ def delete_group(request, group):
         password = (request.POST.get("password") or "").strip()
 
         if login == g["login"] and password == g["password"]:
-            upath = users_path(group)
-            if upath.exists():
-                try:
-                    upath.unlink()
-                except Exception:
-                    pass
-
-            for f in BASE_DIR.glob(f"{group}_*.json"):
-                try:
-                    f.unlink()
-                except Exception:
-                    pass
-
-            for pattern in [
-                f"grafik_*{group.replace(' ', '_')}*.pdf",
-                f"karta_*{group.replace(' ', '_')}*.pdf",
-                f"grafik_*{group}*.pdf",
-                f"karta_*{group}*.pdf",
-            ]:
-                for f in BASE_DIR.glob(pattern):
-                    try:
-                        f.unlink()
-                    except Exception:
-                        pass
-
-            groups = [gr for gr in groups if gr["name"].strip() !=
-                      group.strip()]
-            save_groups(groups)
+            # siatki, kopie i karty PDF działu leżą w jednym katalogu
+            storage.delete_department(BASE_DIR, group)
+            delete_group_record(group)
             return redirect("start")
         else:
             error = "Niepoprawny login lub hasło."
@@ -1188,6 +1336,7 @@ def autosave_cell(request, group):
     user_name = (data.get("user_name") or "").strip()
     day = data.get("day")
     value = (data.get("value") or "").strip()
+    editor = editor_id(data.get("editor"))
 
     if not (year and month_raw and user_name and day is not None):
         return JsonResponse({"ok": False, "error": "Brak wymaganych pól"}, status=400)
@@ -1202,54 +1351,306 @@ def autosave_cell(request, group):
     except Exception:
         return JsonResponse({"ok": False, "error": "Dzień musi być liczbą"}, status=400)
 
-    table = load_month_data(group, month, year)
-
-    users_all = [u["name"] for u in load_users_norm(group)]
-    total_days = days_in_month(month, year)
+    # tryb bezpośredni: odczyt–zmiana–zapis pliku pod blokadą działu na wyłączność (bez zgubionych
+    # aktualizacji); write-behind – pod współdzieloną (flush i zamknięcie roku czekają, aż edycja
+    # trafi do dziennika) i blokadą zdarzeń (stara wartość, zdarzenie i stan reguł czasu pracy)
+    buffered = writebehind.enabled()
+    with storage.locked(BASE_DIR, group, shared=buffered), \
+            (storage.locked(BASE_DIR, group, name="events") if buffered else nullcontext()):
+        if archive.is_closed(BASE_DIR, group, year):
+            return JsonResponse({"ok": False, "error": f"Rok {year} jest zamknięty (archiwum)"}, status=409)
+
+        stamp = _month_stamp(group, month, year)
+        table = load_month_data(group, month, year)
+
+        users_all = [u["name"] for u in load_users_norm(group)]
+        total_days = days_in_month(month, year)
+
+        for uname in set(users_all + [user_name]):
+            table[uname] = _ensure_row_len(table.get(uname, []), total_days)
+
+        if not (1 <= day <= total_days):
+            return JsonResponse({"ok": False, "error": "Dzień poza zakresem miesiąca"}, status=400)
+
+        # stan wiersza do reguł czasu pracy – z cache, jeśli plik się nie zmienił od naszego zapisu
+        channel = live_channel(group, month, year)
+        validator = month_validator(month, year)
+        state = labour_states.get(channel, user_name, stamp) or validator.state(table[user_name])
+
+        before = table[user_name]
+        table[user_name] = before[:day - 1] + [value] + before[day:]
+        if buffered:
+            # zdarzenie od razu; dziennik działu (fsync), plik miesiąca i historia – paczką przy flush()
+            if before[day - 1] != value:
+                events.record(BASE_DIR, group, month, year, [events.Change(user_name, day, before[day - 1], value)],
+                              who=actor(request), src="autosave", base=lambda: {**table, user_name: before},
+                              editor=editor)
+            writebehind.append(BASE_DIR, group, month, year, user_name, day, value)
+        else:
+            save_table_to_file(group, month, year, table, who=actor(request), src="autosave", editor=editor)
 
-    for uname in set(users_all + [user_name]):
-        table[uname] = _ensure_row_len(table.get(uname, []), total_days)
+        violations, window = validator.apply(state, day, value)
+        new_stamp = _month_stamp(group, month, year)
+        labour_states.restamp(channel, stamp, new_stamp)
+        labour_states.put(channel, user_name, new_stamp, state)
 
-    if not (1 <= day <= total_days):
-        return JsonResponse({"ok": False, "error": "Dzień poza zakresem miesiąca"}, status=400)
+    if buffered:
+        writebehind.flush_if_full(BASE_DIR, group)
 
-    table[user_name][day - 1] = value
-    save_table_to_file(group, month, year, table)
+    # --- PUSH do innych okien otwartych na tym miesiącu ---
+    live_hub.publish(channel, {
+        "user_name": user_name, "day": day, "value": value,
+        "client": str(data.get("client") or ""),
+    })
 
-    # --- LOG HISTORII (po ID) ---
+    # --- LOG HISTORII (po ID) – w trybie write-behind dopiero przy flush (core/writebehind.py) ---
     try:
-        emp = next((u for u in load_users_norm(group)
-                   if u["name"] == user_name), None)
+        emp = None if buffered else next((u for u in load_users_norm(group)
+                                          if u["name"] == user_name), None)
         if emp:
             y = int(year)
             m = POLISH_MONTHS[month]
             d = int(day)
             day_iso = f"{y:04d}-{m:02d}-{d:02d}"
-            TOKENS_LOG = {"1", "2", "3", "C"}
-            tok = (value or "").strip().upper()
-
-            if tok in TOKENS_LOG:
-                append_history(emp["id"], day_iso, group, tok)
-            else:
-                # pusta/inna wartość = czyszczenie
-                append_history(emp["id"], day_iso, group, "")
+            # pusta/inna wartość = czyszczenie
+            append_history(emp["id"], day_iso, group, history_token(value))
     except Exception:
         pass
 
-    return JsonResponse({"ok": True})
+    return JsonResponse({"ok": True, "violations": violations, "window": list(window)})
+
+
+def apply_buffered_edits(group, edits):
+    """
+    Zapis paczki z dziennika autosave (core/writebehind.flush, pod blokadą działu):
+    {(miesiąc, rok): {(osoba, dzień): wartość}} -> jeden plik na miesiąc
+    i jeden plik historii na osobę, z fsync przed skróceniem dziennika.
+    Zwraca edycje, których nie da się zapisać: [(miesiąc, rok, osoba, dzień, wartość, powód)].
+    """
+    ids = {u["name"]: u["id"] for u in load_users_norm(group)}
+    history = defaultdict(dict)
+    rejected = []
+    for (month, year), cells in edits.items():
+        if archive.is_closed(BASE_DIR, group, year):
+            # nie powinno się zdarzyć (zamknięcie roku opróżnia dziennik pod tą samą blokadą)
+            rejected += [(month, year, user, day, value, "rok zamknięty") for (user, day), value in cells.items()]
+            continue
+        n_days = days_in_month(month, year)
+        table = load_month_file(group, month, year)
+        m = POLISH_MONTHS[month]
+        for (user, day), value in cells.items():
+            if not 1 <= day <= n_days:
+                rejected.append((month, year, user, day, value, "dzień poza miesiącem"))
+                continue
+            row = table[user] = _ensure_row_len(table.get(user, []), n_days)
+            row[day - 1] = value
+            if ids.get(user):
+                history[ids[user]][f"{int(year):04d}-{m:02d}-{day:02d}"] = history_token(value)
+        write_month_file(group, month, year, table, durable=True)
+    for emp_id, days in history.items():
+        append_history_days(emp_id, group, days, durable=True)
+    return rejected
+
+# -------------------------
+# HISTORIA SIATKI – stan na dzień, zdarzenia, cofanie (core/events.py)
+# -------------------------
+
+
+def _grid_month(params):
+    """(miesiąc, rok, błąd) z GET albo JSON: month = nazwa lub numer, year = RRRR."""
+    year = str(params.get("year") or "").strip()
+    try:
+        month = month_to_name(params.get("month") or "")
+    except Exception:
+        return None, None, "Nieznany miesiąc"
+    if not (year.isdigit() and month in POLISH_MONTHS):
+        return None, None, "Brak wymaganych pól (month, year)"
+    return month, year, None
+
+
+@never_cache
+def grid_as_of(request, group):
+    """
+    GET /historia-siatki/<group>/?month=Marzec&year=2025&at=2025-02-20
+    Siatka miesiąca w danej chwili: najbliższa migawka + zdarzenia po niej.
+    at: data (koniec dnia), data z godziną (czas lokalny) albo ns od epoki; domyślnie teraz.
+    """
+    if request.session.get("auth_group") != group:
+        return JsonResponse({"ok": False, "detail": "Nie zalogowano do tego działu."}, status=401)
+    month, year, error = _grid_month(request.GET)
+    if error:
+        return JsonResponse({"ok": False, "detail": error}, status=400)
+    at = events.parse_at(request.GET.get("at")) if request.GET.get("at") else time.time_ns()
+    if at is None:
+        return JsonResponse({"ok": False, "detail": "Nieprawidłowy parametr at."}, status=400)
+    state = events.as_of(BASE_DIR, group, month, year, at)
+    if state is None:
+        return JsonResponse({"ok": False, "detail": f"Brak historii zmian dla {month} {year}."}, status=404)
+    return JsonResponse({
+        "ok": True, "group": group, "month": month, "year": year, "at": events.format_t(at),
+        "exact": state["exact"], "snapshot": dict(state["snapshot"], t=events.format_t(state["snapshot"]["t"])),
+        "replayed": state["replayed"], "data": state["data"],
+    })
+
+
+@never_cache
+def grid_events(request, group):
+    """
+    GET /historia-siatki/<group>/zdarzenia/?month=..&year=..&limit=50[&mine=1&editor=..] – ostatnie zmiany komórek.
+    mine – tylko zmiany tej przeglądarki (editor), a bez editor – tego loginu.
+    """
+    if request.session.get("auth_group") != group:
+        return JsonResponse({"ok": False, "detail": "Nie zalogowano do tego działu."}, status=401)
+    month, year, error = _grid_month(request.GET)
+    if error:
+        return JsonResponse({"ok": False, "detail": error}, status=400)
+    try:
+        limit = min(max(int(request.GET.get("limit") or 50), 1), 500)
+    except ValueError:
+        return JsonResponse({"ok": False, "detail": "limit musi być liczbą."}, status=400)
+    who, editor = None, None
+    if request.GET.get("mine"):
+        who, editor = mine_filter(request, editor_id(request.GET.get("editor")))
+    items = events.recent(BASE_DIR, group, month, year, limit, who, editor)
+    for e in items:
+        e["time"] = events.format_t(e.pop("t"))
+    return JsonResponse({"ok": True, "month": month, "year": year, "events": items})
+
+
+@require_POST
+@never_cache
+def undo_grid_edits(request, group):
+    """
+    POST /historia-siatki/<group>/cofnij/  JSON {"month", "year", "n": 1, "mine": true, "editor": id}
+    Cofa ostatnie n edycji miesiąca (mine – tylko własne: tej przeglądarki,
+    a bez editor – tego loginu działu). Komórki zmienione
+    później przez kogoś innego zostają bez zmian (skipped).
+    """
+    if request.session.get("auth_group") != group:
+        return JsonResponse({"ok": False, "detail": "Nie zalogowano do tego działu."}, status=401)
+    try:
+        data = json.loads(request.body.decode("utf-8"))
+    except Exception as e:
+        return JsonResponse({"ok": False, "detail": f"Nieprawidłowy JSON: {e}"}, status=400)
+    month, year, error = _grid_month(data)
+    if error:
+        return JsonResponse({"ok": False, "detail": error}, status=400)
+    try:
+        n = min(max(int(data.get("n") or 1), 1), events.UNDO_MAX)
+    except (TypeError, ValueError):
+        return JsonResponse({"ok": False, "detail": "n musi być liczbą."}, status=400)
+    if archive.is_closed(BASE_DIR, group, year):
+        return JsonResponse({"ok": False, "detail": f"Rok {year} jest zamknięty (archiwum)"}, status=409)
+
+    who, editor = actor(request), editor_id(data.get("editor"))
+    mine = mine_filter(request, editor) if data.get("mine") else (None, None)
+    changes, extra, skipped = [], [], 0
+    with storage.locked(BASE_DIR, group):
+        writebehind.flush(BASE_DIR, group)
+        table = load_month_file(group, month, year)
+        # od najnowszej: każda cofnięta edycja przywraca stan sprzed niej
+        for offset, e in events.undoable(BASE_DIR, group, month, year, n, *mine):
+            user, day = e["user"], int(e["day"])
+            row = table.get(user) or []
+            current = row[day - 1] if day <= len(row) else ""
+            if current != e["new"]:
+                skipped += 1
+                continue
+            changes.append(events.Change(user, day, current, e["old"]))
+            extra.append({"undo": offset})
+            events.apply(table, user, day, e["old"])
+        if changes:
+            write_month_file(group, month, year, table)
+            events.record(BASE_DIR, group, month, year, changes, who=who, src="undo", extra=extra, editor=editor)
+
+    ids = {u["name"]: u["id"] for u in load_users_norm(group)}
+    history, m = defaultdict(dict), POLISH_MONTHS[month]
+    channel = live_channel(group, month, year)
+    for c in changes:
+        if ids.get(c.user):
+            history[ids[c.user]][f"{int(year):04d}-{m:02d}-{c.day:02d}"] = history_token(c.new)
+        live_hub.publish(channel, {"user_name": c.user, "day": c.day, "value": c.new, "client": ""})
+    for emp_id, days in history.items():
+        append_history_days(emp_id, group, days)
+    return JsonResponse({"ok": True, "undone": [c._asdict() for c in changes], "skipped": skipped})
+
+# -------------------------
+# LIVE (SSE) – zmiany komórek na żywo
+# -------------------------
+
+
+async def live_stream(request, group):
+    """
+    GET /live/<group>/?month=..&year=..
+    Strumień text/event-stream z komórkami zapisanymi przez autosave_cell.
+    Wymaga serwera ASGI (pod WSGI każde połączenie blokowałoby workera).
+    """
+    if await request.session.aget("auth_group") != group:
+        return JsonResponse({"ok": False, "detail": "Nie zalogowano do tego działu."}, status=401)
+
+    year = (request.GET.get("year") or "").strip()
+    try:
+        month = month_to_name(request.GET.get("month") or "")
+    except Exception:
+        return JsonResponse({"ok": False, "detail": "Nieznany miesiąc"}, status=400)
+    if not (year and month in POLISH_MONTHS):
+        return JsonResponse({"ok": False, "detail": "Brak wymaganych pól"}, status=400)
+
+    resp = StreamingHttpResponse(sse_events(live_channel(group, month, year)),
+                                 content_type="text/event-stream")
+    resp["Cache-Control"] = "no-cache"
+    resp["X-Accel-Buffering"] = "no"  # nginx/Render: nie buforuj strumienia
+    return resp
 
 # -------------------------
 # EDYCJA + PDF
 # -------------------------
 
 
+def build_compact_grid(users, existing, n_days):
+    """
+    Kolumnowa postać siatki dla trybu kompaktowego edit_table:
+      names  – kolejność wierszy,
+      tokens – słownik różnych wartości (indeks 0 = pusta komórka),
+      cells  – macierz kodów (wiersz = pracownik, kolumna = dzień).
+    """
+    names = [u["name"] for u in users]
+    values, code_of, cells = [""], {"": 0}, []
+    for name in names:
+        row_vals = existing.get(name, []) or []
+        codes = []
+        for d in range(n_days):
+            val = row_vals[d] if d < len(row_vals) else ""
+            code = code_of.get(val)
+            if code is None:
+                code = code_of[val] = len(values)
+                values.append(val)
+            codes.append(code)
+        cells.append(codes)
+    return {"names": names, "days": n_days, "tokens": values, "cells": cells}
+
+
 def edit_table(request, group):
     month = request.GET.get("month", "Styczeń")
     year = request.GET.get("year", "2025")
 
     users = load_users_norm(group)
+    if request.method == "POST":
+        # zaległy autosave najpierw – różnice do historii liczymy względem tego, co naprawdę w pliku
+        writebehind.flush(BASE_DIR, group)
     existing = load_month_data(group, month, year)
     days_list = list(range(1, days_in_month(month, year) + 1))
+    closed = archive.is_closed(BASE_DIR, group, year)
+
+    if request.method == "POST" and closed:
+        # zamknięty rok: nic nie zapisujemy, wydruki z danych archiwum
+        action = request.POST.get("action", "save")
+        if action in ("grafik", "karty"):
+            table_data = {"group": group, "month": month, "year": str(year), "data": existing}
+            return month_pdf_response(action, table_data)
+        if action == "save_back":
+            return redirect("panel", group=group)
+        return HttpResponseRedirect(request.get_full_path())
 
     if request.method == "POST":
         table = {}
@@ -1261,7 +1662,7 @@ def edit_table(request, group):
             table[u["name"]] = row
 
         # --- LOG HISTORII PRZED ZAPISEM (różnice) ---
-        TOKENS_LOG = {"1", "2", "3", "C"}
+        TOKENS_LOG = tokens.HISTORY_TOKENS
         try:
             for u in users:
                 name = u["name"]
@@ -1286,50 +1687,65 @@ def edit_table(request, group):
         except Exception:
             pass
 
-        json_path = save_table_to_file(group, month, year, table)
+        json_path = save_table_to_file(group, month, year, table, who=actor(request), src="edit",
+                                       editor=editor_id(request.POST.get("editor")))
         action = request.POST.get("action", "save")
 
+        # --- ZASADY CZASU PRACY: tylko okna wokół zmienionych komórek ---
+        validator = month_validator(month, year)
+        labour = {}
+        for name, new_row in table.items():
+            old_row = existing.get(name, []) or []
+            changed = [d for d in days_list
+                       if new_row[d - 1].upper() != str(old_row[d - 1] if len(old_row) >= d else "").strip().upper()]
+            if changed:
+                found = validator.check_changed(validator.state(new_row), changed)
+                if found:
+                    labour[name] = found
+
         if action == "grafik":
-            json_name = Path(json_path).name
+            json_name = Path(json_path).relative_to(BASE_DIR)
             try:
                 return generate_grafik_pdf_response(json_name)
             except (FileNotFoundError, ValueError) as e:
                 raise Http404(str(e))
 
         elif action == "karty":
-            if generate_karty_pdf_response is None:
-                return HttpResponse(
-                    "Moduł generowania PDF kart nie jest jeszcze zaktualizowany. "
-                    "Zaimplementuj funkcję generate_karty_pdf_response w pierwsza_app/core/pdf_karty.py analogicznie do grafiku.",
-                    status=500
-                )
-            json_name = Path(json_path).name
+            json_name = Path(json_path).relative_to(BASE_DIR)
             try:
                 return generate_karty_pdf_response(json_name)
             except (FileNotFoundError, ValueError) as e:
                 raise Http404(str(e))
 
         elif action == "save_back":
+            if labour:
+                return redirect(f"/panel/{group}/?info=" + quote("Zapisano. " + _labour_summary(labour)))
             return redirect("panel", group=group)
 
         return HttpResponseRedirect(request.get_full_path())
 
-    rows = []
-    for u in users:
-        name = u["name"]
-        row_vals = existing.get(name, []) or []
-        days_for_row = []
-        for d in days_list:
-            val = row_vals[d - 1] if len(row_vals) >= d else ""
-            days_for_row.append({"d": d, "val": val})
-        rows.append({"name": name, "days": days_for_row})
+    render_start = time.perf_counter()
+    compact = request.GET.get(
+        "compact", "1" if settings.EDIT_TABLE_COMPACT else "0") == "1"
 
-    values = {}
-    for r in rows:
-        for cell in r["days"]:
-            values[f"{r['name']}__{cell['d']}"] = cell["val"]
+    rows, values, grid = [], {}, None
+    if compact:
+        grid = build_compact_grid(users, existing, len(days_list))
+    else:
+        for u in users:
+            name = u["name"]
+            row_vals = existing.get(name, []) or []
+            days_for_row = []
+            for d in days_list:
+                val = row_vals[d - 1] if len(row_vals) >= d else ""
+                days_for_row.append({"d": d, "val": val})
+            rows.append({"name": name, "days": days_for_row})
 
-    return render(
+        for r in rows:
+            for cell in r["days"]:
+                values[f"{r['name']}__{cell['d']}"] = cell["val"]
+
+    resp = render(
         request,
         "pierwsza_app/table_edit.html",
         {
@@ -1340,8 +1756,216 @@ def edit_table(request, group):
             "days": days_list,
             "rows": rows,
             "values": values,
+            "grid": grid,
+            "labour": month_validator(month, year).validate_table(
+                {u["name"]: existing.get(u["name"]) for u in users}),
+            "closed": closed,
         },
     )
+    # czas budowy + renderu szablonu (DevTools → Network → Timing)
+    resp["Server-Timing"] = f"render;dur={(time.perf_counter() - render_start) * 1000:.1f}"
+    return resp
+
+
+def _day_param(data, key, default):
+    value = data.get(key)
+    if value in (None, ""):
+        return default
+    return int(value)
+
+
+@require_POST
+@never_cache
+def bulk_grid_edit(request, group):
+    """
+    POST /edycja/<group>/operacje/  JSON (core/gridops.py):
+      {"op": "fill|clear|rotation|copy", "month", "year",
+       "names": [...] (puste = cały dział), "from": 1, "to": ostatni dzień,
+       "token": "1"                              – fill,
+       "pattern": "1,1,2,2,3,3,W,W", "start": dzień z pattern[0], "stagger": 0   – rotation,
+       "source_month", "source_year" (domyślnie poprzedni miesiąc)                – copy,
+       "only_empty": false}
+    Cała operacja to jeden zapis pliku miesiąca pod blokadą działu, zdarzenia
+    i historia paczką; odpowiedź: zmienione komórki, naruszenia zasad czasu pracy
+    i sprawdzone okno dni per osoba ("window": {osoba: [od, do]}).
+    """
+    if request.session.get("auth_group") != group:
+        return JsonResponse({"ok": False, "detail": "Nie zalogowano do tego działu."}, status=401)
+    try:
+        data = json.loads(request.body.decode("utf-8"))
+    except Exception as e:
+        return JsonResponse({"ok": False, "detail": f"Nieprawidłowy JSON: {e}"}, status=400)
+    month, year, error = _grid_month(data)
+    if error:
+        return JsonResponse({"ok": False, "detail": error}, status=400)
+    op = (data.get("op") or "").strip()
+    if op not in gridops.OPS:
+        return JsonResponse({"ok": False, "detail": f"Nieznana operacja: {op or '(brak)'}."}, status=400)
+    if archive.is_closed(BASE_DIR, group, year):
+        return JsonResponse({"ok": False, "detail": f"Rok {year} jest zamknięty (archiwum)"}, status=409)
+
+    n_days = days_in_month(month, year)
+    try:
+        day_from = _day_param(data, "from", 1)
+        day_to = _day_param(data, "to", n_days)
+        start = _day_param(data, "start", day_from)
+        stagger = _day_param(data, "stagger", 0)
+    except (TypeError, ValueError):
+        return JsonResponse({"ok": False, "detail": "from, to, start i stagger muszą być liczbami."}, status=400)
+    if not 1 <= day_from <= day_to <= n_days:
+        return JsonResponse({"ok": False, "detail": f"Zakres dni poza miesiącem (1–{n_days})."}, status=400)
+
+    roster = [u["name"] for u in load_users_norm(group)]
+    wanted = data.get("names") or []
+    if not isinstance(wanted, list) or not all(isinstance(n, str) for n in wanted):
+        return JsonResponse({"ok": False, "detail": "names musi być listą nazwisk."}, status=400)
+    unknown = sorted(set(wanted) - set(roster))
+    if unknown:
+        return JsonResponse({"ok": False, "detail": f"Brak w dziale: {', '.join(unknown)}"}, status=400)
+    names = [n for n in roster if n in set(wanted)] if wanted else roster
+    only_empty = bool(data.get("only_empty"))
+
+    token = gridops.normalize_token(data.get("token"))
+    pattern = gridops.parse_pattern(data.get("pattern"))
+    if op == "fill" and not token:
+        return JsonResponse({"ok": False, "detail": "Podaj token do wpisania."}, status=400)
+    if op == "rotation" and not (any(pattern) and len(pattern) <= gridops.MAX_PATTERN):
+        return JsonResponse({"ok": False, "detail": f"Wzór rotacji: 1–{gridops.MAX_PATTERN} pozycji."},
+                            status=400)
+    if max([len(token)] + [len(t) for t in pattern]) > gridops.MAX_TOKEN:
+        return JsonResponse({"ok": False, "detail": f"Token dłuższy niż {gridops.MAX_TOKEN} znaków."}, status=400)
+
+    if op == "copy":
+        y, m = int(year), POLISH_MONTHS[month]
+        prev_y, prev_m = (y, m - 1) if m > 1 else (y - 1, 12)
+        num2name = {v: k for k, v in POLISH_MONTHS.items()}
+        source_month, source_year, error = _grid_month({
+            "month": data.get("source_month") or num2name[prev_m],
+            "year": data.get("source_year") or prev_y,
+        })
+        if error:
+            return JsonResponse({"ok": False, "detail": error}, status=400)
+        if (source_month, source_year) == (month, year):
+            return JsonResponse({"ok": False, "detail": "Miesiąc źródłowy musi być inny niż edytowany."},
+                                status=400)
+        # archiwum też jest dobrym źródłem – zamknięty rok czytamy tylko do odczytu
+        source = load_month_data(group, source_month, source_year)
+        shift = gridops.weekday_shift(date(int(source_year), POLISH_MONTHS[source_month], 1), date(y, m, 1))
+
+    with storage.locked(BASE_DIR, group):
+        writebehind.flush(BASE_DIR, group)
+        table = load_month_file(group, month, year)
+        if op == "fill":
+            cells = gridops.fill(table, names, day_from, day_to, token, only_empty)
+        elif op == "clear":
+            cells = gridops.clear(table, names, day_from, day_to)
+        elif op == "rotation":
+            cells = gridops.rotation(table, names, day_from, day_to, pattern, start, stagger, only_empty)
+        else:
+            cells = gridops.copy_pattern(table, source, names, day_from, day_to,
+                                         days_in_month(source_month, source_year), shift, only_empty)
+        new = dict(table)
+        if cells:
+            for name, days in cells.items():
+                row = new[name] = _ensure_row_len(table.get(name, []), n_days)
+                for day, value in days.items():
+                    row[day - 1] = value
+            save_table_to_file(group, month, year, new, who=actor(request), src="bulk",
+                               editor=editor_id(data.get("editor")))
+
+    # historia: jeden zapis pliku na osobę; zasady czasu pracy – okna wokół zmienionych dni
+    ids = {u["name"]: u["id"] for u in load_users_norm(group)}
+    validator = month_validator(month, year)
+    channel = live_channel(group, month, year)
+    m = POLISH_MONTHS[month]
+    labour, windows = {}, {}
+    for name, days in cells.items():
+        if ids.get(name):
+            append_history_days(ids[name], group, {
+                f"{int(year):04d}-{m:02d}-{day:02d}": history_token(value) for day, value in days.items()})
+        # ciągłe okno od pierwszej zmiany do zasięgu reguł za ostatnią – przeglądarka czyści w nim znaczniki
+        lo, hi = min(days), validator.window(max(days))[1]
+        windows[name] = [lo, hi]
+        found = validator.check_changed(validator.state(new[name]), range(lo, max(days) + 1))
+        if found:
+            labour[name] = found
+        for day, value in days.items():
+            live_hub.publish(channel, {"user_name": name, "day": day, "value": value,
+                                       "client": str(data.get("client") or "")})
+
+    return JsonResponse({"ok": True, "op": op, "changed": gridops.count(cells), "cells": cells,
+                         "violations": labour, "window": windows})
+
+# -------------------------
+# PROPOZYCJA GRAFIKU (generator)
+# -------------------------
+
+SCHEDULER_HISTORY_MONTHS = 3   # ile poprzednich miesięcy liczy się do rozkładu niedziel/świąt
+SCHEDULER_MAX_BUDGET = 5.0     # limit z żądania; dłuższe przeszukiwanie – manage.py scheduler_benchmark --budget
+
+
+@never_cache
+async def propose_month(request, group):
+    """
+    JSON z propozycją obsady pustych komórek miesiąca.
+    ?month=&year=&tpl_1=&tpl_2=&tpl_3= – nazwy szablonów obsady (ScheduleTemplate) dla zmian,
+    &budget= – sekundy na przeszukiwanie (domyślnie settings.SCHEDULER_BUDGET, najwyżej
+    SCHEDULER_MAX_BUDGET), &seed=.
+    Nic nie zapisuje – siatkę akceptuje użytkownik w edit_table.
+    Widok asynchroniczny: solver liczy się w osobnym wątku, więc przez cały budżet
+    nie blokuje wspólnego wątku widoków synchronicznych (autosave, logowanie) w workerze.
+    """
+    if await request.session.aget("auth_group") != group:
+        return JsonResponse({"ok": False, "detail": "Brak autoryzacji."}, status=401)
+
+    month = request.GET.get("month", "")
+    year = request.GET.get("year", "")
+    if month not in POLISH_MONTHS or not year.isdigit():
+        return JsonResponse({"ok": False, "detail": "Nieprawidłowy miesiąc lub rok."}, status=400)
+
+    names = {s: (request.GET.get(f"tpl_{s}") or "").strip() for s in SHIFTS}
+    try:
+        budget = float(request.GET.get("budget") or settings.SCHEDULER_BUDGET)
+    except ValueError:
+        budget = settings.SCHEDULER_BUDGET
+    budget = min(max(budget, 0.0), SCHEDULER_MAX_BUDGET)
+    seed = request.GET.get("seed")
+    seed = int(seed) if seed and seed.lstrip("-").isdigit() else None
+
+    solve, error = await sync_to_async(_proposal_solver)(group, month, year, names)
+    if error:
+        return JsonResponse({"ok": False, "detail": error}, status=400)
+    # czyste obliczenia bez bazy – wątek z puli, nie wspólny wątek widoków synchronicznych
+    proposal = await sync_to_async(solve, thread_sensitive=False)(budget=budget, seed=seed)
+    return JsonResponse({"ok": True, **proposal.as_json()})
+
+
+def _proposal_solver(group, month, year, names):
+    """generate_month z danymi z bazy i plików (budget, seed do podania): (solver, None) albo (None, błąd)."""
+    y, m = int(year), POLISH_MONTHS[month]
+    templates = {t.name: t.positions for t in ScheduleTemplate.objects.filter(
+        group=group, name__in=[n for n in names.values() if n])}
+    missing = [n for n in names.values() if n and n not in templates]
+    if missing:
+        return None, f"Brak szablonu: {', '.join(missing)}"
+    demand = {s: [str(p) for p in templates[n]] for s, n in names.items() if n}
+    if not any(demand.values()):
+        return None, "Wybierz szablon obsady dla co najmniej jednej zmiany."
+
+    users = load_users_norm(group)
+    existing = load_month_data(group, month, year)
+    n_days = days_in_month(month, year)
+    special_days = [d for d in range(1, n_days + 1) if _is_sunday_or_holiday(y, m, d)]
+
+    # niedziele/święta z poprzednich miesięcy – żeby nie trafiały ciągle do tych samych osób
+    py, pm = (y, m - SCHEDULER_HISTORY_MONTHS) if m > SCHEDULER_HISTORY_MONTHS else (y - 1, m + 12 - SCHEDULER_HISTORY_MONTHS)
+    ly, lm = (y, m - 1) if m > 1 else (y - 1, 12)
+    num2name = {v: k for k, v in POLISH_MONTHS.items()}
+    history = months_between(num2name[pm], str(py), num2name[lm], str(ly))
+    past_special = {n: v["ndz"] for n, v in count_stats(group, users, history).items()}
+    return partial(generate_month, users, demand, existing, y, m,
+                   special_days=special_days, past_special=past_special), None
+
 
 # -------------------------
 # PROFIL PRACOWNIKA
@@ -1415,22 +2039,15 @@ def employee_profile(request, group, emp_name):
             error = f"Pracownik o nazwie „{new_name}” już istnieje."
 
         if not error:
-            users[idx]["name"] = new_name
-            users[idx]["position"] = new_pos
-            users[idx]["contact"] = new_contact
-            users[idx]["email"] = new_email
-            users[idx]["medical_exam"] = new_exam
-
             # zaktualizowany katalog (po ewentualnym dodaniu new_skill)
             skills_map = {s: (s in selected) for s in catalog}
-            users[idx]["skills"] = skills_map
-
-            save_users_to_file(group, users)
+            update_employee(group, emp_name, skills=skills_map, name=new_name, position=new_pos,
+                            contact=new_contact, email=new_email, medical_exam=new_exam)
             info = ("Zapisano zmiany." if not info else "Zapisano zmiany. " + info)
 
             if new_name != emp_name:
                 return redirect("employee_profile", group=group, emp_name=new_name)
-            employee = users[idx]
+            employee = next(u for u in load_users_norm(group) if u["name"] == new_name)
 
     # Odśwież katalog + dołącz ewentualne klucze nietypowe z profilu
     catalog = load_skill_catalog()
@@ -1449,34 +2066,90 @@ def employee_profile(request, group, emp_name):
             "emp_skills_on": emp_skills_on,
             "info": info,
             "error": error,
+            "pdf_month": date.today().strftime("%Y-%m"),
         },
     )
 
-# -------------------------
-# EKSPORT / IMPORT STATYSTYK I SIATKI
-# -------------------------
+
+EMPLOYEE_PDF_MAX_MONTHS = 12
+
+
+def _month_arg(value):
+    """'RRRR-MM' -> (nazwa miesiąca, 'RRRR') albo None."""
+    m = re.match(r"^(\d{4})-(\d{2})$", (value or "").strip())
+    if not m or not 1 <= int(m.group(2)) <= 12:
+        return None
+    num2name = {v: k for k, v in POLISH_MONTHS.items()}
+    return num2name[int(m.group(2))], m.group(1)
 
 
 @never_cache
-def export_profiles_with_stats_csv(request, group):
+def employee_pdf(request, group, kind, emp_name):
     """
-    Eksport profili + statystyki (workdays/ndz/l4) dla podanego zakresu.
-    GET parametry:
-      from_month, from_year, to_month, to_year
+    GET /employee/<group>/pdf/<karta|grafik>/<osoba>/?from=RRRR-MM&to=RRRR-MM
+    Karta pracy albo grafik osobisty jednej osoby za miesiąc lub zakres miesięcy.
+    Z każdego miesiąca bierzemy tylko wiersz tej osoby – dokument ma kilka stron,
+    a nie cały dział.
     """
     if request.session.get("auth_group") != group:
         return redirect("login", group=group)
+    if kind not in ("karta", "grafik"):
+        raise Http404("Nieznany rodzaj wydruku.")
 
-    users = load_users_norm(group)
+    emp_name = unquote(emp_name).strip()
+    if not any(u.get("name") == emp_name for u in load_users_norm(group)):
+        raise Http404("Nie znaleziono takiego pracownika w tym dziale.")
 
-    # zakres
-    from_month = request.GET.get("from_month", "Styczeń")
-    from_year = request.GET.get("from_year", "2025")
-    to_month = request.GET.get("to_month", "Grudzień")
-    to_year = request.GET.get("to_year", "2025")
+    today = date.today().strftime("%Y-%m")
+    first = _month_arg(request.GET.get("from") or today)
+    last = _month_arg(request.GET.get("to") or request.GET.get("from") or today)
+    if not first or not last:
+        return HttpResponse("Miesiąc w formacie RRRR-MM.", status=400)
+    months = months_between(*first, *last)
+    if not months:
+        return HttpResponse("Początek zakresu jest po jego końcu.", status=400)
+    if len(months) > EMPLOYEE_PDF_MAX_MONTHS:
+        return HttpResponse(f"Najwyżej {EMPLOYEE_PDF_MAX_MONTHS} miesięcy naraz.", status=400)
+
+    tables = []
+    for month, year in months:
+        row = load_month_data(group, month, year).get(emp_name)
+        if row is not None:
+            tables.append({"group": group, "month": month, "year": year, "data": {emp_name: row}})
+    if not tables:
+        raise Http404("Brak grafiku tej osoby w wybranym okresie.")
+
+    try:
+        pdf = render_employee_pdf(kind, tables)
+    except ValueError as e:
+        raise Http404(str(e))
+    period = f"{months[0][0]}_{months[0][1]}"
+    if len(months) > 1:
+        period += f"-{months[-1][0]}_{months[-1][1]}"
+    filename = f"{kind}_{emp_name.replace(' ', '_')}_{period}.pdf"
+    return FileResponse(io.BytesIO(pdf), as_attachment=True, filename=filename)
+
+# -------------------------
+# EKSPORT / IMPORT STATYSTYK I SIATKI
+# -------------------------
+
+
+def profile_stats_header(my):
+    """Nagłówek eksportu profili + statystyk dla zakresu [(miesiąc, rok), ...]."""
+    (from_month, from_year), (to_month, to_year) = my[0], my[-1]
+    return [
+        "Imię i nazwisko", "Stanowisko", "Kontakt (tel.)", "E-mail",
+        "Termin badań (RRRR-MM-DD)", "Umiejętności",
+        f"Dni robocze ({from_month} {from_year} – {to_month} {to_year})",
+        "Niedziele/Święta", "L4"
+    ]
+
+
+def profile_stats_rows(group, my):
+    """Wiersze eksportu profili + statystyk (workdays/ndz/l4) działu dla zakresu `my`."""
+    users = load_users_norm(group)
 
     # policz zakres dat
-    my = months_between(from_month, from_year, to_month, to_year)
     import calendar as _cal
     start_y = int(my[0][1])
     start_m = POLISH_MONTHS[my[0][0]]
@@ -1492,21 +2165,12 @@ def export_profiles_with_stats_csv(request, group):
     else:
         stats = hist_stats
 
-    sio = io.StringIO()
-    writer = csv.writer(sio, delimiter=';')
-    headers = [
-        "Imię i nazwisko", "Stanowisko", "Kontakt (tel.)", "E-mail",
-        "Termin badań (RRRR-MM-DD)", "Umiejętności",
-        f"Dni robocze ({from_month} {from_year} – {to_month} {to_year})",
-        "Niedziele/Święta", "L4"
-    ]
-    writer.writerow(headers)
-
+    rows = []
     for u in users:
         skills_on = [k for k, v in (u.get("skills") or {}).items() if v]
         skills_str = ", ".join(skills_on)
         s = stats.get(u["name"], {"workdays": 0, "ndz": 0, "l4": 0})
-        writer.writerow([
+        rows.append([
             u.get("name", ""),
             u.get("position", ""),
             u.get("contact", ""),
@@ -1515,6 +2179,30 @@ def export_profiles_with_stats_csv(request, group):
             skills_str,
             s["workdays"], s["ndz"], s["l4"]
         ])
+    return rows
+
+
+@never_cache
+def export_profiles_with_stats_csv(request, group):
+    """
+    Eksport profili + statystyki (workdays/ndz/l4) dla podanego zakresu.
+    GET parametry:
+      from_month, from_year, to_month, to_year
+    """
+    if request.session.get("auth_group") != group:
+        return redirect("login", group=group)
+
+    # zakres
+    from_month = request.GET.get("from_month", "Styczeń")
+    from_year = request.GET.get("from_year", "2025")
+    to_month = request.GET.get("to_month", "Grudzień")
+    to_year = request.GET.get("to_year", "2025")
+    my = months_between(from_month, from_year, to_month, to_year)
+
+    sio = io.StringIO()
+    writer = csv.writer(sio, delimiter=';')
+    writer.writerow(profile_stats_header(my))
+    writer.writerows(profile_stats_rows(group, my))
 
     csv_content = "\ufeff" + sio.getvalue()
     filename = f"{slugify(group)}_profile_stats_{date.today().isoformat()}.csv"
@@ -1523,6 +2211,32 @@ def export_profiles_with_stats_csv(request, group):
     return resp
 
 
+@staff_member_required
+@never_cache
+def export_payroll_csv(request):
+    """
+    Eksport profili + statystyk wszystkich działów naraz (core/payroll.py) – dla administratora.
+    GET: from_month, from_year, to_month, to_year
+    """
+    from_month = request.GET.get("from_month", "Styczeń")
+    from_year = request.GET.get("from_year", "2025")
+    to_month = request.GET.get("to_month", "Grudzień")
+    to_year = request.GET.get("to_year", "2025")
+    if from_month not in POLISH_MONTHS or to_month not in POLISH_MONTHS \
+            or not from_year.isdigit() or not to_year.isdigit():
+        return HttpResponse("Nieprawidłowy zakres.", status=400, content_type="text/plain; charset=utf-8")
+    my = months_between(from_month, from_year, to_month, to_year)
+    if not my:
+        return HttpResponse("Pusty zakres.", status=400, content_type="text/plain; charset=utf-8")
+
+    groups = [g["name"] for g in load_groups()]
+    resp = StreamingHttpResponse(payroll.astream(payroll.stream_csv(groups, my)), content_type="text/csv; charset=utf-8")
+    filename = f"payroll_{from_year}-{POLISH_MONTHS[from_month]:02d}_{to_year}-{POLISH_MONTHS[to_month]:02d}.csv"
+    resp["Content-Disposition"] = f'attachment; filename="{filename}"'
+    resp["X-Departments"] = str(len(groups))
+    return resp
+
+
 @never_cache
 def export_month_tokens_csv(request, group):
     """
@@ -1557,6 +2271,34 @@ def export_month_tokens_csv(request, group):
     return resp
 
 
+@never_cache
+def hours_report(request, group):
+    """
+    Roczne zestawienie godzin (praca, święta, noce, nieobecności) per osoba i miesiąc.
+    GET: year, format=csv|json (domyślnie csv)
+    """
+    if request.session.get("auth_group") != group:
+        return redirect("login", group=group)
+
+    year = request.GET.get("year", str(date.today().year))
+    if not year.isdigit():
+        return JsonResponse({"ok": False, "detail": "Nieprawidłowy rok."}, status=400)
+    names = [u["name"] for u in load_users_norm(group)]
+    report = hours_report_core.cached_year_report(
+        BASE_DIR, group, year, lambda m, y: load_month_data(group, m, y), names)
+
+    if request.GET.get("format") == "json":
+        return JsonResponse({"ok": True, **report})
+
+    sio = io.StringIO()
+    hours_report_core.write_csv(report, sio)
+    csv_content = "\ufeff" + sio.getvalue()
+    filename = f"{slugify(group)}_{year}_raport_godzin.csv"
+    resp = HttpResponse(csv_content, content_type="text/csv; charset=utf-8")
+    resp["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return resp
+
+
 @require_POST
 @never_cache
 @require_POST
@@ -1576,6 +2318,8 @@ def import_month_tokens_csv(request, group):
 
     month = request.POST.get("month", "Styczeń")
     year = request.POST.get("year", "2025")
+    if archive.is_closed(BASE_DIR, group, year):
+        return redirect(f"/panel/{group}/?info=" + quote(f"Rok {year} jest zamknięty (archiwum) – import niemożliwy."))
 
     # <<< KLUCZOWA ZMIANA: czytamy raz >>>
     raw = uploaded.read()
@@ -1611,9 +2355,11 @@ def import_month_tokens_csv(request, group):
 
     users = load_users_norm(group)
     users_by_name = {u["name"]: u for u in users}
+    # zaległy autosave najpierw – różnice do historii liczymy względem tego, co naprawdę w pliku
+    writebehind.flush(BASE_DIR, group)
     existing = load_month_data(group, month, year)
 
-    TOKENS = {"1", "2", "3", "C"}
+    TOKENS = tokens.HISTORY_TOKENS
     updated_table = {}
     mnum = POLISH_MONTHS[month]
     ynum = int(year)
@@ -1655,5 +2401,9 @@ def import_month_tokens_csv(request, group):
         row = (row + [""] * n_days)[:n_days]
         updated_table[name] = row
 
-    save_table_to_file(group, month, year, updated_table)
-    return redirect(f"/panel/{group}/?info=Zaimportowano%20siatk%C4%99%20({imported}%20wierszy).")
+    save_table_to_file(group, month, year, updated_table, who=actor(request), src="import")
+    info = f"Zaimportowano siatkę ({imported} wierszy)."
+    labour = month_validator(month, year).validate_table(updated_table)
+    if labour:
+        info += " " + _labour_summary(labour)
+    return redirect(f"/panel/{group}/?info=" + quote(info))
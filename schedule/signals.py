@@ -0,0 +1,12 @@
+# schedule/signals.py
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import ScheduleTemplate
+from .views import invalidate_list_cache
+
+
+@receiver(post_save, sender=ScheduleTemplate)
+@receiver(post_delete, sender=ScheduleTemplate)
+def _drop_cached_list(sender, instance, **kwargs):
+    invalidate_list_cache(instance.group)
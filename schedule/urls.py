@@ -3,5 +3,6 @@ from . import views
 
 urlpatterns = [
     path("templates/<str:group>/", views.templates_list_create, name="templates_list_create"),
+    path("templates-sync/<str:group>/", views.templates_sync, name="templates_sync"),
     path("templates/<str:group>/<str:name>/", views.templates_retrieve_update_delete, name="templates_rud"),
 ]
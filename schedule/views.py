@@ -1,30 +1,80 @@
 # schedule/views.py
+import hashlib
 import json
-from django.http import JsonResponse, HttpResponseBadRequest, HttpResponseNotAllowed
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Max
+from django.http import JsonResponse, HttpResponse, HttpResponseBadRequest, HttpResponseNotAllowed, HttpResponseNotModified
+from django.utils import timezone
 from django.views.decorators.http import require_http_methods
 from .models import ScheduleTemplate
 
+CACHE_PREFIX = "schedule:templates:"
+
 def _parse_json(request):
     try:
         return json.loads(request.body.decode("utf-8")) if request.body else {}
     except json.JSONDecodeError:
         return None
 
+def _not_authenticated(request, group):
+    if request.session.get("auth_group") != group:
+        return JsonResponse({"detail": "Not authenticated"}, status=401)
+    return None
+
+def _valid_positions(positions):
+    return isinstance(positions, list) and positions and all(isinstance(p, str) and p.strip() for p in positions)
+
+def _serialize(t):
+    return {
+        "name": t.name,
+        "positions": t.positions,
+        "group": t.group,
+        "updated_at": t.updated_at.isoformat(),
+        "created_at": t.created_at.isoformat(),
+    }
+
+def _list_etag(group):
+    """
+    Wersja listy działu z jednego zapytania agregującego (indeks na group).
+    Nie zależy od procesu, więc ETag jest spójny między workerami.
+    """
+    agg = ScheduleTemplate.objects.filter(group=group).aggregate(n=Count("id"), last=Max("updated_at"))
+    raw = f"{group}|{agg['n']}|{agg['last'].isoformat() if agg['last'] else ''}"
+    return '"' + hashlib.sha1(raw.encode("utf-8")).hexdigest()[:20] + '"'
+
+def invalidate_list_cache(group):
+    cache.delete(CACHE_PREFIX + group)
+
+def _list_body(group, etag):
+    """Zserializowana lista z cache; przebudowa tylko gdy zmienił się ETag."""
+    cached = cache.get(CACHE_PREFIX + group)
+    if cached and cached[0] == etag:
+        return cached[1]
+    qs = ScheduleTemplate.objects.filter(group=group).order_by("name")
+    body = json.dumps({"items": [_serialize(t) for t in qs]}, ensure_ascii=False).encode("utf-8")
+    cache.set(CACHE_PREFIX + group, (etag, body), None)
+    return body
+
+def _list_response(request, group):
+    etag = _list_etag(group)
+    if etag in [t.strip() for t in request.headers.get("If-None-Match", "").split(",")]:
+        resp = HttpResponseNotModified()
+    else:
+        resp = HttpResponse(_list_body(group, etag), content_type="application/json")
+    resp["ETag"] = etag
+    resp["Cache-Control"] = "private, no-cache"   # przeglądarka rewaliduje przez If-None-Match
+    return resp
+
 @require_http_methods(["GET", "POST"])
 def templates_list_create(request, group):
+    denied = _not_authenticated(request, group)
+    if denied:
+        return denied
+
     # GET: lista schematów w danym dziale (współdzielona)
     if request.method == "GET":
-        qs = ScheduleTemplate.objects.filter(group=group).order_by("name")
-        items = [
-            {
-                "name": t.name,
-                "positions": t.positions,
-                "group": t.group,
-                "updated_at": t.updated_at.isoformat(),
-                "created_at": t.created_at.isoformat(),
-            } for t in qs
-        ]
-        return JsonResponse({"items": items})
+        return _list_response(request, group)
 
     # POST: upsert (group + name)
     payload = _parse_json(request)
@@ -35,7 +85,7 @@ def templates_list_create(request, group):
     positions = payload.get("positions")
     if not name:
         return HttpResponseBadRequest("Field 'name' is required")
-    if not isinstance(positions, list) or not all(isinstance(p, str) and p.strip() for p in positions):
+    if not _valid_positions(positions):
         return HttpResponseBadRequest("Field 'positions' must be a non-empty list of strings")
 
     obj, _created = ScheduleTemplate.objects.update_or_create(
@@ -46,19 +96,17 @@ def templates_list_create(request, group):
 
 @require_http_methods(["GET", "PUT", "DELETE"])
 def templates_retrieve_update_delete(request, group, name):
+    denied = _not_authenticated(request, group)
+    if denied:
+        return denied
+
     try:
         obj = ScheduleTemplate.objects.get(group=group, name=name)
     except ScheduleTemplate.DoesNotExist:
         return JsonResponse({"detail": "Not found"}, status=404)
 
     if request.method == "GET":
-        return JsonResponse({
-            "name": obj.name,
-            "positions": obj.positions,
-            "group": obj.group,
-            "updated_at": obj.updated_at.isoformat(),
-            "created_at": obj.created_at.isoformat(),
-        })
+        return JsonResponse(_serialize(obj))
 
     if request.method == "PUT":
         payload = _parse_json(request)
@@ -68,7 +116,7 @@ def templates_retrieve_update_delete(request, group, name):
         new_name = (payload.get("name") or obj.name).strip()
         positions = payload.get("positions", obj.positions)
 
-        if not isinstance(positions, list) or not all(isinstance(p, str) and p.strip() for p in positions):
+        if not _valid_positions(positions):
             return HttpResponseBadRequest("Field 'positions' must be a non-empty list of strings")
 
         if new_name != obj.name and ScheduleTemplate.objects.filter(group=group, name=new_name).exists():
@@ -84,3 +132,54 @@ def templates_retrieve_update_delete(request, group, name):
         return JsonResponse({"ok": True})
 
     return HttpResponseNotAllowed(["GET", "PUT", "DELETE"])
+
+@require_http_methods(["POST"])
+def templates_sync(request, group):
+    """
+    Hurtowa synchronizacja w jednej transakcji:
+      {"upsert": [{"name": ..., "positions": [...]}, ...], "delete": ["nazwa", ...]}
+    Najpierw usuwa, potem dopisuje/aktualizuje (zmiana nazwy = delete + upsert).
+    Odpowiada aktualną listą działu (jak GET) z nowym ETagiem.
+    """
+    denied = _not_authenticated(request, group)
+    if denied:
+        return denied
+
+    payload = _parse_json(request)
+    if not isinstance(payload, dict):
+        return HttpResponseBadRequest("Invalid JSON")
+    upserts = payload.get("upsert") or []
+    deletes = payload.get("delete") or []
+    if not isinstance(upserts, list) or not isinstance(deletes, list):
+        return HttpResponseBadRequest("Fields 'upsert' and 'delete' must be lists")
+
+    wanted = {}
+    for item in upserts:
+        name = (item.get("name") or "").strip() if isinstance(item, dict) else ""
+        if not name:
+            return HttpResponseBadRequest("Every upsert item needs a 'name'")
+        if not _valid_positions(item.get("positions")):
+            return HttpResponseBadRequest(f"Template '{name}': 'positions' must be a non-empty list of strings")
+        wanted[name] = item["positions"]
+    to_delete = {str(n).strip() for n in deletes if str(n).strip()} - set(wanted)
+
+    now = timezone.now()
+    with transaction.atomic():
+        qs = ScheduleTemplate.objects.select_for_update().filter(group=group)
+        if to_delete:
+            qs.filter(name__in=to_delete).delete()
+        existing = {t.name: t for t in qs.filter(name__in=wanted)}
+        changed = []
+        for name, positions in wanted.items():
+            t = existing.get(name)
+            if t is not None and t.positions != positions:
+                t.positions = positions
+                t.updated_at = now   # bulk_update pomija auto_now
+                changed.append(t)
+        ScheduleTemplate.objects.bulk_update(changed, ["positions", "updated_at"])
+        ScheduleTemplate.objects.bulk_create([
+            ScheduleTemplate(group=group, name=name, positions=positions)
+            for name, positions in wanted.items() if name not in existing
+        ])
+    invalidate_list_cache(group)
+    return _list_response(request, group)